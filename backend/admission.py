@@ -0,0 +1,184 @@
+"""Admission control for the LLM-backed routes.
+
+Every generation request passes three gates before it may call the LLM:
+
+1. a per-user token bucket (sustained rate plus a burst allowance),
+2. a per-user cap on concurrent generations,
+3. a global concurrency cap with a bounded FIFO wait queue.
+
+Requests failing a gate are rejected immediately with `AdmissionRejected`,
+which server.py turns into a 429 with Retry-After, so overload sheds the
+excess instead of queueing everyone behind it.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from caching import TTLCache
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Request rejected ({reason}), retry after {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `rate_per_second` tokens up to `burst`"""
+
+    def __init__(self, rate_per_second: float, burst: float):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0 on success, else the seconds until they are available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate_per_second
+
+
+class Admission:
+    """One admitted request; release() is idempotent so it can be called from several cleanup paths.
+
+    Without a controller (admission control disabled) release() is a no-op.
+    """
+
+    def __init__(self, controller: Optional["AdmissionController"], user_id: str):
+        self._controller = controller
+        self.user_id = user_id
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released and self._controller is not None:
+            self._released = True
+            self._controller._release(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """Per-user token buckets and concurrency caps in front of a global bounded queue.
+
+    A rate or per-user cap of 0 disables that gate.
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 64, queue_timeout_seconds: float = 10.0,
+                 user_rate_per_minute: float = 20.0, user_burst: float = 10.0, user_max_concurrency: int = 4,
+                 max_tracked_users: int = 100000):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.user_rate_per_minute = user_rate_per_minute
+        self.user_burst = user_burst
+        self.user_max_concurrency = user_max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # An idle bucket refills completely, so it can be evicted once it would be full again
+        refill_seconds = user_burst / (user_rate_per_minute / 60) if user_rate_per_minute else 0
+        self._buckets = TTLCache(max_tracked_users, max(refill_seconds, 1.0))
+        self._user_in_flight: Dict[str, int] = defaultdict(int)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = defaultdict(int)
+        # Moving average of admitted request duration, for Retry-After estimates
+        self._avg_service_seconds = 1.0
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise AdmissionRejected(reason, max(1, math.ceil(retry_after)))
+
+    def _check_user(self, user_id: str, cost: float):
+        if self.user_max_concurrency and self._user_in_flight.get(user_id, 0) >= self.user_max_concurrency:
+            self._reject("user_concurrency", self._avg_service_seconds)
+        if self.user_rate_per_minute:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self.user_rate_per_minute / 60, self.user_burst)
+                self._buckets.set(user_id, bucket)
+            wait = bucket.take(min(cost, self.user_burst))
+            if wait:
+                self._reject("user_rate", wait)
+
+    async def admit(self, user_id: str, cost: float = 1.0) -> Admission:
+        """Admit a request or raise AdmissionRejected; use the result as `async with` or call release()"""
+        self._check_user(user_id, cost)
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject("queue_full", self._avg_service_seconds * (self.waiting + 1) / self.max_concurrency)
+
+        # Count the user before waiting so their queued requests also hit their cap
+        self._user_in_flight[user_id] += 1
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.set(self.waiting)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._forget_user(user_id)
+            self._reject("queue_timeout", self._avg_service_seconds)
+        except BaseException:
+            self._forget_user(user_id)
+            raise
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.set(self.waiting)
+            ADMISSION_WAIT.observe(time.monotonic() - queued_at)
+
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        return Admission(self, user_id)
+
+    def _forget_user(self, user_id: str):
+        self._user_in_flight[user_id] -= 1
+        if self._user_in_flight[user_id] <= 0:
+            del self._user_in_flight[user_id]
+
+    def _release(self, admission: Admission):
+        self._avg_service_seconds = 0.9 * self._avg_service_seconds + 0.1 * (time.monotonic() - admission.started)
+        self._forget_user(admission.user_id)
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_service_ms": round(self._avg_service_seconds * 1000, 1),
+            "tracked_users": len(self._buckets),
+        }
+
+
+def admission_from_env() -> Optional[AdmissionController]:
+    """Controller from ADMISSION_* env vars, or None when ADMISSION_ENABLED=0"""
+    if os.environ.get("ADMISSION_ENABLED", "1") != "1":
+        return None
+    return AdmissionController(
+        max_concurrency=int(os.environ.get("ADMISSION_MAX_CONCURRENCY", "32")),
+        max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "64")),
+        queue_timeout_seconds=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10")),
+        user_rate_per_minute=float(os.environ.get("ADMISSION_USER_RATE_PER_MINUTE", "20")),
+        user_burst=float(os.environ.get("ADMISSION_USER_BURST", "10")),
+        user_max_concurrency=int(os.environ.get("ADMISSION_USER_MAX_CONCURRENCY", "4")),
+    )
@@ -0,0 +1,218 @@
+"""Caching primitives for the Creator OS backend.
+
+`TTLCache` is a small bounded in-process cache (TTL + LRU eviction) with
+hit/miss counters.  The LLM response caches built on top of it sit in front of
+the generation helpers in server.py so retried or repeated prompts do not pay
+for another model round trip.
+"""
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def prompt_cache_key(model: str, system_message: str, user_prompt: str, scope: str = "") -> str:
+    """Hash the fully rendered prompt into a cache key.
+
+    `scope` carries anything that changes the right answer without appearing
+    in the prompt text (e.g. the plan date for daily plans).
+    """
+    digest = hashlib.sha256()
+    for part in (model, scope, system_message, user_prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# ============ LLM Response Caches ============
+
+class LLMResponseCache:
+    """Interface for raw LLM response caches; the base class caches nothing"""
+
+    backend = "none"
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, response: str):
+        return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class InMemoryLLMCache(LLMResponseCache):
+    """Per-process LLM response cache"""
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 1000):
+        super().__init__(ttl_seconds, max_entries)
+        self._store = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def get(self, key: str) -> Optional[str]:
+        response = self._store.get(key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def set(self, key: str, response: str):
+        self._store.set(key, response)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["entries"] = len(self._store)
+        stats["evictions"] = self._store.evictions
+        return stats
+
+
+class MongoLLMCache(LLMResponseCache):
+    """LLM response cache shared by all workers through a Mongo collection.
+
+    Expiry is enforced on read and by a TTL index on `expires_at`; the
+    collection is trimmed back to `max_entries` least recently written entries
+    every `trim_interval` writes.
+    """
+
+    backend = "mongo"
+
+    def __init__(self, collection, ttl_seconds: float = 600.0, max_entries: int = 1000,
+                 trim_interval: int = 100):
+        super().__init__(ttl_seconds, max_entries)
+        self.collection = collection
+        self.trim_interval = trim_interval
+        self._writes = 0
+        self._index_ready = False
+
+    async def _ensure_index(self):
+        if self._index_ready:
+            return
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("stored_at")
+        self._index_ready = True
+
+    async def get(self, key: str) -> Optional[str]:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"response": 1},
+        )
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc["response"]
+
+    async def set(self, key: str, response: str):
+        await self._ensure_index()
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "response": response,
+                "stored_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            }},
+            upsert=True,
+        )
+        self._writes += 1
+        if self._writes % self.trim_interval == 0:
+            await self._trim()
+
+    async def _trim(self):
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = await self.collection.find({}, {"_id": 1}).sort("stored_at", 1).limit(excess).to_list(excess)
+        await self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+
+
+def build_llm_cache(db) -> LLMResponseCache:
+    """Build the LLM response cache selected by the LLM_CACHE_* env vars"""
+    backend = os.environ.get("LLM_CACHE_BACKEND", "memory").lower()
+    ttl_seconds = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "600"))
+    max_entries = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1000"))
+
+    if backend == "memory":
+        return InMemoryLLMCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+    if backend == "mongo":
+        return MongoLLMCache(db.llm_cache, ttl_seconds=ttl_seconds, max_entries=max_entries)
+    if backend not in ("none", "off", ""):
+        logger.warning(f"Unknown LLM_CACHE_BACKEND '{backend}', LLM response caching disabled")
+    return LLMResponseCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
@@ -0,0 +1,200 @@
+"""Streaming NDJSON export and batched bulk import of `db.content`.
+
+Export walks a Mongo cursor in `batch_size` batches and yields one encoded
+chunk per batch (optionally gzip-compressed as it goes), so memory stays
+constant however large the corpus.  Import reads NDJSON (plain or gzip) line
+by line, validates each document and writes it with unordered `insert_many`
+batches; documents whose `id` already exists are counted as duplicates, so
+re-running an interrupted import is safe.  Creator contexts of the imported
+users are rebuilt and their content revisions (see revisions.py) bumped
+afterwards.
+
+Served by GET /api/content/export/{user_id} and POST /api/content/import, or
+from the command line for migrations:
+
+    python content_io.py export content.ndjson.gz [--user-id ID] [--batch-size 5000]
+    python content_io.py import content.ndjson.gz [--batch-size 5000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import zlib
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Callable, Optional
+
+from pymongo.errors import BulkWriteError
+
+from creator_context import rebuild_creator_context
+from pagination import KEYSET_SORT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+GZIP_MAGIC = b"\x1f\x8b"
+DUPLICATE_KEY = 11000
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def export_ndjson(collection, query: dict, batch_size: int = DEFAULT_BATCH_SIZE,
+                        compress: bool = False) -> AsyncIterator[bytes]:
+    """Yield the matching documents as NDJSON, one chunk per cursor batch"""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    # Per-user exports follow the history index; a full export walks _id to avoid an in-memory sort
+    sort = KEYSET_SORT if "user_id" in query else [("_id", 1)]
+    cursor = collection.find(query, {"_id": 0}).sort(sort).batch_size(batch_size)
+    lines = []
+
+    def encode(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    async for document in cursor:
+        lines.append(json.dumps(document, default=_json_default, separators=(",", ":")))
+        if len(lines) >= batch_size:
+            chunk = encode(("\n".join(lines) + "\n").encode("utf-8"))
+            lines.clear()
+            if chunk:
+                yield chunk
+    tail = encode(("\n".join(lines) + "\n").encode("utf-8")) if lines else b""
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+async def iter_ndjson_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split byte chunks into NDJSON lines, transparently gunzipping; blank lines are skipped"""
+    decompressor = None
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        if first and chunk:
+            first = False
+            if chunk[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(wbits=47)  # 47 = auto-detect gzip/zlib header
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if decompressor:
+        buffer += decompressor.flush()
+    for line in buffer.split(b"\n"):
+        if line.strip():
+            yield line
+
+
+async def import_ndjson(db, lines: AsyncIterable[bytes], validate: Callable[[dict], dict],
+                        batch_size: int = DEFAULT_BATCH_SIZE, progress: Optional[Callable[[dict], None]] = None,
+                        rebuild_contexts: bool = True, revisions=None) -> dict:
+    """Insert documents in unordered batches; returns counts and throughput"""
+    stats = {"inserted": 0, "duplicates": 0, "invalid": 0, "users": 0}
+    user_ids = set()
+    batch = []
+    started = time.perf_counter()
+
+    async def flush():
+        try:
+            result = await db.content.insert_many(batch, ordered=False)
+            stats["inserted"] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = sum(1 for error in errors if error.get("code") == DUPLICATE_KEY)
+            if duplicates != len(errors):
+                raise
+            stats["inserted"] += e.details.get("nInserted", 0)
+            stats["duplicates"] += duplicates
+        batch.clear()
+        if progress:
+            progress(throughput(stats, started))
+
+    async for line in lines:
+        try:
+            document = validate(json.loads(line))
+        except (TypeError, ValueError) as e:
+            stats["invalid"] += 1
+            logger.warning(f"Skipping invalid content document: {str(e)[:200]}")
+            continue
+        user_ids.add(document["user_id"])
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    if revisions is not None and stats["inserted"]:
+        await revisions.bump_many(user_ids, "content")
+    # Imported history can be older than what the context already holds, so rebuild rather than fold in
+    if rebuild_contexts and stats["inserted"]:
+        for user_id in user_ids:
+            await rebuild_creator_context(db, user_id)
+    stats["users"] = len(user_ids)
+    return throughput(stats, started)
+
+
+def throughput(stats: dict, started: float) -> dict:
+    elapsed = time.perf_counter() - started
+    return {
+        **stats,
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(stats["inserted"] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def _file_chunks(path: str, chunk_size: int = 1 << 20) -> AsyncIterator[bytes]:
+    with (sys.stdin.buffer if path == "-" else open(path, "rb")) as handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _export_file(db, path: str, user_id: Optional[str], batch_size: int):
+    query = {"user_id": user_id} if user_id else {}
+    written = 0
+    started = time.perf_counter()
+    with (sys.stdout.buffer if path == "-" else open(path, "wb")) as handle:
+        async for chunk in export_ndjson(db.content, query, batch_size, compress=path.endswith(".gz")):
+            handle.write(chunk)
+            written += len(chunk)
+    print(f"Exported {written} bytes in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import content history as NDJSON")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="NDJSON file (.gz for gzip), or - for stdin/stdout")
+    parser.add_argument("--user-id", default=None, help="Export a single creator")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    import server
+
+    if args.command == "export":
+        asyncio.run(_export_file(server.db, args.path, args.user_id, args.batch_size))
+        return
+
+    stats = asyncio.run(import_ndjson(
+        server.db,
+        iter_ndjson_lines(_file_chunks(args.path)),
+        lambda raw: server.ContentItem(**raw).dict(),
+        args.batch_size,
+        progress=lambda stats: print(stats, file=sys.stderr),
+        revisions=server.revisions,
+    ))
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Materialized per-user "creator context" used to personalize prompts.
+
+One small document per user in `creator_context` holds the latest caption
+snippets, per-platform counts and hashtag frequencies.  It is updated
+incrementally with a single upsert whenever content is inserted, so building a
+prompt is one indexed point read instead of a scan of the user's history.
+"""
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+RECENT_LIMIT = 5
+SNIPPET_LENGTH = 100
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+# Platforms are free text; "." would nest the field and a leading "$" is rejected by Mongo
+_KEY_ESCAPES = (("%", "%25"), (".", "%2E"), ("$", "%24"))
+
+
+def _snippet(item: dict) -> dict:
+    return {
+        "platform": item["platform"],
+        "content_type": item["content_type"],
+        "caption": item["caption"][:SNIPPET_LENGTH],
+        "created_at": item["created_at"],
+    }
+
+
+def _field_key(value: str) -> str:
+    """A free-text value made safe to use as a field name"""
+    for char, escape in _KEY_ESCAPES:
+        value = value.replace(char, escape)
+    return value
+
+
+def _value_of_key(key: str) -> str:
+    for char, escape in reversed(_KEY_ESCAPES):
+        key = key.replace(escape, char)
+    return key
+
+
+def _hashtags(caption: str) -> List[str]:
+    return [tag.lower() for tag in HASHTAG_PATTERN.findall(caption)]
+
+
+def _context_update(items: List[dict]) -> dict:
+    """Build the upsert applying `items` (any order) to a context document"""
+    items = sorted(items, key=lambda item: item["created_at"], reverse=True)
+    increments = Counter({"total": len(items)})
+    for item in items:
+        increments[f"platform_counts.{_field_key(item['platform'])}"] += 1
+        for tag in _hashtags(item["caption"]):
+            increments[f"hashtags.{tag}"] += 1
+
+    return {
+        "$push": {"recent": {"$each": [_snippet(item) for item in items], "$position": 0,
+                             "$slice": RECENT_LIMIT}},
+        "$inc": dict(increments),
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+
+
+async def record_content(db, items: Iterable[dict]):
+    """Fold newly inserted content documents into their users' contexts"""
+    by_user = defaultdict(list)
+    for item in items:
+        by_user[item["user_id"]].append(item)
+    for user_id, user_items in by_user.items():
+        await db.creator_context.update_one({"user_id": user_id}, _context_update(user_items), upsert=True)
+
+
+async def rebuild_creator_context(db, user_id: str) -> Optional[dict]:
+    """Build a user's context from their full history (backfill for content older than the context)"""
+    projection = {"_id": 0, "user_id": 1, "platform": 1, "content_type": 1, "caption": 1, "created_at": 1}
+    items = await db.content.find({"user_id": user_id}, projection).to_list(None)
+    if not items:
+        return None
+    await db.creator_context.delete_one({"user_id": user_id})
+    await record_content(db, items)
+    return await db.creator_context.find_one({"user_id": user_id}, {"_id": 0})
+
+
+async def get_creator_context(db, user_id: str) -> dict:
+    """Get a user's context, backfilling it once for users created before it existed"""
+    context = await db.creator_context.find_one({"user_id": user_id}, {"_id": 0})
+    if context is None:
+        context = await rebuild_creator_context(db, user_id)
+    if context:
+        context["platform_counts"] = {_value_of_key(key): count
+                                      for key, count in context.get("platform_counts", {}).items()}
+    return context or {"user_id": user_id, "recent": [], "platform_counts": {}, "hashtags": {}, "total": 0}
+
+
+def top_hashtags(context: dict, limit: int = 5) -> List[str]:
+    return [tag for tag, _ in Counter(context.get("hashtags", {})).most_common(limit)]
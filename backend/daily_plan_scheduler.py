@@ -0,0 +1,249 @@
+"""Nightly precomputation of daily plans.
+
+Walks `db.users` in id order, generates each user's plan for a target date
+through a bounded pool of async workers under a global rate limit, and
+upserts the result into `daily_plans` so GET /api/daily-plan/today is a plain
+read.  Progress is checkpointed per batch in `scheduler_runs`, so an
+interrupted run resumes after the last completed batch, and a lease on the
+same document keeps several API workers from precomputing the same date.
+
+Users whose plan fails (e.g. an LLM timeout) are recorded in the run document
+and retried once the walk is done.  A run with users still failing after that
+ends `incomplete` rather than `completed`, so the next run for the same date
+retries just them.
+
+Runs inside the API process when DAILY_PLAN_SCHEDULER_ENABLED=1, or on demand:
+
+    python daily_plan_scheduler.py --date 2026-01-31 --workers 8 --rate 120 --dry-run
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+GeneratePlan = Callable[[dict, str], Awaitable[List[dict]]]
+SavePlan = Callable[[str, str, List[dict]], Awaitable[None]]
+
+
+class RateLimiter:
+    """Global rate limit shared by all workers (evenly spaced start slots)"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class DailyPlanScheduler:
+    """Generate and store plans for every user for one date"""
+
+    def __init__(self, db, generate_plan: GeneratePlan, save_plan: SavePlan, batch_size: int = 100,
+                 workers: int = 8, rate_per_minute: float = 120, dry_run: bool = False,
+                 lease_seconds: float = 600):
+        self.db = db
+        self.generate_plan = generate_plan
+        self.save_plan = save_plan
+        self.batch_size = batch_size
+        self.workers = workers
+        self.rate_limiter = RateLimiter(rate_per_minute)
+        self.dry_run = dry_run
+        self.lease_seconds = lease_seconds
+
+    async def run(self, plan_date: str) -> dict:
+        """Precompute plans for `plan_date`, resuming an unfinished run for that date"""
+        run_id = run_id_for(plan_date)
+        progress = await self.db.scheduler_runs.find_one({"_id": run_id}) or {}
+        if progress.get("status") == "completed" and not self.dry_run:
+            logger.info(f"Daily plans for {plan_date} already precomputed, nothing to do")
+            return progress
+
+        if not self.dry_run and not await self._claim(run_id):
+            logger.info(f"Daily plans for {plan_date} are being precomputed by another worker")
+            return progress
+
+        last_user_id = progress.get("last_user_id")
+        # Users whose plan failed, in this run or an earlier one for the date
+        failed_ids = set(progress.get("failed_user_ids", [])) if not self.dry_run else set()
+        stats = {
+            "generated": progress.get("generated", 0) if not self.dry_run else 0,
+            "skipped": progress.get("skipped", 0) if not self.dry_run else 0,
+            "failed": len(failed_ids),
+        }
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def process(user: dict):
+            async with semaphore:
+                await self.rate_limiter.acquire()
+                try:
+                    plan_items = await self.generate_plan(user, plan_date)
+                    await self.save_plan(user["id"], plan_date, plan_items)
+                    stats["generated"] += 1
+                    failed_ids.discard(user["id"])
+                except Exception as e:
+                    failed_ids.add(user["id"])
+                    logger.error(f"Failed to precompute daily plan for user {user['id']}: {str(e)}")
+
+        async def without_plan(users: List[dict]) -> List[dict]:
+            # Users who already generated a plan for the date keep it
+            existing = await self.db.daily_plans.find(
+                {"user_id": {"$in": [user["id"] for user in users]}, "date": plan_date},
+                {"user_id": 1}
+            ).to_list(len(users))
+            has_plan = {plan["user_id"] for plan in existing}
+            return [user for user in users if user["id"] not in has_plan]
+
+        while True:
+            query = {"id": {"$gt": last_user_id}} if last_user_id else {}
+            users = await self.db.users.find(query).sort("id", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not users:
+                break
+
+            pending = await without_plan(users)
+            stats["skipped"] += len(users) - len(pending)
+
+            if self.dry_run:
+                stats["generated"] += len(pending)
+            else:
+                await asyncio.gather(*(process(user) for user in pending))
+
+            last_user_id = users[-1]["id"]
+            stats["failed"] = len(failed_ids)
+            if not self.dry_run:
+                await self._checkpoint(run_id, plan_date, last_user_id, stats, "running", failed_ids)
+
+        if failed_ids and not self.dry_run:
+            # One more attempt each; users deleted or with a plan of their own by now need none
+            retry = await self.db.users.find({"id": {"$in": sorted(failed_ids)}}).to_list(len(failed_ids))
+            pending = await without_plan(retry) if retry else []
+            failed_ids.intersection_update(user["id"] for user in pending)
+            await asyncio.gather(*(process(user) for user in pending))
+
+        elapsed = time.monotonic() - started
+        stats["failed"] = len(failed_ids)
+        stats["elapsed_seconds"] = round(elapsed, 2)
+        stats["plans_per_minute"] = round(stats["generated"] / elapsed * 60, 1) if elapsed > 0 else 0.0
+        stats["dry_run"] = self.dry_run
+        if not self.dry_run:
+            await self._checkpoint(run_id, plan_date, last_user_id, stats,
+                                   "incomplete" if failed_ids else "completed", failed_ids)
+
+        logger.info(f"Daily plan precompute for {plan_date}: {stats}")
+        return stats
+
+    async def _claim(self, run_id: str) -> bool:
+        """Take the run's lease so only one worker/process precomputes a date"""
+        now = datetime.utcnow()
+        try:
+            await self.db.scheduler_runs.update_one(
+                {"_id": run_id, "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The run document exists and its lease has not expired
+            return False
+        return True
+
+    async def _checkpoint(self, run_id: str, plan_date: str, last_user_id: Optional[str], stats: dict, status: str,
+                          failed_ids: Iterable[str] = ()):
+        update = {"$set": {"date": plan_date, "last_user_id": last_user_id, "status": status,
+                           "failed_user_ids": sorted(failed_ids), "updated_at": datetime.utcnow(), **stats}}
+        if status == "running":
+            update["$set"]["lease_until"] = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        else:
+            # A finished run holds no lease, so a rerun for the date can claim it straight away
+            update["$unset"] = {"lease_until": ""}
+        await self.db.scheduler_runs.update_one({"_id": run_id}, update, upsert=True)
+
+
+def run_id_for(plan_date: str) -> str:
+    return f"daily_plans:{plan_date}"
+
+
+def next_plan_date(now: Optional[datetime] = None) -> str:
+    """Date the nightly run generates plans for (tomorrow, UTC)"""
+    now = now or datetime.utcnow()
+    return (now + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def seconds_until_hour(hour_utc: int, now: Optional[datetime] = None) -> float:
+    """Seconds until the next occurrence of `hour_utc`:00 UTC"""
+    now = now or datetime.utcnow()
+    next_run = now.replace(hour=hour_utc, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def scheduler_from_env(db, generate_plan: GeneratePlan, save_plan: SavePlan, dry_run: bool = False):
+    """Build a scheduler configured by the DAILY_PLAN_SCHEDULER_* env vars"""
+    return DailyPlanScheduler(
+        db,
+        generate_plan,
+        save_plan,
+        batch_size=int(os.environ.get("DAILY_PLAN_SCHEDULER_BATCH_SIZE", "100")),
+        workers=int(os.environ.get("DAILY_PLAN_SCHEDULER_WORKERS", "8")),
+        rate_per_minute=float(os.environ.get("DAILY_PLAN_SCHEDULER_RATE_PER_MINUTE", "120")),
+        dry_run=dry_run,
+    )
+
+
+async def run_nightly(scheduler: DailyPlanScheduler, hour_utc: int):
+    """Run the scheduler every night at `hour_utc` until cancelled"""
+    while True:
+        await asyncio.sleep(seconds_until_hour(hour_utc))
+        try:
+            # Users who failed last night still get today's plan before tomorrow's run starts
+            today = datetime.utcnow().strftime("%Y-%m-%d")
+            progress = await scheduler.db.scheduler_runs.find_one({"_id": run_id_for(today)}, {"status": 1})
+            if progress and progress.get("status") == "incomplete":
+                await scheduler.run(today)
+            await scheduler.run(next_plan_date())
+        except Exception as e:
+            logger.error(f"Nightly daily plan precompute failed: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute daily plans for all users")
+    parser.add_argument("--date", default=None, help="Plan date (YYYY-MM-DD), defaults to tomorrow (UTC)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rate", type=float, default=None, help="Max LLM generations per minute")
+    parser.add_argument("--dry-run", action="store_true", help="Count pending users without generating")
+    args = parser.parse_args()
+
+    import server
+
+    scheduler = scheduler_from_env(server.db, server.precompute_daily_plan, server.upsert_daily_plan,
+                                   dry_run=args.dry_run)
+    if args.batch_size:
+        scheduler.batch_size = args.batch_size
+    if args.workers:
+        scheduler.workers = args.workers
+    if args.rate:
+        scheduler.rate_limiter = RateLimiter(args.rate)
+
+    stats = asyncio.run(scheduler.run(args.date or next_plan_date()))
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
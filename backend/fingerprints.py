@@ -0,0 +1,235 @@
+"""Near-duplicate detection for generated hooks and captions.
+
+Every hook and caption is reduced to a 64-bit SimHash over character
+shingles of its normalized text; texts that differ by punctuation or a word
+land a few bits apart.  Signatures are stored on the content
+document (`fingerprints`, as signed int64) and held per user in growable
+NumPy arrays, so checking a new item against thousands of past ones is one
+XOR plus popcount over an array rather than a Python loop.
+
+Indexes hold the newest `window` items of each history (NEAR_DUP_WINDOW) and
+are kept current as content is inserted, like the search indexes.  They are
+loaded in the background (see user_indexes.py): generations warm them before
+the LLM call and a check that still finds none loaded is skipped, so a
+request never waits for a scan.  Content written before signatures existed
+is fingerprinted in a worker thread on load and the signatures are stored.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from user_indexes import UserIndexes
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BITS = 64
+SHINGLE_SIZE = 3
+# Hamming distance at or below which two signatures count as near-duplicates.  Punctuation,
+# contractions and a swapped word land within it; unrelated hooks are typically ~30 bits apart.
+DEFAULT_MAX_DISTANCE = 9
+NEAR_DUP_MODES = ("off", "flag", "regenerate")
+
+_WORD = re.compile(r"\w+")
+_BIT_VALUES = np.uint64(1) << np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = [text]
+    else:
+        shingles = {text[idx:idx + SHINGLE_SIZE] for idx in range(len(text) - SHINGLE_SIZE + 1)}
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    return np.frombuffer(digests, dtype="<u8")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash as a signed int (BSON has no unsigned 64-bit integer)"""
+    hashes = _shingle_hashes(text)
+    votes = ((hashes[:, None] & _BIT_VALUES) != 0).sum(axis=0)
+    signature = _BIT_VALUES[votes * 2 > len(hashes)].sum(dtype=np.uint64)
+    return int(np.uint64(signature).view(np.int64))
+
+
+def hamming_distances(signature: int, signatures: np.ndarray) -> np.ndarray:
+    """Bit distance from one signature to each of an int64 array of signatures"""
+    # bitwise_count of a signed integer counts the bits of its absolute value, hence the uint64 view
+    return np.bitwise_count((signatures ^ np.int64(signature)).view(np.uint64))
+
+
+def content_fingerprints(document: dict) -> dict:
+    """The `fingerprints` field stored on a content document"""
+    return {
+        "hooks": [simhash(hook) for hook in document.get("hooks") or []],
+        "caption": simhash(document.get("caption") or ""),
+    }
+
+
+class SignatureSet:
+    """Append-only int64 signatures with the content id each came from"""
+
+    def __init__(self, capacity: int = 64):
+        self._signatures = np.empty(capacity, dtype=np.int64)
+        self.owners: List[str] = []
+
+    def __len__(self):
+        return len(self.owners)
+
+    @property
+    def signatures(self) -> np.ndarray:
+        return self._signatures[:len(self.owners)]
+
+    def add(self, signature: int, owner: str):
+        count = len(self.owners)
+        if count == len(self._signatures):
+            grown = np.empty(count * 2, dtype=np.int64)
+            grown[:count] = self._signatures
+            self._signatures = grown
+        self._signatures[count] = signature
+        self.owners.append(owner)
+
+    def nearest(self, signature: int) -> Optional[tuple]:
+        """(owner, distance) of the closest stored signature, or None when empty"""
+        if not self.owners:
+            return None
+        distances = hamming_distances(signature, self.signatures)
+        idx = int(distances.argmin())
+        return self.owners[idx], int(distances[idx])
+
+
+class UserFingerprints:
+    def __init__(self):
+        self.hooks = SignatureSet()
+        self.captions = SignatureSet()
+        self.content_ids = set()
+        self.ready = False
+
+    def add(self, document: dict):
+        if document["id"] in self.content_ids:
+            return
+        self.content_ids.add(document["id"])
+        fingerprints = document.get("fingerprints") or content_fingerprints(document)
+        for signature in fingerprints["hooks"]:
+            self.hooks.add(signature, document["id"])
+        self.captions.add(fingerprints["caption"], document["id"])
+
+
+class NearDuplicateDetector:
+    """Per-user signature indexes over the newest `window` items of `db.content` (see user_indexes.py)"""
+
+    PROJECTION = {"_id": 0, "id": 1, "fingerprints": 1, "hooks": 1, "caption": 1}
+
+    def __init__(self, db, mode: str = "flag", max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_users: int = 1000, ttl_seconds: float = 600,
+                 pending: Optional[Callable[[str], List[dict]]] = None, window: Optional[int] = 500):
+        if mode not in NEAR_DUP_MODES:
+            raise ValueError(f"NEAR_DUP_MODE must be one of {', '.join(NEAR_DUP_MODES)}")
+        self.db = db
+        self.mode = mode
+        self.max_distance = max_distance
+        self.indexes = UserIndexes(db, UserFingerprints, self.PROJECTION, max_users=max_users,
+                                   ttl_seconds=ttl_seconds, pending=pending, window=window,
+                                   prepare=self._backfill)
+        self.checked = 0
+        self.skipped = 0
+        self.backfilled = 0
+        self.flagged = 0
+        self.regenerated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def builds(self) -> int:
+        return self.indexes.builds
+
+    async def _backfill(self, documents: List[dict]):
+        """Fingerprint content written before signatures existed, off the event loop, and store the result"""
+        legacy = [document for document in documents if not document.get("fingerprints")]
+        if not legacy:
+            return
+        fingerprints = await asyncio.to_thread(lambda: [content_fingerprints(document) for document in legacy])
+        for document, document_fingerprints in zip(legacy, fingerprints):
+            document["fingerprints"] = document_fingerprints
+        try:
+            await self.db.content.bulk_write([
+                UpdateOne({"id": document["id"]}, {"$set": {"fingerprints": document["fingerprints"]}})
+                for document in legacy
+            ], ordered=False)
+            self.backfilled += len(legacy)
+        except PyMongoError as e:
+            # The index is still built from the computed signatures; the next build tries again
+            logger.warning(f"Could not store backfilled fingerprints: {str(e)}")
+
+    def warm(self, user_id: str):
+        """Start loading the user's signatures, e.g. while their generation is still running"""
+        if self.enabled:
+            self.indexes.warm(user_id)
+
+    def check(self, user_id: str, content_data: dict) -> Optional[Dict[str, dict]]:
+        """Near-duplicate matches of the new hooks and caption against the user's past content.
+
+        Keys are "hook:<position>" and "caption"; values hold the text, the matching content id and
+        the bit distance.  Hooks are checked against past hooks and captions.  None while the user's
+        signatures are still loading: the check is skipped rather than waited for.
+        """
+        index = self.indexes.loaded(user_id)
+        if index is None:
+            self.skipped += 1
+            return None
+        self.checked += 1
+        matches = {}
+        for position, hook in enumerate(content_data.get("hooks") or []):
+            signature = simhash(hook)
+            for nearest in (index.hooks.nearest(signature), index.captions.nearest(signature)):
+                if nearest and nearest[1] <= self.max_distance:
+                    matches[f"hook:{position}"] = {"text": hook, "content_id": nearest[0], "distance": nearest[1]}
+                    break
+        caption = content_data.get("caption") or ""
+        if caption:
+            nearest = index.captions.nearest(simhash(caption))
+            if nearest and nearest[1] <= self.max_distance:
+                matches["caption"] = {"text": caption, "content_id": nearest[0], "distance": nearest[1]}
+        return matches
+
+    def add(self, documents: Iterable[dict]):
+        """Fold newly inserted content into the indexes that are already loaded"""
+        self.indexes.add(documents)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "max_distance": self.max_distance,
+            "window": self.indexes.window,
+            "users_indexed": len(self.indexes),
+            "builds": self.builds,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "backfilled": self.backfilled,
+            "flagged": self.flagged,
+            "regenerated": self.regenerated,
+        }
+
+
+def near_duplicate_detector_from_env(db, pending: Optional[Callable[[str], List[dict]]] = None) -> NearDuplicateDetector:
+    return NearDuplicateDetector(
+        db,
+        mode=os.environ.get("NEAR_DUP_MODE", "flag"),
+        max_distance=int(os.environ.get("NEAR_DUP_MAX_DISTANCE", str(DEFAULT_MAX_DISTANCE))),
+        max_users=int(os.environ.get("SEARCH_INDEX_MAX_USERS", "1000")),
+        ttl_seconds=float(os.environ.get("SEARCH_INDEX_TTL_SECONDS", "600")),
+        pending=pending,
+        window=int(os.environ.get("NEAR_DUP_WINDOW", "500")),
+    )
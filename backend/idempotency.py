@@ -0,0 +1,142 @@
+"""Idempotency keys for POST generation endpoints.
+
+A request carrying an `Idempotency-Key` header claims `<scope>:<key>` in the
+`idempotency_keys` collection before doing any work, then stores its final
+response there.  A retry with the same key and body gets the stored response
+without another LLM call or insert; a retry arriving while the original is
+still running waits for it (in-process via single-flight, across workers by
+polling the claim).  Documents expire through a TTL index on `expires_at`.
+
+Errors are not stored, and neither is a result the caller's `final` check
+rejects (e.g. a fallback served past the LLM deadline): the key is released
+so the client's retry runs again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+
+from singleflight import SingleFlight
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    pass
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    """The key was already used with a different request body"""
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """The original request is still running on another worker after the wait limit"""
+
+
+def request_fingerprint(scope: str, body: Any) -> str:
+    payload = json.dumps(jsonable_encoder(body), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{scope}\n{payload}".encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Claims, stored responses and in-flight attachment for idempotency keys"""
+
+    def __init__(self, collection, ttl_seconds: float = 86400, lease_seconds: float = 300,
+                 wait_seconds: float = 120, poll_seconds: float = 0.25):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        # An unfinished claim (crashed worker) expires after the lease so the key is usable again
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._local = SingleFlight()
+        self.replays = 0
+        self.attached_polls = 0
+        self.released = 0
+
+    async def run(self, scope: str, key: str, body: Any, fn: Callable[[], Awaitable[Any]],
+                  final: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """Run `fn` at most once per (scope, key); returns (response, replayed).
+
+        A result for which `final` returns False is returned but not stored.
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        doc_id = f"{scope}:{key}"
+        fingerprint = request_fingerprint(scope, body)
+        # Same-process retries of the same request share one execution
+        return await self._local.do((doc_id, fingerprint), lambda: self._run(doc_id, fingerprint, fn, final))
+
+    async def _run(self, doc_id: str, fingerprint: str, fn: Callable[[], Awaitable[Any]],
+                   final: Optional[Callable[[Any], bool]]) -> Tuple[Any, bool]:
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while True:
+            now = datetime.utcnow()
+            try:
+                await self.collection.insert_one({
+                    "_id": doc_id,
+                    "fingerprint": fingerprint,
+                    "status": "in_progress",
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.lease_seconds),
+                })
+                return await self._execute(doc_id, fn, final), False
+            except DuplicateKeyError:
+                pass
+
+            existing = await self.collection.find_one({"_id": doc_id})
+            if existing is None or existing["expires_at"] <= now:
+                # Failed original released the key, its lease ran out, or the TTL monitor has not run yet
+                await self.collection.delete_one({"_id": doc_id, "expires_at": {"$lte": now}})
+                continue
+            if existing["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+            if existing["status"] == "completed":
+                self.replays += 1
+                return existing["response"], True
+            if asyncio.get_running_loop().time() >= deadline:
+                raise IdempotencyInProgress("The original request with this Idempotency-Key is still running")
+            self.attached_polls += 1
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _execute(self, doc_id: str, fn: Callable[[], Awaitable[Any]],
+                       final: Optional[Callable[[Any], bool]]) -> Any:
+        try:
+            result = await fn()
+        except BaseException:
+            # Errors are not stored: release the key so the client's retry runs again
+            await self.collection.delete_one({"_id": doc_id, "status": "in_progress"})
+            raise
+        if final is not None and not final(result):
+            # Neither is a stand-in result: the retry should get a real one
+            await self.collection.delete_one({"_id": doc_id, "status": "in_progress"})
+            self.released += 1
+            return result
+        await self.collection.update_one({"_id": doc_id}, {"$set": {
+            "status": "completed",
+            "response": jsonable_encoder(result),
+            "completed_at": datetime.utcnow(),
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+        }})
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "replays": self.replays,
+            "attached_polls": self.attached_polls,
+            "released": self.released,
+            "in_process": self._local.stats(),
+        }
+
+
+def idempotency_store_from_env(db) -> IdempotencyStore:
+    return IdempotencyStore(
+        db.idempotency_keys,
+        ttl_seconds=float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400")),
+        lease_seconds=float(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "300")),
+    )
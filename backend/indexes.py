@@ -0,0 +1,75 @@
+"""Index definitions for the collections behind the hot API queries.
+
+`ensure_indexes` runs at startup; creating an index that already exists is a
+no-op, so it is safe on every boot and from every worker.
+
+Users are upserted by name through a unique, sparse `name_key`.  Profiles
+written before it existed may share a name, so at startup the oldest user of
+each unclaimed name takes the key and any other keeps its profile without one.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        # get_user_profile / daily plan scheduler walk
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # create_user_profile upserts by name; unique so concurrent creates of one name make one user
+        IndexModel([("name_key", ASCENDING)], name="name_key_unique", unique=True, sparse=True),
+    ],
+    "content": [
+        # history, prompt context and keyset pages: find({"user_id"}).sort([("created_at", -1), ("id", -1)])
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+                   name="user_id_created_at_id"),
+        # bulk import skips documents that already exist
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # /content/search?backend=text: per-user full-text search, caption matches weigh most
+        IndexModel([("user_id", ASCENDING), ("caption", TEXT), ("hooks", TEXT), ("script", TEXT)],
+                   name="user_id_text", weights={"caption": 3, "hooks": 2, "script": 1}),
+    ],
+    "creator_context": [
+        # one materialized prompt context per user
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "daily_plans": [
+        # today's plan lookup, date-range reads and the atomic per-day upserts
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING)], name="user_id_date_unique", unique=True),
+    ],
+    "idempotency_keys": [
+        # stored responses and abandoned claims expire on their own
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """Create every declared index; failures are logged so the API still starts"""
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except PyMongoError as e:
+            # e.g. duplicate (user_id, date) plans written before the unique index existed
+            logger.error(f"Could not create indexes on {collection_name}: {str(e)}")
+    try:
+        await claim_user_names(db)
+    except PyMongoError as e:
+        logger.error(f"Could not claim user names: {str(e)}")
+
+
+async def claim_user_names(db):
+    """Give the oldest user of each name without an owner the `name_key` create_user_profile matches on"""
+    unclaimed = db.users.aggregate([
+        {"$match": {"name_key": {"$exists": False}}},
+        {"$sort": {"created_at": ASCENDING}},
+        {"$group": {"_id": "$name", "id": {"$first": "$id"}}},
+    ])
+    async for user in unclaimed:
+        try:
+            await db.users.update_one({"id": user["id"]}, {"$set": {"name_key": user["_id"]}})
+        except DuplicateKeyError:
+            # A duplicate from before the index: the name already belongs to another user
+            pass
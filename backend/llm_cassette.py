@@ -0,0 +1,191 @@
+"""Record/replay "cassette" for LLM calls.
+
+`CassetteProvider` wraps a gateway provider.  In record mode every call goes
+to the wrapped provider and the response is appended, with its observed
+latency, to a JSONL store keyed by the prompt hash.  In replay mode responses
+are served from the store, optionally sleeping for the recorded latency
+(scaled), so captured traffic becomes a deterministic offline corpus for the
+parsing and persistence paths.
+
+Environment:
+- LLM_CASSETTE_MODE: off (default) | record | replay
+- LLM_CASSETTE_PATH: store file (default llm_cassette.jsonl; a .gz suffix gzips it)
+- LLM_CASSETTE_REPLAY_LATENCY: multiplier for recorded latency (default 0 = instant)
+- LLM_CASSETTE_ON_MISS: error (default) | passthrough to the real provider
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from caching import prompt_cache_key
+from llm_gateway import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+REPLAY_CHUNK_SIZE = 16
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def load_cassette(path: str) -> Dict[str, dict]:
+    """Read a store into {prompt hash: entry}; later entries win"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with _open(path, "r") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                logger.warning(f"Skipping unreadable cassette line in {path}")
+                continue
+            entries[entry["key"]] = entry
+    return entries
+
+
+class CassetteProvider(LLMProvider):
+    """Records or replays the wrapped provider's responses"""
+
+    name = "cassette"
+
+    def __init__(self, mode: str, path: str, inner: Optional[LLMProvider] = None,
+                 replay_latency: float = 0.0, on_miss: str = "error", model: str = "cassette", **kwargs):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        if inner is None and (mode == "record" or on_miss == "passthrough"):
+            raise ValueError(f"Cassette mode '{mode}' (on miss: {on_miss}) needs a provider to call")
+        super().__init__(inner.model if inner else model, **kwargs)
+        self.mode = mode
+        self.path = path
+        self.inner = inner
+        self.replay_latency = replay_latency
+        self.on_miss = on_miss
+        self.entries = load_cassette(path)
+        self._writer = None
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    @property
+    def key(self) -> str:
+        return self.inner.key if self.inner else f"cassette/{self.model}"
+
+    @staticmethod
+    def prompt_key(system_message: str, user_prompt: str) -> str:
+        # Model-independent so a capture can be replayed under any provider config
+        return prompt_cache_key("", system_message, user_prompt)
+
+    def _record(self, key: str, response: str, latency: float):
+        entry = {"key": key, "model": self.inner.key, "latency_ms": round(latency * 1000, 1), "response": response}
+        self.entries[key] = entry
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._writer = _open(self.path, "a")
+        self._writer.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._writer.flush()
+        self.recorded += 1
+
+    def _lookup(self, system_message: str, user_prompt: str) -> Optional[dict]:
+        entry = self.entries.get(self.prompt_key(system_message, user_prompt))
+        if entry is None:
+            self.misses += 1
+            if self.on_miss != "passthrough":
+                raise CassetteMiss(f"No recorded response for this prompt in {self.path}")
+        else:
+            self.hits += 1
+        return entry
+
+    async def _complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        if self.mode == "record":
+            started = time.perf_counter()
+            response = await self.inner.complete(system_message, user_prompt, session_id)
+            self._record(self.prompt_key(system_message, user_prompt), response, time.perf_counter() - started)
+            return response
+
+        entry = self._lookup(system_message, user_prompt)
+        if entry is None:
+            return await self.inner.complete(system_message, user_prompt, session_id)
+        if self.replay_latency:
+            await asyncio.sleep(entry["latency_ms"] / 1000 * self.replay_latency)
+        return entry["response"]
+
+    async def _stream(self, system_message: str, user_prompt: str, session_id: str) -> AsyncIterator[str]:
+        if self.mode == "record":
+            started = time.perf_counter()
+            chunks = []
+            async for chunk in self.inner.stream(system_message, user_prompt, session_id):
+                chunks.append(chunk)
+                yield chunk
+            self._record(self.prompt_key(system_message, user_prompt), "".join(chunks),
+                         time.perf_counter() - started)
+            return
+
+        entry = self._lookup(system_message, user_prompt)
+        if entry is None:
+            async for chunk in self.inner.stream(system_message, user_prompt, session_id):
+                yield chunk
+            return
+        response = entry["response"]
+        chunks = [response[i:i + REPLAY_CHUNK_SIZE] for i in range(0, len(response), REPLAY_CHUNK_SIZE)] or [""]
+        # Spread the recorded latency over the chunks like a token stream
+        per_chunk = entry["latency_ms"] / 1000 * self.replay_latency / len(chunks)
+        for chunk in chunks:
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield chunk
+
+    async def warm(self):
+        if self.inner is not None:
+            await self.inner.warm()
+
+    async def aclose(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.inner is not None:
+            await self.inner.aclose()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "mode": self.mode,
+            "path": self.path,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+        }
+
+
+def cassette_from_env(mode: str, build_inner: Callable[[], LLMProvider]) -> CassetteProvider:
+    """Wrap the configured provider; replay without passthrough never builds it (no API key needed)"""
+    on_miss = os.environ.get("LLM_CASSETTE_ON_MISS", "error")
+    inner = build_inner() if mode == "record" or on_miss == "passthrough" else None
+    return CassetteProvider(
+        mode,
+        os.environ.get("LLM_CASSETTE_PATH", "llm_cassette.jsonl"),
+        inner,
+        replay_latency=float(os.environ.get("LLM_CASSETTE_REPLAY_LATENCY", "0")),
+        on_miss=on_miss,
+        model=os.environ.get("LLM_MODEL", "gpt-5-mini"),
+        max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+        timeout_seconds=float(os.environ.get("LLM_TIMEOUT_SECONDS", "120")),
+    )
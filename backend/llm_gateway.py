@@ -0,0 +1,451 @@
+"""LLM gateway: long-lived provider clients behind one async interface.
+
+The generation helpers in server.py talk to `LLMGateway` instead of building
+an `LlmChat` themselves.  Each provider owns its client for the life of the
+process and enforces its own concurrency limit and timeout.
+
+Providers (LLM_GATEWAY_PROVIDER):
+- emergent: emergentintegrations `LlmChat`.  An `LlmChat` keeps the
+  conversation history of its session, so one is still built per call; the
+  SDK's HTTP transport is managed inside the SDK.  The SDK (and its heavy
+  transitive dependencies) is imported on the first call, or by `warm()`.
+- http: any OpenAI-compatible /chat/completions endpoint over a single pooled
+  keep-alive httpx client (LLM_HTTP_BASE_URL, LLM_HTTP_API_KEY).
+- fake: in-process stand-in with configurable latency for offline benchmarks.
+
+LLM_CASSETTE_MODE=record|replay wraps the provider in a record/replay cassette
+(see llm_cassette.py).
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+
+
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMDeadlineExceeded(LLMTimeout):
+    pass
+
+
+class LLMProvider:
+    """Base provider: concurrency limit, timeout and call counters around `_complete`"""
+
+    name = "base"
+
+    def __init__(self, model: str, max_concurrency: int = 16, timeout_seconds: float = 120.0):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.model}"
+
+    async def complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        async with self._semaphore:
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    self._complete(system_message, user_prompt, session_id), self.timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise LLMTimeout(f"{self.key} did not answer within {self.timeout_seconds}s")
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self.calls += 1
+                self.total_latency += time.perf_counter() - started
+
+    async def stream(self, system_message: str, user_prompt: str, session_id: str) -> AsyncIterator[str]:
+        async with self._semaphore:
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(self.timeout_seconds):
+                    async for chunk in self._stream(system_message, user_prompt, session_id):
+                        yield chunk
+            except TimeoutError:
+                self.timeouts += 1
+                raise LLMTimeout(f"{self.key} did not finish streaming within {self.timeout_seconds}s")
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self.calls += 1
+                self.total_latency += time.perf_counter() - started
+
+    async def _complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        raise NotImplementedError
+
+    async def _stream(self, system_message: str, user_prompt: str, session_id: str) -> AsyncIterator[str]:
+        # Providers without token streaming deliver the whole response as one chunk
+        yield await self._complete(system_message, user_prompt, session_id)
+
+    async def warm(self):
+        """Load clients ahead of the first call (startup pre-warming); no-op by default"""
+        return None
+
+    async def aclose(self):
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout_seconds,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_latency_ms": round(self.total_latency / self.calls * 1000, 1) if self.calls else 0.0,
+        }
+
+
+class EmergentProvider(LLMProvider):
+    """emergentintegrations LlmChat (the SDK is imported on first use)"""
+
+    name = "emergent"
+
+    def __init__(self, api_key: str, model_provider: str, model: str, **kwargs):
+        super().__init__(model, **kwargs)
+        self._chat_class = None
+        self._message_class = None
+        self.api_key = api_key
+        self.model_provider = model_provider
+
+    @property
+    def key(self) -> str:
+        return f"{self.model_provider}/{self.model}"
+
+    def _load_sdk(self):
+        if self._chat_class is None:
+            from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+            self._chat_class = LlmChat
+            self._message_class = UserMessage
+
+    async def warm(self):
+        # The import is slow and blocking; keep the event loop free while it runs
+        await asyncio.to_thread(self._load_sdk)
+
+    async def _complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        self._load_sdk()
+        chat = self._chat_class(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(self.model_provider, self.model)
+        return await chat.send_message(self._message_class(text=user_prompt))
+
+
+class HTTPProvider(LLMProvider):
+    """OpenAI-compatible chat completions over one keep-alive connection pool"""
+
+    name = "http"
+
+    def __init__(self, base_url: str, api_key: str, model: str, **kwargs):
+        super().__init__(model, **kwargs)
+        import httpx
+
+        self.base_url = base_url
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(self.timeout_seconds, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+                keepalive_expiry=60.0,
+            ),
+        )
+
+    def _payload(self, system_message: str, user_prompt: str, stream: bool = False) -> dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_prompt},
+            ],
+            "stream": stream,
+        }
+
+    async def _complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        response = await self._client.post("/chat/completions", json=self._payload(system_message, user_prompt))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def _stream(self, system_message: str, user_prompt: str, session_id: str) -> AsyncIterator[str]:
+        payload = self._payload(system_message, user_prompt, stream=True)
+        async with self._client.stream("POST", "/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def fake_response(system_message: str, user_prompt: str) -> str:
+    """Plausible JSON for the prompts server.py sends"""
+    if "content plan for each of these dates" in user_prompt:
+        dates = re.findall(r"\d{4}-\d{2}-\d{2}", user_prompt.split("\n", 1)[0])
+        return json.dumps({
+            date: [{"platform": "Instagram", "content_type": "Reel", "topic": f"Plan for {date}",
+                    "reasoning": "Consistent daily posting builds reach"}]
+            for date in dates
+        })
+    if "daily content plan" in user_prompt:
+        return json.dumps([
+            {"platform": "Instagram", "content_type": "Reel", "topic": "Behind the scenes",
+             "reasoning": "Authentic content drives saves"},
+            {"platform": "TikTok", "content_type": "Video", "topic": "Quick tip",
+             "reasoning": "Short actionable advice is shared widely"},
+        ])
+    if "repeats lines the creator has already used" in user_prompt:
+        angle = random.choice(["myth", "mistake", "question", "story", "number", "confession"])
+        return json.dumps({
+            "hooks": [f"The {angle} behind take #{random.randint(100, 999)}" for _ in range(3)],
+            "caption": f"A new {angle} for you #{random.randint(100, 999)}",
+        })
+    return json.dumps({
+        "hooks": ["You are doing this wrong", "Nobody talks about this", "Try this today"],
+        "script": "Open with the problem. Show the fix in three steps. Close with a call to action. " * 8,
+        "caption": "Save this for later #creator #tips",
+    })
+
+
+class FakeProvider(LLMProvider):
+    """In-process provider with configurable latency, for tests and offline benchmarks"""
+
+    name = "fake"
+
+    def __init__(self, model: str = "fake", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 responder: Callable[[str, str], str] = fake_response, chunk_size: int = 16, **kwargs):
+        super().__init__(model, **kwargs)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.responder = responder
+        self.chunk_size = chunk_size
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    async def _complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self.responder(system_message, user_prompt)
+
+    async def _stream(self, system_message: str, user_prompt: str, session_id: str) -> AsyncIterator[str]:
+        response = self.responder(system_message, user_prompt)
+        chunks = [response[i:i + self.chunk_size] for i in range(0, len(response), self.chunk_size)] or [""]
+        # Spread the configured latency over the chunks like a token stream
+        per_chunk = self._delay() / len(chunks)
+        for chunk in chunks:
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield chunk
+
+
+class LLMGateway:
+    """Entry point for LLM calls: primary provider, optional hedge/fallback provider and an overall deadline.
+
+    With a second provider, a completion still running after the hedge delay
+    (fixed, or "auto" = p90 of recent primary latencies) is duplicated on the
+    second provider; the first success wins and the loser is cancelled.  Only
+    the slowest ~10% of calls are hedged, so spend grows by roughly that much.
+    A primary that fails outright falls back to the second provider.
+    """
+
+    def __init__(self, providers: List[LLMProvider], hedge_delay: Union[float, str, None] = "auto",
+                 deadline_seconds: Optional[float] = None):
+        self.providers: Dict[str, LLMProvider] = {}
+        for provider in providers:
+            key = provider.key if provider.key not in self.providers else f"{provider.key}#{len(self.providers)}"
+            self.providers[key] = provider
+        self.primary = providers[0]
+        self.secondary = providers[1] if len(providers) > 1 else None
+        self.hedge_delay = hedge_delay
+        self.deadline_seconds = deadline_seconds
+        self.latencies = deque(maxlen=HEDGE_WINDOW)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.deadlines_exceeded = 0
+
+    @property
+    def model_key(self) -> str:
+        return self.primary.key
+
+    def current_hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None to not hedge (no second provider or too few samples)"""
+        if self.secondary is None or self.hedge_delay is None:
+            return None
+        if self.hedge_delay != "auto":
+            return float(self.hedge_delay)
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.9)]
+
+    async def complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        if not self.deadline_seconds:
+            return await self._complete(system_message, user_prompt, session_id)
+        try:
+            return await asyncio.wait_for(
+                self._complete(system_message, user_prompt, session_id), self.deadline_seconds
+            )
+        except asyncio.TimeoutError:
+            self.deadlines_exceeded += 1
+            raise LLMDeadlineExceeded(f"No LLM response within the {self.deadline_seconds}s deadline")
+
+    async def _complete(self, system_message: str, user_prompt: str, session_id: str) -> str:
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self.primary.complete(system_message, user_prompt, session_id))
+        tasks = {primary}
+        try:
+            if self.secondary is not None:
+                done, _ = await asyncio.wait(tasks, timeout=self.current_hedge_delay())
+                if done and primary.exception() is not None:
+                    self.fallbacks += 1
+                    self.latencies.append(time.perf_counter() - started)
+                    return await self.secondary.complete(system_message, user_prompt, session_id)
+                if not done:
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(
+                        self.secondary.complete(system_message, user_prompt, session_id)
+                    ))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is primary:
+                        self.latencies.append(time.perf_counter() - started)
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task.done():
+                    continue
+                if task is primary:
+                    # A cancelled primary took at least this long; keeps the p90 from drifting down
+                    self.latencies.append(time.perf_counter() - started)
+                task.cancel()
+
+    async def stream(self, system_message: str, user_prompt: str, session_id: str) -> AsyncIterator[str]:
+        # Streams are not hedged, but fail over if the primary errors before its first chunk
+        started_streaming = False
+        try:
+            async for chunk in self.primary.stream(system_message, user_prompt, session_id):
+                started_streaming = True
+                yield chunk
+        except Exception:
+            if started_streaming or self.secondary is None:
+                raise
+            self.fallbacks += 1
+            async for chunk in self.secondary.stream(system_message, user_prompt, session_id):
+                yield chunk
+
+    async def warm(self):
+        await asyncio.gather(*(provider.warm() for provider in self.providers.values()))
+
+    async def aclose(self):
+        for provider in self.providers.values():
+            await provider.aclose()
+
+    def stats(self) -> dict:
+        stats = {key: provider.stats() for key, provider in self.providers.items()}
+        delay = self.current_hedge_delay()
+        stats["routing"] = {
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            "deadline_seconds": self.deadline_seconds,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "deadlines_exceeded": self.deadlines_exceeded,
+        }
+        return stats
+
+
+def build_provider(kind: str, api_key: Optional[str] = None, model: Optional[str] = None) -> LLMProvider:
+    """Build one provider from the LLM_* env vars"""
+    limits = {
+        "max_concurrency": int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+        "timeout_seconds": float(os.environ.get("LLM_TIMEOUT_SECONDS", "120")),
+    }
+    model_name = model or os.environ.get("LLM_MODEL", "gpt-5-mini")
+    if kind == "emergent":
+        if not api_key:
+            raise KeyError("EMERGENT_LLM_KEY")
+        return EmergentProvider(api_key, os.environ.get("LLM_MODEL_PROVIDER", "openai"), model_name, **limits)
+    if kind == "http":
+        return HTTPProvider(
+            os.environ["LLM_HTTP_BASE_URL"], os.environ.get("LLM_HTTP_API_KEY", ""), model_name, **limits
+        )
+    if kind == "fake":
+        return FakeProvider(
+            latency_ms=float(os.environ.get("FAKE_LLM_LATENCY_MS", "0")),
+            jitter_ms=float(os.environ.get("FAKE_LLM_JITTER_MS", "0")),
+            model=model or "fake",
+            **limits,
+        )
+    raise ValueError(f"Unknown LLM provider '{kind}'")
+
+
+def gateway_from_env(api_key: Optional[str] = None) -> LLMGateway:
+    """Gateway from env: LLM_GATEWAY_PROVIDER, optional LLM_HEDGE_PROVIDER/LLM_HEDGE_MODEL,
+    LLM_HEDGE_DELAY_MS (milliseconds or "auto") and LLM_DEADLINE_SECONDS (0 disables)"""
+    kind = os.environ.get("LLM_GATEWAY_PROVIDER", "emergent")
+    cassette_mode = os.environ.get("LLM_CASSETTE_MODE", "off")
+    if cassette_mode == "off":
+        providers = [build_provider(kind, api_key)]
+    else:
+        from llm_cassette import cassette_from_env
+
+        providers = [cassette_from_env(cassette_mode, lambda: build_provider(kind, api_key))]
+
+    hedge_kind = os.environ.get("LLM_HEDGE_PROVIDER")
+    if hedge_kind:
+        providers.append(build_provider(hedge_kind, api_key, os.environ.get("LLM_HEDGE_MODEL")))
+
+    hedge_delay = os.environ.get("LLM_HEDGE_DELAY_MS", "auto")
+    return LLMGateway(
+        providers,
+        hedge_delay=hedge_delay if hedge_delay == "auto" else float(hedge_delay) / 1000,
+        deadline_seconds=float(os.environ.get("LLM_DEADLINE_SECONDS", "60")) or None,
+    )
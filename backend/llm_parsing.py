@@ -0,0 +1,188 @@
+"""JSON extraction and validation for LLM responses.
+
+Models do not always answer with bare JSON: they wrap it in markdown fences,
+add a sentence before or after it, or stop mid-object at the token limit.
+`extract_json` recovers the value in those cases instead of discarding the
+generation, reporting how it got there:
+
+- ok: the whole response is JSON,
+- extracted: a JSON value found inside a fence or surrounding prose,
+- repaired: a truncated value closed off (an open string is terminated; if
+  that is not enough, the incomplete last member is dropped),
+- failed: nothing usable.
+
+The scanner jumps between structural characters with a regex (brackets,
+quotes and commas outside strings; only quotes and backslashes inside them)
+and each candidate span is decoded once, so the cost stays linear in the
+response size even for long scripts.
+
+`validate_content` and `validate_plan_items` check the parsed value against
+the fields the API stores and name what is missing, so the caller can ask the
+model for just those fields.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+CONTENT_FIELDS = ("hooks", "script", "caption")
+PLAN_ITEM_FIELDS = ("platform", "content_type", "topic", "reasoning")
+
+FENCE = "```"
+_STRUCTURE = re.compile(r'[{}\[\]",]')
+_STRING_END = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _closing(stack) -> str:
+    """Closing brackets for a stack of (closer, parent) links, innermost first"""
+    closers = []
+    while stack is not None:
+        closers.append(stack[0])
+        stack = stack[1]
+    return "".join(closers)
+
+
+def _scan(text: str, offset: int = 0):
+    """Top-level balanced {...}/[...] spans, plus the state of an unterminated last one.
+
+    Brackets outside a span and quotes in the prose around it are ignored, and
+    string contents are skipped to their closing quote.  The open-bracket stack
+    is a linked list, so keeping a copy at the last point the value could be
+    cut and closed costs nothing.
+    """
+    spans = []
+    stack = None
+    start = 0
+    in_string = False
+    escape_pending = False
+    # (position, stack) after which the text can be cut and closed: after an opener,
+    # a nested value or before a comma
+    cut = None
+    position = offset
+    while True:
+        match = (_STRING_END if in_string else _STRUCTURE).search(text, position)
+        if match is None:
+            break
+        position = match.end()
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                position += 1  # skip the escaped character
+                escape_pending = position > len(text)
+            else:
+                in_string = False
+            continue
+        if stack is None:
+            if char in _CLOSERS:
+                start = match.start()
+                stack = (_CLOSERS[char], None)
+                cut = (position, stack)
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack = (_CLOSERS[char], stack)
+            cut = (position, stack)
+        elif char in "}]":
+            if char != stack[0]:
+                stack = None  # mismatched bracket: not JSON, look for the next span
+                continue
+            stack = stack[1]
+            if stack is None:
+                spans.append((start, position))
+            else:
+                cut = (position, stack)
+        elif char == ",":
+            cut = (match.start(), stack)
+    tail = None
+    if stack is not None:
+        tail = {"start": start, "in_string": in_string, "escape_pending": escape_pending,
+                "stack": stack, "cut": cut}
+    return spans, tail
+
+
+def _decode(candidate: str, expect) -> Optional[Any]:
+    try:
+        value = json.loads(candidate)
+    except ValueError:
+        return None
+    return value if isinstance(value, expect) else None
+
+
+def _repair(text: str, tail: dict, expect) -> Optional[Any]:
+    body = text[tail["start"]:]
+    if tail["in_string"]:
+        if tail["escape_pending"]:
+            body = body[:-1]
+        value = _decode(body + '"' + _closing(tail["stack"]), expect)
+    else:
+        value = _decode(body.rstrip().rstrip(",") + _closing(tail["stack"]), expect)
+    if value is None and tail["cut"] is not None:
+        position, stack = tail["cut"]
+        value = _decode(text[tail["start"]:position] + _closing(stack), expect)
+    return value
+
+
+def extract_json(text: str, expect=(dict, list)) -> Tuple[Optional[Any], str]:
+    """The first JSON value of type `expect` in an LLM response, and how it was found"""
+    value = _decode(text.strip(), expect)
+    if value is not None:
+        return value, "ok"
+    # A fenced block is where the model put its answer; prose before it may hold stray brackets
+    fence = text.find(FENCE)
+    offsets = (fence, 0) if fence > 0 else (0,)
+    tail = None
+    for offset in offsets:
+        spans, tail = _scan(text, offset)
+        for start, end in spans:
+            value = _decode(text[start:end], expect)
+            if value is not None:
+                return value, "extracted"
+        if tail is not None:
+            value = _repair(text, tail, expect)
+            if value is not None:
+                return value, "repaired"
+    return None, "failed"
+
+
+def validate_content(data: dict) -> Tuple[dict, List[str]]:
+    """The usable hooks/script/caption of a parsed response, and the names of those missing"""
+    content = {}
+    hooks = data.get("hooks")
+    if isinstance(hooks, str):
+        hooks = [hooks]
+    if isinstance(hooks, list):
+        hooks = [hook.strip() for hook in hooks if isinstance(hook, str) and hook.strip()]
+        if hooks:
+            content["hooks"] = hooks
+    for field in ("script", "caption"):
+        if isinstance(data.get(field), str) and data[field].strip():
+            content[field] = data[field]
+    return content, [field for field in CONTENT_FIELDS if field not in content]
+
+
+def plan_item_list(value) -> Optional[list]:
+    """The list of plan ideas, also when the model wrapped it in an object"""
+    if isinstance(value, dict):
+        value = next((item for item in value.values() if isinstance(item, list)), None)
+    return value if isinstance(value, list) else None
+
+
+def validate_plan_items(items) -> Tuple[List[Optional[dict]], List[Tuple[int, List[str]]]]:
+    """Per idea, its usable fields (None if it is not an object) and the positions still missing some"""
+    validated, incomplete = [], []
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict):
+            validated.append(None)
+            continue
+        fields = {field: item[field] for field in PLAN_ITEM_FIELDS
+                  if isinstance(item.get(field), str) and item[field].strip()}
+        validated.append(fields)
+        missing = [field for field in PLAN_ITEM_FIELDS if field not in fields]
+        if missing:
+            incomplete.append((position, missing))
+    return validated, incomplete
+
+
+def complete_plan_items(validated: List[Optional[dict]]) -> List[dict]:
+    return [item for item in validated if item is not None and len(item) == len(PLAN_ITEM_FIELDS)]
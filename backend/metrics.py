@@ -0,0 +1,309 @@
+"""Prometheus-style metrics for the Creator OS API.
+
+A small dependency-free registry of counters, gauges and histograms rendered
+in the Prometheus text exposition format at GET /metrics.  Recording is a dict
+lookup plus a bisect, cheap enough to leave on in production; METRICS_ENABLED=0
+turns every recorder into a no-op and removes the middleware and Mongo
+listener entirely.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Sequence, Tuple
+
+from pymongo import monitoring
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self):
+        for key, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+LLM_REQUEST_DURATION = registry.register(Histogram(
+    "llm_request_duration_seconds", "LLM call latency by model", ("model", "outcome")
+))
+LLM_ERRORS = registry.register(Counter(
+    "llm_errors_total", "Failed LLM calls by model and error type", ("model", "error")
+))
+LLM_PROMPT_CHARS = registry.register(Histogram(
+    "llm_prompt_chars", "Prompt size in characters (system message + user prompt)", ("kind",), SIZE_BUCKETS
+))
+LLM_RESPONSE_CHARS = registry.register(Histogram(
+    "llm_response_chars", "LLM response size in characters", ("kind",), SIZE_BUCKETS
+))
+LLM_PROMPT_TOKENS = registry.register(Counter(
+    "llm_prompt_tokens_total", "Prompt tokens sent (estimated unless METRICS_TOKENIZER=tiktoken)", ("kind",)
+))
+LLM_RESPONSE_TOKENS = registry.register(Counter(
+    "llm_response_tokens_total", "Response tokens received (estimated unless METRICS_TOKENIZER=tiktoken)", ("kind",)
+))
+LLM_PARSE_RESULTS = registry.register(Counter(
+    "llm_json_parse_total", "LLM response JSON parse outcomes (ok, extracted, repaired, partial or fallback)",
+    ("kind", "outcome")
+))
+LLM_REASK_RESULTS = registry.register(Counter(
+    "llm_reask_total", "Follow-up LLM calls for fields a response left out, by whether they filled them",
+    ("kind", "outcome")
+))
+LLM_DEGRADED_RESULTS = registry.register(Counter(
+    "llm_degraded_total", "Responses served after an LLM timeout, from cache or a canned fallback", ("kind", "source")
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "admission_in_flight", "Admitted LLM-backed requests currently running"
+))
+ADMISSION_QUEUE_DEPTH = registry.register(Gauge(
+    "admission_queue_depth", "LLM-backed requests waiting for a global concurrency slot"
+))
+ADMISSION_WAIT = registry.register(Histogram(
+    "admission_wait_seconds", "Time LLM-backed requests spent queued for admission"
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "admission_rejected_total", "LLM-backed requests rejected with 429 by reason", ("reason",)
+))
+CONTENT_NEAR_DUPLICATES = registry.register(Counter(
+    "content_near_duplicates_total", "Generated hooks/captions matching the creator's past content", ("field", "action")
+))
+CONTENT_WRITE_BEHIND = registry.register(Counter(
+    "content_write_behind_total", "Buffered content documents flushed to Mongo or spilled to disk", ("outcome",)
+))
+MONGO_OPERATION_DURATION = registry.register(Histogram(
+    "mongo_operation_duration_seconds", "MongoDB command latency by collection", ("collection", "command", "outcome")
+))
+
+
+# ============ Token counting ============
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count for metrics: ~4 chars per token, or exact with METRICS_TOKENIZER=tiktoken"""
+    global _encoding
+    if os.environ.get("METRICS_TOKENIZER") != "tiktoken":
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        import tiktoken
+
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text))
+
+
+def record_llm_call(kind: str, model: str, system_message: str, user_prompt: str, response: str,
+                    duration: float):
+    if not METRICS_ENABLED:
+        return
+    LLM_REQUEST_DURATION.observe(duration, model=model, outcome="ok")
+    prompt = system_message + user_prompt
+    LLM_PROMPT_CHARS.observe(len(prompt), kind=kind)
+    LLM_RESPONSE_CHARS.observe(len(response), kind=kind)
+    LLM_PROMPT_TOKENS.inc(count_tokens(prompt), kind=kind)
+    LLM_RESPONSE_TOKENS.inc(count_tokens(response), kind=kind)
+
+
+def record_llm_error(model: str, error: Exception, duration: float):
+    LLM_REQUEST_DURATION.observe(duration, model=model, outcome="error")
+    LLM_ERRORS.inc(model=model, error=type(error).__name__)
+
+
+def record_parse(kind: str, outcome: str):
+    LLM_PARSE_RESULTS.inc(kind=kind, outcome=outcome)
+
+
+def record_reask(kind: str, filled: bool):
+    LLM_REASK_RESULTS.inc(kind=kind, outcome="filled" if filled else "missing")
+
+
+def record_degraded(kind: str, source: str):
+    LLM_DEGRADED_RESULTS.inc(kind=kind, source=source)
+
+
+def record_near_duplicate(field: str, action: str):
+    CONTENT_NEAR_DUPLICATES.inc(field=field, action=action)
+
+
+def record_write_behind(outcome: str, count: int):
+    CONTENT_WRITE_BEHIND.inc(count, outcome=outcome)
+
+
+# ============ HTTP middleware ============
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by route template (not raw path)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
+
+
+# ============ MongoDB command listener ============
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records every MongoDB command's latency by collection (pass via event_listeners)"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if isinstance(collection, str):
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event, outcome: str):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_OPERATION_DURATION.observe(
+            event.duration_micros / 1e6, collection=collection, command=event.command_name, outcome=outcome
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
@@ -0,0 +1,52 @@
+"""Keyset pagination over (created_at, id), newest first.
+
+Cursors are opaque to clients: url-safe base64 of the last item's sort key.
+Every page is an index range scan starting right after that key, so deep
+pages cost the same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+KEYSET_SORT = [("created_at", -1), ("id", -1)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(item_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_query(base_query: dict, cursor: Optional[str]) -> dict:
+    """Restrict `base_query` to items strictly after `cursor` in KEYSET_SORT order"""
+    if not cursor:
+        return base_query
+    created_at, item_id = decode_cursor(cursor)
+    return {
+        **base_query,
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": item_id}},
+        ],
+    }
+
+
+def merge_keyset(items: List[dict], extra: Iterable[dict], cursor: Optional[str], limit: int) -> List[dict]:
+    """The first `limit` of `items` and `extra` in KEYSET_SORT order after `cursor`, one per id"""
+    after = decode_cursor(cursor) if cursor else None
+    merged = {item["id"]: item for item in extra if after is None or (item["created_at"], item["id"]) < after}
+    merged.update((item["id"], item) for item in items)
+    return sorted(merged.values(), key=lambda item: (item["created_at"], item["id"]), reverse=True)[:limit]
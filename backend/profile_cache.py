@@ -0,0 +1,78 @@
+"""In-process cache of UserProfile objects keyed by user id.
+
+Profiles change rarely but are read before every generation, so lookups are
+served from a bounded TTL/LRU cache.  Writes in this worker go through the
+cache directly; other workers' writes reach it through an optional Mongo
+change stream on `users` (PROFILE_CACHE_CHANGE_STREAM=1, needs a replica set),
+otherwise the TTL bounds how stale a profile can get.
+"""
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+from pymongo.errors import PyMongoError
+
+from caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileCache:
+    """Bounded TTL/LRU cache of profile objects with staleness tracking"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self._store = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.invalidations = 0
+        self.served_age_total = 0.0
+        self.served_age_max = 0.0
+
+    def get(self, user_id: str) -> Optional[Any]:
+        entry = self._store.get(user_id)
+        if entry is None:
+            return None
+        profile, cached_at = entry
+        age = time.monotonic() - cached_at
+        self.served_age_total += age
+        self.served_age_max = max(self.served_age_max, age)
+        return profile
+
+    def set(self, user_id: str, profile: Any):
+        self._store.set(user_id, (profile, time.monotonic()))
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one profile, or every profile when `user_id` is None"""
+        if user_id is None:
+            self._store.clear()
+        else:
+            self._store.delete(user_id)
+        self.invalidations += 1
+
+    async def watch_changes(self, collection, build_profile: Callable[[dict], Any]):
+        """Apply profile writes from other workers using a change stream on `collection`"""
+        try:
+            async with collection.watch(full_document="updateLookup") as stream:
+                logger.info("Profile cache is following the users change stream")
+                async for change in stream:
+                    document = change.get("fullDocument")
+                    if document and "id" in document:
+                        self.set(document["id"], build_profile(document))
+                    else:
+                        # Deletes only carry _id, so drop everything
+                        self.invalidate()
+        except PyMongoError as e:
+            logger.warning(f"Profile cache change stream unavailable, relying on TTL: {str(e)}")
+
+    def stats(self) -> dict:
+        stats = self._store.stats()
+        stats["invalidations"] = self.invalidations
+        stats["avg_served_age_seconds"] = round(self.served_age_total / stats["hits"], 3) if stats["hits"] else 0.0
+        stats["max_served_age_seconds"] = round(self.served_age_max, 3)
+        return stats
+
+
+def profile_cache_from_env() -> ProfileCache:
+    return ProfileCache(
+        max_entries=int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", "10000")),
+        ttl_seconds=float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "60")),
+    )
@@ -0,0 +1,64 @@
+"""Per-user revision counters for conditional GETs.
+
+`user_revisions` holds one small document per user with a counter per
+resource (`users`, `content`, `daily_plans`), incremented after every write
+to that resource.  Read routes derive a strong ETag from the counter (plus
+the query parameters that shape the response), so a matching
+`If-None-Match` is answered with 304 after a single `_id` lookup, without
+querying or serializing the documents themselves.
+
+Ordering keeps the ETags honest: writers change the data and then bump the
+counter; readers load the counter and then the data.  A response can
+therefore be newer than its ETag (the client just refetches once more) but
+never older.  Each revision document carries a random epoch, so counters
+restarting after the document is lost cannot reproduce an old ETag.
+"""
+import hashlib
+import uuid
+from typing import Iterable, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+RESOURCES = ("users", "content", "daily_plans")
+
+
+class RevisionStore:
+    def __init__(self, collection):
+        self.collection = collection
+        self.not_modified = 0
+
+    @staticmethod
+    def _update(resource: str) -> dict:
+        if resource not in RESOURCES:
+            raise ValueError(f"Unknown revision resource: {resource}")
+        return {"$inc": {resource: 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex[:12]}}
+
+    async def bump(self, user_id: str, resource: str) -> dict:
+        return await self.collection.find_one_and_update(
+            {"_id": user_id}, self._update(resource), upsert=True, return_document=ReturnDocument.AFTER
+        )
+
+    async def bump_many(self, user_ids: Iterable[str], resource: str):
+        operations = [UpdateOne({"_id": user_id}, self._update(resource), upsert=True) for user_id in set(user_ids)]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def get(self, user_id: str) -> dict:
+        return await self.collection.find_one({"_id": user_id}) or {}
+
+    def stats(self) -> dict:
+        return {"not_modified": self.not_modified}
+
+
+def revision_etag(revisions: dict, resource: str, *variant) -> str:
+    """Strong ETag for one representation of a user's resource at its current revision"""
+    key = "\n".join(str(part) for part in (revisions.get("epoch", ""), revisions.get(resource, 0), *variant))
+    return f'"{resource}.{revisions.get(resource, 0)}.{hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
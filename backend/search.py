@@ -0,0 +1,169 @@
+"""Search over a creator's content history.
+
+`BM25Index` is an in-process inverted index over one user's captions, hooks
+and scripts.  It is built once from Mongo on first use, then kept current by
+`ContentSearch.add` as content is inserted, so a query only touches the
+postings of its own terms.  The build is a scan of the user's history (or of
+its newest `window` items), paid by the first query and again after the TTL.
+Indexes are held per user in a bounded TTL cache; the TTL also bounds how
+long another API worker's inserts can be missing from this worker's index.
+
+Generation prompts use `search_loaded`, which answers only from an index
+already in memory and otherwise starts the build in the background, over a
+recent window of captions and hooks, so a request never waits for a scan.
+
+The `content` text index (see indexes.py) serves the same search from Mongo
+when `backend="text"` is requested.
+"""
+import heapq
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from user_indexes import UserIndexes
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its me my no not of on or our so "
+    "that the their them there they this to up was we what when who why will with you your".split()
+)
+# Field weights: a match in the caption says more about an item than one deep in the script
+FIELD_WEIGHTS = {"caption": 3, "hooks": 2, "script": 1}
+SNIPPET_FIELDS = ("id", "platform", "content_type", "caption", "created_at")
+SNIPPET_LENGTH = 200
+# Related items for prompts: what the audience saw, not the scripts
+RELATED_FIELD_WEIGHTS = {"caption": 3, "hooks": 2}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _document_terms(document: dict, field_weights: Dict[str, int] = FIELD_WEIGHTS) -> Counter:
+    terms = Counter()
+    for field, weight in field_weights.items():
+        value = document.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(value)
+        for token in tokenize(value):
+            terms[token] += weight
+    return terms
+
+
+class BM25Index:
+    """Incremental Okapi BM25 over weighted fields"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, field_weights: Dict[str, int] = FIELD_WEIGHTS):
+        self.k1 = k1
+        self.b = b
+        self.field_weights = field_weights
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.snippets: Dict[str, dict] = {}
+        self.total_length = 0
+        self.ready = False
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, document: dict):
+        doc_id = document["id"]
+        if doc_id in self.lengths:
+            return
+        terms = _document_terms(document, self.field_weights)
+        for term, frequency in terms.items():
+            self.postings[term][doc_id] = frequency
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+        snippet = {field: document.get(field) for field in SNIPPET_FIELDS}
+        snippet["caption"] = (snippet["caption"] or "")[:SNIPPET_LENGTH]
+        self.snippets[doc_id] = snippet
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """(doc id, score) pairs, best first"""
+        count = len(self.lengths)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+class ContentSearch:
+    """Per-user BM25 indexes over `db.content` (see user_indexes.py)"""
+
+    def __init__(self, db, max_users: int = 1000, ttl_seconds: float = 600,
+                 pending: Optional[Callable[[str], List[dict]]] = None,
+                 field_weights: Dict[str, int] = FIELD_WEIGHTS, window: Optional[int] = None):
+        self.indexes = UserIndexes(
+            db, lambda: BM25Index(field_weights=field_weights),
+            {"_id": 0, **{field: 1 for field in (*SNIPPET_FIELDS, *field_weights)}},
+            max_users=max_users, ttl_seconds=ttl_seconds, pending=pending, window=window,
+        )
+
+    @property
+    def builds(self) -> int:
+        return self.indexes.builds
+
+    def add(self, documents: Iterable[dict]):
+        """Fold newly inserted content into the indexes that are already loaded"""
+        self.indexes.add(documents)
+
+    async def search(self, user_id: str, query: str, limit: int = 10) -> List[dict]:
+        """Snippets of the best matches with their scores"""
+        return self._results(await self.indexes.index_for(user_id), query, limit)
+
+    def search_loaded(self, user_id: str, query: str, limit: int = 10) -> Optional[List[dict]]:
+        """Like `search` from an index already in memory; None (and a background build) otherwise"""
+        index = self.indexes.loaded(user_id)
+        return None if index is None else self._results(index, query, limit)
+
+    @staticmethod
+    def _results(index: BM25Index, query: str, limit: int) -> List[dict]:
+        return [{**index.snippets[doc_id], "score": round(score, 4)} for doc_id, score in index.search(query, limit)]
+
+    def stats(self) -> dict:
+        return self.indexes.stats()
+
+
+async def text_search(db, user_id: str, query: str, limit: int = 10) -> List[dict]:
+    """The same search served by the Mongo text index on `content`"""
+    projection = {field: 1 for field in SNIPPET_FIELDS}
+    projection.update({"_id": 0, "score": {"$meta": "textScore"}})
+    cursor = db.content.find({"user_id": user_id, "$text": {"$search": query}}, projection)
+    items = await cursor.sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+    for item in items:
+        item["caption"] = item.get("caption", "")[:SNIPPET_LENGTH]
+        item["score"] = round(item["score"], 4)
+    return items
+
+
+def content_search_from_env(db, pending: Optional[Callable[[str], List[dict]]] = None) -> ContentSearch:
+    return ContentSearch(
+        db,
+        max_users=int(os.environ.get("SEARCH_INDEX_MAX_USERS", "1000")),
+        ttl_seconds=float(os.environ.get("SEARCH_INDEX_TTL_SECONDS", "600")),
+        pending=pending,
+    )
+
+
+def related_search_from_env(db, pending: Optional[Callable[[str], List[dict]]] = None) -> ContentSearch:
+    return ContentSearch(
+        db,
+        max_users=int(os.environ.get("SEARCH_INDEX_MAX_USERS", "1000")),
+        ttl_seconds=float(os.environ.get("SEARCH_INDEX_TTL_SECONDS", "600")),
+        pending=pending,
+        field_weights=RELATED_FIELD_WEIGHTS,
+        window=int(os.environ.get("RELATED_INDEX_WINDOW", "200")),
+    )
@@ -0,0 +1,45 @@
+"""Fast JSON path for read routes.
+
+Read routes used to build a pydantic model per Mongo document, which FastAPI
+then validated again against `response_model` and encoded with the stdlib
+`json`.  Documents written by this API already have the model's shape, so
+the read routes instead fetch them with `model_projection` (no `_id`, no
+internal fields such as `fingerprints`) and encode them directly with orjson.
+Only documents missing a field (written before the field existed) go
+through the model, to fill in its default.
+
+Routes keep their `response_model` for the OpenAPI schema; returning a
+Response skips FastAPI's own validation and encoding.
+"""
+from typing import Iterable, List, Optional, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    """Mongo projection returning exactly the model's fields"""
+    projection = {field: 1 for field in model.model_fields}
+    projection["_id"] = 0
+    return projection
+
+
+def project(document: dict, projection: dict) -> dict:
+    """Apply an inclusion projection to a document held in memory"""
+    return {field: document[field] for field, keep in projection.items() if keep and field in document}
+
+
+def response_documents(documents: Iterable[dict], model: Type[BaseModel]) -> List[dict]:
+    """Projected documents as-is, validating only those missing one of the model's fields"""
+    fields = model.model_fields.keys()
+    return [document if fields <= document.keys() else model(**document).model_dump() for document in documents]
+
+
+def response_document(document: Optional[dict], model: Type[BaseModel]) -> Optional[dict]:
+    if document is None:
+        return None
+    return response_documents([document], model)[0]
+
+
+def json_response(content, status_code: int = 200, headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
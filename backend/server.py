@@ -1,32 +1,117 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 import os
+import json
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import uuid
-from datetime import datetime
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from admission import Admission, AdmissionRejected, admission_from_env
+from caching import build_llm_cache, prompt_cache_key
+from idempotency import IdempotencyError, IdempotencyInProgress, IdempotencyKeyReused, idempotency_store_from_env
+from llm_gateway import LLMTimeout, gateway_from_env
+from singleflight import SingleFlight
+from streaming import ContentStreamParser, format_sse
+from daily_plan_scheduler import run_nightly, scheduler_from_env
+from indexes import ensure_indexes
+from pagination import KEYSET_SORT, InvalidCursor, encode_cursor, keyset_query, merge_keyset
+from profile_cache import profile_cache_from_env
+from creator_context import get_creator_context, record_content, top_hashtags
+from search import content_search_from_env, related_search_from_env, text_search
+from fingerprints import content_fingerprints, near_duplicate_detector_from_env
+from revisions import RevisionStore, etag_matches, revision_etag
+from serialization import json_response, model_projection, project, response_document, response_documents
+from write_behind import write_behind_from_env
+from llm_parsing import (CONTENT_FIELDS, PLAN_ITEM_FIELDS, complete_plan_items, extract_json, plan_item_list,
+                         validate_content, validate_plan_items)
+from content_io import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, export_ndjson, import_ndjson, iter_ndjson_lines
+from metrics import (METRICS_ENABLED, MetricsMiddleware, MongoCommandMetrics, record_degraded, record_llm_call,
+                     record_llm_error, record_near_duplicate, record_parse, record_reask,
+                     registry as metrics_registry)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection (connect=False: the pool opens on the first operation, or in startup pre-warming)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, connect=False,
+                            event_listeners=[MongoCommandMetrics()] if METRICS_ENABLED else [])
 db = client[os.environ['DB_NAME']]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_db_client()
+    try:
+        yield
+    finally:
+        await shutdown_db_client()
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# LLM API Key
-EMERGENT_LLM_KEY = os.environ['EMERGENT_LLM_KEY']
+# LLM API Key (only needed by the default emergent provider)
+EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+
+# Long-lived LLM clients (LLM_GATEWAY_PROVIDER=emergent|http|fake)
+llm_gateway = gateway_from_env(EMERGENT_LLM_KEY)
+
+# Longest span /daily-plan/generate-range plans in one LLM call
+DAILY_PLAN_RANGE_MAX_DAYS = 14
+
+# One follow-up call asking only for the fields a response left out (LLM_REASK_ENABLED=0 turns it off)
+LLM_REASK_ENABLED = os.environ.get('LLM_REASK_ENABLED', '1') == '1'
+
+# Max concurrent LLM calls per batch generation request
+CONTENT_BATCH_CONCURRENCY = int(os.environ.get('CONTENT_BATCH_CONCURRENCY', '3'))
+CONTENT_BATCH_MAX_TARGETS = 10
+
+# Raw LLM response cache (LLM_CACHE_BACKEND=memory|mongo|none)
+llm_cache = build_llm_cache(db)
+
+# Concurrent identical generations share one in-flight LLM call
+llm_singleflight = SingleFlight()
+
+# UserProfile objects by user id (PROFILE_CACHE_TTL_SECONDS / PROFILE_CACHE_MAX_ENTRIES)
+profile_cache = profile_cache_from_env()
+PROFILE_CACHE_CHANGE_STREAM = os.environ.get('PROFILE_CACHE_CHANGE_STREAM', '0') == '1'
+
+# Stored responses for retried POSTs carrying an Idempotency-Key (IDEMPOTENCY_TTL_SECONDS)
+idempotency_store = idempotency_store_from_env(db)
+
+# Per-user revision counters behind the ETags of the history, profile and plan GETs
+revisions = RevisionStore(db.user_revisions)
+
+# Buffered, batched content inserts (CONTENT_WRITE_BEHIND=1, CONTENT_WRITE_BEHIND_*); direct inserts by default.
+# Buffered content bumps its revision once flushed, so no worker serves the new ETag without it
+write_behind = write_behind_from_env(
+    db.content,
+    on_flush=lambda documents: revisions.bump_many([document["user_id"] for document in documents], "content")
+)
+
+# Per-user BM25 indexes over content history (SEARCH_INDEX_MAX_USERS / SEARCH_INDEX_TTL_SECONDS)
+content_search = content_search_from_env(db, pending=write_behind.pending)
+# Smaller ones behind the related items in prompts: newest RELATED_INDEX_WINDOW items, captions and hooks
+related_search = related_search_from_env(db, pending=write_behind.pending)
+near_duplicates = near_duplicate_detector_from_env(db, pending=write_behind.pending)
+
+# Global/per-user limits on LLM-backed routes (ADMISSION_*; ADMISSION_ENABLED=0 turns them off)
+admission = admission_from_env()
 
 # ============ Models ============
 
@@ -56,12 +141,58 @@ class ContentItem(BaseModel):
     hooks: List[str]
     created_at: datetime = Field(default_factory=datetime.utcnow)
     posted: bool = False
+    near_duplicate_of: List[str] = []  # ids of past content whose hooks/caption this repeats
+
+class GeneratedContent(ContentItem):
+    # Canned stand-in served past the LLM deadline; returned to the client but never saved
+    degraded: bool = False
+
+class ContentSummary(BaseModel):
+    id: str
+    platform: str
+    content_type: str
+    caption: str
+    created_at: datetime
+
+class ContentHistoryPage(BaseModel):
+    items: List[Dict[str, Any]]  # ContentSummary fields unless `fields` is given
+    next_cursor: Optional[str] = None
+
+class ContentSearchHit(ContentSummary):
+    score: float
+
+class ContentSearchResponse(BaseModel):
+    query: str
+    backend: str
+    items: List[ContentSearchHit]
+    took_ms: float
 
 class ContentGenerateRequest(BaseModel):
     user_id: str
     platform: str
     content_type: str
     additional_context: Optional[str] = None
+    bypass_cache: bool = False
+
+class ContentTarget(BaseModel):
+    platform: str
+    content_type: str
+
+class ContentBatchGenerateRequest(BaseModel):
+    user_id: str
+    targets: List[ContentTarget]
+    additional_context: Optional[str] = None
+    strategy: str = "parallel"  # "parallel" (one LLM call per target) or "combined" (one multi-output prompt)
+    bypass_cache: bool = False
+
+class ContentBatchItem(BaseModel):
+    content: GeneratedContent
+    latency_ms: float
+
+class ContentBatchResponse(BaseModel):
+    strategy: str
+    items: List[ContentBatchItem]
+    total_latency_ms: float
 
 class DailyPlan(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -70,38 +201,199 @@ class DailyPlan(BaseModel):
     plan_items: List[dict]  # List of content suggestions
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class GeneratedDailyPlan(DailyPlan):
+    # Stored or default plan served past the LLM deadline instead of a new one
+    degraded: bool = False
+
 class DailyPlanGenerate(BaseModel):
     user_id: str
+    bypass_cache: bool = False
+
+class DailyPlanRangeGenerate(BaseModel):
+    user_id: str
+    start_date: str  # YYYY-MM-DD, inclusive
+    end_date: str  # YYYY-MM-DD, inclusive
+    bypass_cache: bool = False
+
+class DailyPlanRange(BaseModel):
+    plans: List[DailyPlan]
+    fallback_dates: List[str] = []  # days the model left out or garbled: their stored plan, else the default
+    degraded: bool = False  # the LLM missed its deadline: every day is a fallback
 
 # ============ Helper Functions ============
 
 async def get_user_profile(user_id: str):
-    """Get user profile from database"""
+    """Get user profile, from the profile cache when possible"""
+    user_obj = profile_cache.get(user_id)
+    if user_obj is not None:
+        return user_obj
+
     user = await db.users.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserProfile(**user)
+    user_obj = UserProfile(**user)
+    profile_cache.set(user_id, user_obj)
+    return user_obj
 
-async def get_user_content_history(user_id: str, limit: int = 10):
-    """Get user's recent content history"""
-    content_list = await db.content.find({"user_id": user_id}).sort("created_at", -1).limit(limit).to_list(limit)
-    return [ContentItem(**content) for content in content_list]
+def pending_ids(user_id: str) -> List[str]:
+    """Ids of the user's buffered content: part of the history ETags until the flush bumps the revision"""
+    return sorted(document["id"] for document in write_behind.pending(user_id))
 
-async def generate_content_with_llm(user: UserProfile, platform: str, content_type: str, additional_context: str = None):
-    """Generate content using LLM based on user profile and history"""
-    
-    # Get user's recent content to personalize
-    recent_content = await get_user_content_history(user.id, limit=5)
-    
-    # Build context from past content
+async def conditional_json(user_id: str, resource: str, if_none_match: Optional[str], variant: tuple,
+                           load: Callable[[], Awaitable[Any]]):
+    """304 when the client's ETag is still current, otherwise the JSON built by `load`"""
+    # Revision before data: the body may be newer than its ETag, never older
+    etag = revision_etag(await revisions.get(user_id), resource, *variant)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        revisions.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return json_response(await load(), headers=headers)
+
+async def admit_llm_request(user_id: str, cost: float = 1.0) -> Admission:
+    """Pass admission control for an LLM-backed route, or fail fast with 429 + Retry-After"""
+    if admission is None:
+        return Admission(None, user_id)
+    try:
+        return await admission.admit(user_id, cost)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
+@asynccontextmanager
+async def llm_admission(user_id: str, cost: float = 1.0):
+    """Hold an admission slot for the body of an LLM-backed route"""
+    admitted = await admit_llm_request(user_id, cost)
+    try:
+        yield admitted
+    finally:
+        admitted.release()
+
+def is_degraded(result) -> bool:
+    """Whether a generation route served a stand-in because the LLM missed its deadline"""
+    if isinstance(result, ContentBatchResponse):
+        return any(item.content.degraded for item in result.items)
+    return getattr(result, "degraded", False)
+
+async def run_idempotent(scope: str, idempotency_key: Optional[str], request: BaseModel, response: Response, fn):
+    """Run a POST handler once per Idempotency-Key; retries get the stored (or still running) result"""
+    if idempotency_key is None:
+        return await fn()
+    try:
+        # Keys are per user, so two clients picking the same key never see each other's responses.
+        # A degraded result is not stored, so a retry with the key gets a real generation
+        result, replayed = await idempotency_store.run(
+            f"{scope}:{request.user_id}", idempotency_key, request.dict(), fn,
+            final=lambda result: not is_degraded(result)
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+async def send_llm_prompt(session_prefix: str, user_id: str, system_message: str, user_prompt: str,
+                          bypass_cache: bool = False, scope: str = "", cache_prompt: Optional[str] = None):
+    """Send a prompt to the LLM, serving repeated prompts from the response cache.
+
+    `cache_prompt` is what the cache key hashes instead of `user_prompt`, for
+    prompts with a part (like the recent history) that must not split the cache.
+    """
+    cache_key = prompt_cache_key(llm_gateway.model_key, system_message,
+                                 user_prompt if cache_prompt is None else cache_prompt, scope)
+    if not bypass_cache:
+        cached_response = await llm_cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+    async def complete():
+        session_id = f"{session_prefix}_{user_id}_{datetime.utcnow().timestamp()}"
+        started = time.perf_counter()
+        try:
+            response = await llm_gateway.complete(system_message, user_prompt, session_id)
+        except Exception as e:
+            record_llm_error(llm_gateway.model_key, e, time.perf_counter() - started)
+            if isinstance(e, LLMTimeout):
+                # Past the deadline a cached answer (even one a bypassed lookup skipped) beats none
+                cached_response = await llm_cache.get(cache_key)
+                if cached_response is not None:
+                    record_degraded(session_prefix, "cache")
+                    return cached_response
+            raise
+        record_llm_call(session_prefix, llm_gateway.model_key, system_message, user_prompt, response,
+                        time.perf_counter() - started)
+
+        # A bypassed lookup still refreshes the cache with the new generation
+        await llm_cache.set(cache_key, response)
+        return response
+
+    return await llm_singleflight.do((user_id, session_prefix, cache_key), complete)
+
+async def stream_llm_prompt(session_prefix: str, user_id: str, system_message: str, user_prompt: str,
+                            bypass_cache: bool = False, cache_prompt: Optional[str] = None):
+    """Yield the LLM response for a prompt as text chunks (`cache_prompt` as in send_llm_prompt)"""
+    # Providers without token streaming (e.g. LlmChat) yield the whole
+    # response as one chunk; consumers must not assume chunk sizes.
+    cache_key = prompt_cache_key(llm_gateway.model_key, system_message,
+                                 user_prompt if cache_prompt is None else cache_prompt)
+    if not bypass_cache:
+        cached_response = await llm_cache.get(cache_key)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+    session_id = f"{session_prefix}_{user_id}_{datetime.utcnow().timestamp()}"
+    chunks = []
+    started = time.perf_counter()
+    try:
+        async for chunk in llm_gateway.stream(system_message, user_prompt, session_id):
+            chunks.append(chunk)
+            yield chunk
+    except Exception as e:
+        record_llm_error(llm_gateway.model_key, e, time.perf_counter() - started)
+        raise
+    response = "".join(chunks)
+    record_llm_call(session_prefix, llm_gateway.model_key, system_message, user_prompt, response,
+                    time.perf_counter() - started)
+    await llm_cache.set(cache_key, response)
+
+async def get_prompt_context(user_id: str, additional_context: Optional[str]):
+    """Creator context plus, when the request says what it is about, the most relevant past items"""
+    # The generation that follows is screened against these; loading them now overlaps the LLM call
+    near_duplicates.warm(user_id)
+    creator_context = await get_creator_context(db, user_id)
+    if additional_context:
+        # Relevance is an improvement, not a requirement: until the user's index is built in the
+        # background, prompts fall back to the latest items
+        related = related_search.search_loaded(user_id, additional_context, limit=3)
+        if related is not None:
+            creator_context["related"] = related
+    return creator_context
+
+def summarize_recent_content(creator_context: dict):
+    """Build the past-content section of a generation prompt from the creator context"""
     past_content_summary = ""
-    if recent_content:
+    related_content = creator_context.get("related", [])
+    recent_content = creator_context.get("recent", [])
+    if related_content:
+        past_content_summary = "\n\nMost relevant past content (build on it, do not repeat it):\n"
+        for idx, content in enumerate(related_content[:3], 1):
+            past_content_summary += f"{idx}. {content['platform']} - {content['content_type']}: {content['caption'][:100]}...\n"
+    elif recent_content:
         past_content_summary = "\n\nRecent content created:\n"
         for idx, content in enumerate(recent_content[:3], 1):
-            past_content_summary += f"{idx}. {content.platform} - {content.content_type}: {content.caption[:100]}...\n"
-    
-    # Create personalized prompt
-    system_message = f"""You are a professional content strategist and scriptwriter for social media creators.
+            past_content_summary += f"{idx}. {content['platform']} - {content['content_type']}: {content['caption'][:100]}...\n"
+    hashtags = top_hashtags(creator_context)
+    if hashtags:
+        past_content_summary += f"Frequently used hashtags: {' '.join('#' + tag for tag in hashtags)}\n"
+    return past_content_summary
+
+def build_content_system_message(user: UserProfile):
+    """Render the creator-profile system message shared by content prompts"""
+    return f"""You are a professional content strategist and scriptwriter for social media creators.
 
 Your creator profile:
 - Niche: {user.niche}
@@ -111,6 +403,20 @@ Your creator profile:
 
 Create content that matches their unique voice and resonates with their audience."""
 
+def content_cache_prompt(user: UserProfile, platform: str, content_type: str, additional_context: Optional[str]):
+    """The content prompt without its history section, which changes with every save: what the cache key hashes,
+    so a retried or regenerated request is served from the cache"""
+    return build_content_prompts(user, platform, content_type, additional_context, {})[1]
+
+def build_content_prompts(user: UserProfile, platform: str, content_type: str, additional_context: Optional[str],
+                          creator_context: dict):
+    """Render the system message and user prompt for a content generation"""
+    # Build context from past content
+    past_content_summary = summarize_recent_content(creator_context)
+    
+    # Create personalized prompt
+    system_message = build_content_system_message(user)
+
     user_prompt = f"""Create a {content_type} for {platform}.
 
 Requirements:
@@ -133,40 +439,246 @@ Format your response as JSON with these keys:
     "caption": "caption with relevant hashtags"
 }}"""
 
+    return system_message, user_prompt
+
+FALLBACK_HOOKS = [
+    "Ready to transform your {niche} content?",
+    "Here's what nobody tells you about {niche}...",
+    "Stop scrolling - this will change how you see {niche}",
+    "The {niche} mistake almost everyone makes",
+    "I wish I knew this when I started in {niche}",
+    "3 {niche} tips you can use today",
+    "This changed everything about my {niche} routine",
+    "Save this before your next {niche} post",
+    "The honest truth about {niche}",
+    "Why your {niche} results are stuck",
+    "Try this {niche} trick for one week",
+    "What a year of {niche} taught me",
+]
+
+def fallback_hooks(user: UserProfile, count: int = 3):
+    """A varied pick of canned hooks, so fallbacks do not repeat the same three lines"""
+    return [hook.format(niche=user.niche) for hook in random.sample(FALLBACK_HOOKS, count)]
+
+def fallback_content_data(response: str, user: UserProfile):
+    """Canned content structure around a response that is not usable JSON"""
+    return {
+        "hooks": fallback_hooks(user),
+        "script": response,
+        "caption": response[:200] + "... #" + user.niche.replace(" ", "")
+    }
+
+def degraded_content_data(user: UserProfile, platform: str):
+    """Canned content served when the LLM misses its deadline and nothing is cached (returned, never saved)"""
+    record_degraded("content_gen", "fallback")
+    return {
+        "hooks": fallback_hooks(user),
+        "script": "",
+        "caption": f"More {user.niche} content coming soon on {platform}! #" + user.niche.replace(" ", ""),
+        "degraded": True
+    }
+
+def default_plan_items(user: UserProfile):
+    """Single-idea plan used when the LLM plan is unusable or unavailable"""
+    return [
+        {
+            "platform": user.platforms[0] if user.platforms else "Instagram",
+            "content_type": "Reel",
+            "topic": f"Trending topic in {user.niche}",
+            "reasoning": "High engagement potential"
+        }
+    ]
+
+REASK_CONTENT_KEYS = {
+    "hooks": '"hooks": ["hook 1", "hook 2", "hook 3"]',
+    "script": '"script": "full script/content"',
+    "caption": '"caption": "engaging caption with relevant hashtags"',
+}
+
+def build_content_reask_prompt(platform: str, content_type: str, content_data: dict, missing: List[str]):
+    """Ask for only the fields a content response left out, with the rest as context"""
+    keys = ",\n    ".join(REASK_CONTENT_KEYS[field] for field in missing)
+    return f"""This {content_type} for {platform} came back without its {", ".join(missing)}.
+
+What it has so far:
+{json.dumps(content_data, ensure_ascii=False)[:3000]}
+
+Write only the missing parts, matching what is already there.
+
+Format your response as JSON with only these keys:
+{{
+    {keys}
+}}"""
+
+async def reask_missing_content(user: UserProfile, platform: str, content_type: str, content_data: dict,
+                                missing: List[str]):
+    """One follow-up call for the missing fields; returns the merged content and what is still missing"""
     try:
-        # Initialize LLM chat
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"content_gen_{user.id}_{datetime.utcnow().timestamp()}",
-            system_message=system_message
-        ).with_model("openai", "gpt-5-mini")
-        
-        # Generate content
-        message = UserMessage(text=user_prompt)
-        response = await chat.send_message(message)
-        
-        # Parse response (assuming it returns JSON)
-        import json
-        try:
-            content_data = json.loads(response)
-        except:
-            # If not JSON, structure it manually
-            content_data = {
-                "hooks": ["Ready to transform your content?", "Here's what nobody tells you about...", "Stop scrolling - this will change everything"],
-                "script": response,
-                "caption": response[:200] + "... #" + user.niche.replace(" ", "")
-            }
-        
+        response = await send_llm_prompt(
+            "content_reask", user.id, build_content_system_message(user),
+            build_content_reask_prompt(platform, content_type, content_data, missing), bypass_cache=True
+        )
+    except Exception as e:
+        logging.warning(f"Re-ask for {', '.join(missing)} failed: {str(e)}")
+        record_reask("content", False)
+        return content_data, missing
+    reply, _ = extract_json(response, dict)
+    filled, _ = validate_content(reply or {})
+    content_data = {**content_data, **{field: filled[field] for field in missing if field in filled}}
+    still_missing = [field for field in missing if field not in content_data]
+    record_reask("content", not still_missing)
+    return content_data, still_missing
+
+async def complete_content_data(user: UserProfile, platform: str, content_type: str, data, outcome: str,
+                                response: str, kind: str = "content", reask: bool = True):
+    """Validate parsed content, re-asking once for missing fields and filling any left with fallbacks"""
+    if not isinstance(data, dict):
+        # If not JSON, structure it manually
+        record_parse(kind, "fallback")
+        return fallback_content_data(response, user)
+    content_data, missing = validate_content(data)
+    if len(missing) == len(CONTENT_FIELDS):
+        record_parse(kind, "fallback")
+        return fallback_content_data(response, user)
+    if missing and reask and LLM_REASK_ENABLED:
+        content_data, missing = await reask_missing_content(user, platform, content_type, content_data, missing)
+    if missing:
+        record_parse(kind, "partial")
+        return {**fallback_content_data(content_data.get("script", ""), user), **content_data}
+    record_parse(kind, outcome)
+    return content_data
+
+async def parse_content_response(response: str, user: UserProfile, platform: str, content_type: str,
+                                 reask: bool = True):
+    """Parse the LLM content response (fenced, wrapped in prose or truncated), falling back to a canned structure"""
+    data, outcome = extract_json(response, dict)
+    return await complete_content_data(user, platform, content_type, data, outcome, response, reask=reask)
+
+def build_dedupe_prompt(platform: str, content_type: str, content_data: dict, matches: Dict[str, dict]):
+    """Ask for replacements of only the hooks/caption that repeat the creator's past content"""
+    repeated_hooks = [match["text"] for key, match in matches.items() if key.startswith("hook:")]
+    keys = []
+    if repeated_hooks:
+        keys.append(f'"hooks": [{len(repeated_hooks)} new hook(s), in the same order]')
+    if "caption" in matches:
+        keys.append('"caption": "new caption with relevant hashtags"')
+    repeated = "\n".join(f"- {match['text']}" for match in matches.values())
+
+    return f"""This {content_type} for {platform} repeats lines the creator has already used:
+{repeated}
+
+Script for context:
+{content_data.get("script", "")[:1500]}
+
+Write fresh replacements with a different angle and wording, in the same tone.
+
+Format your response as JSON with only these keys:
+{{
+    {", ".join(keys)}
+}}"""
+
+async def screen_near_duplicates(user: UserProfile, platform: str, content_type: str, content_data: dict,
+                                 regenerate: bool = True):
+    """Flag hooks/captions that repeat past content; with NEAR_DUP_MODE=regenerate, rewrite them once first"""
+    if not near_duplicates.enabled:
+        return content_data
+    matches = near_duplicates.check(user.id, content_data)
+    if matches is None:
+        # Signatures still loading in the background: not worth holding the response for
         return content_data
+    if matches and regenerate and near_duplicates.mode == "regenerate":
+        try:
+            response = await send_llm_prompt(
+                "content_dedupe", user.id, build_content_system_message(user),
+                build_dedupe_prompt(platform, content_type, content_data, matches), bypass_cache=True
+            )
+            replacement, _ = extract_json(response, dict)
+            replacement = replacement or {}
+            hooks = list(content_data.get("hooks") or [])
+            new_hooks = iter(replacement.get("hooks") or [])
+            for key in matches:
+                if key.startswith("hook:"):
+                    position = int(key.split(":")[1])
+                    hooks[position] = next(new_hooks, hooks[position])
+            content_data = {**content_data, "hooks": hooks}
+            if "caption" in matches and replacement.get("caption"):
+                content_data["caption"] = replacement["caption"]
+            for key in matches:
+                record_near_duplicate(key.split(":")[0], "regenerated")
+            near_duplicates.regenerated += 1
+            matches = near_duplicates.check(user.id, content_data) or {}
+        except Exception as e:
+            logging.warning(f"Near-duplicate regeneration failed, flagging instead: {str(e)}")
+
+    if matches:
+        near_duplicates.flagged += 1
+        for key in matches:
+            record_near_duplicate(key.split(":")[0], "flagged")
+    return {**content_data, "near_duplicate_of": sorted({match["content_id"] for match in matches.values()})}
+
+def build_batch_content_prompt(user: UserProfile, targets: List[ContentTarget], additional_context: Optional[str],
+                               creator_context: dict):
+    """Render one prompt asking for content for several platform/content-type targets"""
+    past_content_summary = summarize_recent_content(creator_context)
+    target_lines = "\n".join(
+        f"{idx}. {target.content_type} for {target.platform}" for idx, target in enumerate(targets, 1)
+    )
+
+    return f"""Create one piece of content for each of these targets, in this order:
+{target_lines}
+
+Requirements:
+- Tone: {user.tone}
+- Target Audience: {user.target_audience}
+- Adapt length, style and hashtags to each platform
+{f'- Additional Context: {additional_context}' if additional_context else ''}
+{past_content_summary}
+
+For each target generate:
+1. 3 Hook Options (attention-grabbing first lines)
+2. Complete Script (if applicable for video content)
+3. Caption (optimized for the platform)
+
+Format your response as a JSON array with one object per target, in the same order:
+[
+    {{
+        "platform": "Instagram",
+        "content_type": "Reel",
+        "hooks": ["hook1", "hook2", "hook3"],
+        "script": "full script here",
+        "caption": "caption with relevant hashtags"
+    }}
+]"""
+
+async def generate_content_with_llm(user: UserProfile, platform: str, content_type: str, additional_context: str = None,
+                                    bypass_cache: bool = False):
+    """Generate content using LLM based on user profile and history"""
     
+    # Get the creator's recent content and habits to personalize
+    creator_context = await get_prompt_context(user.id, additional_context)
+    system_message, user_prompt = build_content_prompts(user, platform, content_type, additional_context, creator_context)
+
+    try:
+        # Generate content
+        response = await send_llm_prompt(
+            "content_gen", user.id, system_message, user_prompt, bypass_cache=bypass_cache,
+            cache_prompt=content_cache_prompt(user, platform, content_type, additional_context)
+        )
+        content_data = await parse_content_response(response, user, platform, content_type)
+
+    except LLMTimeout as e:
+        logging.warning(f"LLM deadline exceeded, serving degraded content: {str(e)}")
+        return degraded_content_data(user, platform)
+
     except Exception as e:
         logging.error(f"Error generating content with LLM: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate content: {str(e)}")
 
-async def generate_daily_plan_with_llm(user: UserProfile):
-    """Generate daily content plan using LLM"""
-    
-    system_message = f"""You are a content strategist creating a daily posting plan for a {user.niche} creator.
+    return await screen_near_duplicates(user, platform, content_type, content_data)
+
+def build_daily_plan_system_message(user: UserProfile):
+    """Render the content strategist system prompt for a creator"""
+    return f"""You are a content strategist creating a daily posting plan for a {user.niche} creator.
 
 Creator profile:
 - Niche: {user.niche}
@@ -174,7 +686,54 @@ Creator profile:
 - Target Audience: {user.target_audience}
 - Platforms: {', '.join(user.platforms)}"""
 
-    user_prompt = f"""Create a daily content plan for today with 2-3 content ideas optimized for maximum engagement.
+def build_plan_reask_prompt(validated: List[Optional[dict]], incomplete: List[tuple]):
+    """Ask for only the fields some plan ideas left out, in the same order"""
+    ideas = "\n".join(
+        f"{number}. {json.dumps(validated[position], ensure_ascii=False)} (missing: {', '.join(missing)})"
+        for number, (position, missing) in enumerate(incomplete, start=1)
+    )
+    return f"""These content ideas came back incomplete:
+{ideas}
+
+Fill in only the missing fields, keeping what is already there.
+
+Format as a JSON array with one object per idea, in the same order, each with
+"platform", "content_type", "topic" and "reasoning"."""
+
+async def parse_plan_response(response: str, user: UserProfile, reask: bool = True):
+    """Parse the LLM plan response, re-asking once for ideas with missing fields; the default plan if none is usable"""
+    value, outcome = extract_json(response)
+    items = plan_item_list(value)
+    validated, incomplete = validate_plan_items(items)
+    if incomplete and reask and LLM_REASK_ENABLED:
+        try:
+            reply = await send_llm_prompt("daily_plan_reask", user.id, build_daily_plan_system_message(user),
+                                          build_plan_reask_prompt(validated, incomplete), bypass_cache=True)
+            filled, _ = validate_plan_items(plan_item_list(extract_json(reply)[0]))
+        except Exception as e:
+            logging.warning(f"Plan re-ask failed: {str(e)}")
+            filled = []
+        for (position, missing), fields in zip(incomplete, filled):
+            validated[position] = {**(fields or {}), **validated[position]}
+        record_reask("daily_plan", all(len(validated[position]) == len(PLAN_ITEM_FIELDS)
+                                       for position, _ in incomplete))
+    plan_items = complete_plan_items(validated)
+    if not plan_items:
+        # Default plan if parsing fails
+        record_parse("daily_plan", "fallback")
+        return default_plan_items(user)
+    record_parse("daily_plan", outcome if len(plan_items) == len(validated) else "partial")
+    return plan_items
+
+async def generate_daily_plan_with_llm(user: UserProfile, bypass_cache: bool = False, plan_date: Optional[str] = None):
+    """Generate daily content plan using LLM (raises LLMTimeout past the LLM deadline)"""
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    plan_date = plan_date or today
+    day_label = "today" if plan_date == today else plan_date
+    
+    system_message = build_daily_plan_system_message(user)
+
+    user_prompt = f"""Create a daily content plan for {day_label} with 2-3 content ideas optimized for maximum engagement.
 
 For each idea, provide:
 1. Platform (choose from: {', '.join(user.platforms)})
@@ -193,35 +752,254 @@ Format as JSON array:
 ]"""
 
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"daily_plan_{user.id}_{datetime.utcnow().timestamp()}",
-            system_message=system_message
-        ).with_model("openai", "gpt-5-mini")
+        # "today" in the prompt is relative, so cached plans must not outlive the date
+        response = await send_llm_prompt("daily_plan", user.id, system_message, user_prompt,
+                                         bypass_cache=bypass_cache, scope=plan_date)
         
-        message = UserMessage(text=user_prompt)
-        response = await chat.send_message(message)
-        
-        import json
-        try:
-            plan_items = json.loads(response)
-        except:
-            # Default plan if parsing fails
-            plan_items = [
-                {
-                    "platform": user.platforms[0] if user.platforms else "Instagram",
-                    "content_type": "Reel",
-                    "topic": f"Trending topic in {user.niche}",
-                    "reasoning": "High engagement potential"
-                }
-            ]
-        
-        return plan_items
+        return await parse_plan_response(response, user)
+
+    except LLMTimeout:
+        # The caller decides what stands in for the plan; it must not be stored as one
+        raise
     
     except Exception as e:
         logging.error(f"Error generating daily plan: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
 
+def parse_plan_dates(start_date: str, end_date: str) -> List[str]:
+    """Every YYYY-MM-DD date from start to end inclusive, or a 400 for a malformed or oversized range"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    days = (end - start).days + 1
+    if days < 1:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if days > DAILY_PLAN_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {DAILY_PLAN_RANGE_MAX_DAYS} days per range")
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days)]
+
+async def generate_daily_plan_range_with_llm(user: UserProfile, dates: List[str], bypass_cache: bool = False):
+    """Plan several days in one LLM call; returns ({date: plan items}, dates given the default plan)"""
+    user_prompt = f"""Create a content plan for each of these dates: {', '.join(dates)}.
+Give each day 2-3 content ideas optimized for maximum engagement, and vary topics across the days.
+
+For each idea, provide:
+1. Platform (choose from: {', '.join(user.platforms)})
+2. Content Type (Reel/Post/Video/Story)
+3. Topic
+4. Why it works (brief reasoning)
+
+Format as a JSON object with one key per date:
+{{
+    "{dates[0]}": [
+        {{
+            "platform": "Instagram",
+            "content_type": "Reel",
+            "topic": "topic here",
+            "reasoning": "why this will perform well"
+        }}
+    ]
+}}"""
+
+    try:
+        # The prompt names absolute dates, so a cached plan stays valid for them
+        response = await send_llm_prompt("daily_plan_range", user.id, build_daily_plan_system_message(user),
+                                         user_prompt, bypass_cache=bypass_cache)
+    except LLMTimeout:
+        # The route serves the fallbacks and marks the response degraded
+        raise
+    except Exception as e:
+        logging.error(f"Error generating daily plan range: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
+
+    days, outcome = extract_json(response, dict)
+    days = days or {}
+
+    # Each day stands alone: one bad day gets the default plan without discarding the others
+    plans, fallback_dates = {}, []
+    for date in dates:
+        items = days.get(date)
+        validated, _ = validate_plan_items(items if isinstance(items, list) else [])
+        plan_items = complete_plan_items(validated)
+        if plan_items:
+            record_parse("daily_plan_range", outcome if len(plan_items) == len(validated) else "partial")
+            plans[date] = plan_items
+        else:
+            record_parse("daily_plan_range", "fallback")
+            plans[date] = default_plan_items(user)
+            fallback_dates.append(date)
+    return plans, fallback_dates
+
+async def upsert_with_retry(collection, query: dict, update: dict, projection: dict):
+    """Atomic find_one_and_update upsert, retried once if a concurrent upsert won the insert"""
+    for attempt in range(2):
+        try:
+            return await collection.find_one_and_update(
+                query, update, projection=projection, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+async def upsert_daily_plan(user_id: str, plan_date: str, plan_items: List[dict]):
+    """Create or replace the plan for a user and date in one write"""
+    plan_obj = DailyPlan(user_id=user_id, date=plan_date, plan_items=plan_items)
+    plan_doc = plan_obj.dict()
+    plan_id = plan_doc.pop("id")
+    # An existing plan keeps its id
+    saved = await upsert_with_retry(
+        db.daily_plans,
+        {"user_id": user_id, "date": plan_date},
+        {"$set": plan_doc, "$setOnInsert": {"id": plan_id}},
+        {"_id": 0, "id": 1}
+    )
+    await revisions.bump(user_id, "daily_plans")
+    plan_obj.id = saved["id"]
+    return plan_obj
+
+async def find_daily_plans(user_id: str, start_date: str, end_date: str):
+    """A user's stored plans from start to end inclusive, oldest first, in one indexed query"""
+    return await db.daily_plans.find(
+        {"user_id": user_id, "date": {"$gte": start_date, "$lte": end_date}}, model_projection(DailyPlan)
+    ).sort("date", 1).to_list(DAILY_PLAN_RANGE_MAX_DAYS)
+
+async def upsert_daily_plans(user_id: str, plans: Dict[str, List[dict]], fallback_dates: List[str] = ()):
+    """Create or replace the plans for several dates in one bulk write; returns them as stored.
+
+    Dates in `fallback_dates` hold the canned default plan, which only fills days without a stored plan.
+    """
+    generated_at = datetime.utcnow()
+    operations = []
+    for plan_date, plan_items in plans.items():
+        if plan_date in fallback_dates:
+            update = {"$setOnInsert": {"id": str(uuid.uuid4()), "plan_items": plan_items,
+                                       "generated_at": generated_at}}
+        else:
+            # An existing plan keeps its id
+            update = {"$set": {"plan_items": plan_items, "generated_at": generated_at},
+                      "$setOnInsert": {"id": str(uuid.uuid4())}}
+        operations.append(UpdateOne({"user_id": user_id, "date": plan_date}, update, upsert=True))
+    for attempt in range(2):
+        try:
+            await db.daily_plans.bulk_write(operations, ordered=False)
+            break
+        except BulkWriteError as e:
+            # A concurrent upsert won an insert; retrying turns those into updates
+            if attempt or any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    await revisions.bump(user_id, "daily_plans")
+    dates = sorted(plans)
+    return await find_daily_plans(user_id, dates[0], dates[-1])
+
+async def precompute_daily_plan(user_doc: dict, plan_date: str):
+    """Generate a plan ahead of time for the nightly scheduler"""
+    # A timed-out user is recorded as failed and retried by the scheduler rather than given the default plan
+    return await generate_daily_plan_with_llm(UserProfile(**user_doc), plan_date=plan_date)
+
+def build_content_item(user_id: str, platform: str, content_type: str, content_data: dict):
+    """Build a ContentItem from parsed LLM output"""
+    return GeneratedContent(
+        user_id=user_id,
+        platform=platform,
+        content_type=content_type,
+        script=content_data.get("script", ""),
+        caption=content_data.get("caption", ""),
+        hooks=content_data.get("hooks", []),
+        near_duplicate_of=content_data.get("near_duplicate_of", []),
+        degraded=content_data.get("degraded", False)
+    )
+
+async def persist_content_items(items: List[ContentItem]):
+    """Save generated content items in a single round trip and fold them into the creator context"""
+    # Degraded stand-ins stay out of history, the creator context and the fingerprints
+    documents = [item.dict(exclude={"degraded"}) for item in items if not getattr(item, "degraded", False)]
+    if not documents:
+        return
+    for document in documents:
+        document["fingerprints"] = content_fingerprints(document)
+    # Queued with CONTENT_WRITE_BEHIND=1 (the buffer bumps the revision after its flush);
+    # history reads merge in what is not flushed yet
+    await write_behind.write(documents)
+    if not write_behind.enabled:
+        await revisions.bump_many([document["user_id"] for document in documents], "content")
+    await record_content(db, documents)
+    content_search.add(documents)
+    related_search.add(documents)
+    near_duplicates.add(documents)
+
+async def save_generated_content(user_id: str, platform: str, content_type: str, content_data: dict):
+    """Build a ContentItem from parsed LLM output and persist it"""
+    # Create content item
+    content_obj = build_content_item(user_id, platform, content_type, content_data)
+    
+    # Save to database
+    await persist_content_items([content_obj])
+    
+    return content_obj
+
+async def generate_batch_parallel(user: UserProfile, request: ContentBatchGenerateRequest,
+                                  creator_context: dict):
+    """Generate each batch target with its own LLM call, bounded by a semaphore"""
+    semaphore = asyncio.Semaphore(CONTENT_BATCH_CONCURRENCY)
+
+    async def generate_target(target: ContentTarget):
+        async with semaphore:
+            started = time.perf_counter()
+            system_message, user_prompt = build_content_prompts(
+                user, target.platform, target.content_type, request.additional_context, creator_context
+            )
+            try:
+                response = await send_llm_prompt(
+                    "content_gen", user.id, system_message, user_prompt, bypass_cache=request.bypass_cache,
+                    cache_prompt=content_cache_prompt(user, target.platform, target.content_type,
+                                                      request.additional_context)
+                )
+                content_data = await screen_near_duplicates(
+                    user, target.platform, target.content_type,
+                    await parse_content_response(response, user, target.platform, target.content_type)
+                )
+            except LLMTimeout:
+                content_data = degraded_content_data(user, target.platform)
+            return content_data, (time.perf_counter() - started) * 1000
+
+    return await asyncio.gather(*(generate_target(target) for target in request.targets))
+
+async def generate_batch_combined(user: UserProfile, request: ContentBatchGenerateRequest,
+                                  creator_context: dict):
+    """Generate every batch target from a single multi-output LLM call"""
+    started = time.perf_counter()
+    system_message = build_content_system_message(user)
+    user_prompt = build_batch_content_prompt(user, request.targets, request.additional_context, creator_context)
+    try:
+        # Keyed without the history section, like single generations
+        response = await send_llm_prompt(
+            "content_batch", user.id, system_message, user_prompt, bypass_cache=request.bypass_cache,
+            cache_prompt=build_batch_content_prompt(user, request.targets, request.additional_context, {})
+        )
+    except LLMTimeout:
+        latency_ms = (time.perf_counter() - started) * 1000
+        return [(degraded_content_data(user, target.platform), latency_ms) for target in request.targets]
+
+    outputs, outcome = extract_json(response, list)
+    outputs = outputs or []
+
+    # Missing or malformed entries are structured manually; incomplete ones re-ask for their own gaps
+    results = await asyncio.gather(*(
+        complete_content_data(user, target.platform, target.content_type,
+                              outputs[idx] if idx < len(outputs) else None, outcome, response, kind="content_batch")
+        for idx, target in enumerate(request.targets)
+    ))
+
+    # Repeats are rewritten per target, so one repeated hook does not cost a whole new batch call
+    results = await asyncio.gather(*(
+        screen_near_duplicates(user, target.platform, target.content_type, content_data)
+        for target, content_data in zip(request.targets, results)
+    ))
+    latency_ms = (time.perf_counter() - started) * 1000
+    return [(content_data, latency_ms) for content_data in results]
+
 # ============ API Routes ============
 
 @api_router.get("/")
@@ -235,105 +1013,355 @@ async def create_user_profile(input: UserProfileCreate):
     user_dict = input.dict()
     user_obj = UserProfile(**user_dict)
     
-    # Check if user already exists (by name for now)
-    existing_user = await db.users.find_one({"name": user_obj.name})
-    if existing_user:
-        # Update existing user
-        await db.users.update_one(
-            {"id": existing_user["id"]},
-            {"$set": user_obj.dict()}
-        )
-        user_obj.id = existing_user["id"]
-    else:
-        # Create new user
-        await db.users.insert_one(user_obj.dict())
+    # Users are matched by name for now; an existing user keeps its id.  The unique name_key
+    # makes the loser of a concurrent create retry as an update instead of inserting a second user
+    user_doc = user_obj.dict()
+    user_id = user_doc.pop("id")
+    saved = await upsert_with_retry(
+        db.users,
+        {"name_key": user_obj.name},
+        {"$set": user_doc, "$setOnInsert": {"id": user_id}},
+        {"_id": 0, "id": 1}
+    )
+    user_obj.id = saved["id"]
+    await revisions.bump(user_obj.id, "users")
+    
+    # Write through so this worker never serves the old profile
+    profile_cache.set(user_obj.id, user_obj)
     
     return user_obj
 
 @api_router.get("/users/{user_id}", response_model=UserProfile)
-async def get_user(user_id: str):
-    """Get user profile by ID"""
-    return await get_user_profile(user_id)
+async def get_user(user_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get user profile by ID (ETag / If-None-Match)"""
+    async def load():
+        # Read from Mongo, not the profile cache: another worker's cached copy may predate the ETag
+        user = await db.users.find_one({"id": user_id}, model_projection(UserProfile))
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        profile_cache.set(user_id, UserProfile(**user))
+        return response_document(user, UserProfile)
+
+    return await conditional_json(user_id, "users", if_none_match, (), load)
 
 # Content Generation Routes
-@api_router.post("/content/generate", response_model=ContentItem)
-async def generate_content(request: ContentGenerateRequest):
+@api_router.post("/content/generate", response_model=GeneratedContent)
+async def generate_content(request: ContentGenerateRequest, response: Response,
+                           idempotency_key: Optional[str] = Header(None)):
     """Generate content with AI"""
-    # Get user profile
-    user = await get_user_profile(request.user_id)
+    async def generate():
+        # Get user profile
+        user = await get_user_profile(request.user_id)
     
-    # Generate content with LLM
-    content_data = await generate_content_with_llm(
-        user=user,
-        platform=request.platform,
-        content_type=request.content_type,
-        additional_context=request.additional_context
-    )
+        # Generate content with LLM
+        async with llm_admission(user.id):
+            content_data = await generate_content_with_llm(
+                user=user,
+                platform=request.platform,
+                content_type=request.content_type,
+                additional_context=request.additional_context,
+                bypass_cache=request.bypass_cache
+            )
     
-    # Create content item
-    content_obj = ContentItem(
-        user_id=request.user_id,
-        platform=request.platform,
-        content_type=request.content_type,
-        script=content_data.get("script", ""),
-        caption=content_data.get("caption", ""),
-        hooks=content_data.get("hooks", [])
+        return await save_generated_content(request.user_id, request.platform, request.content_type, content_data)
+
+    return await run_idempotent("content_generate", idempotency_key, request, response, generate)
+
+@api_router.post("/content/generate/batch", response_model=ContentBatchResponse)
+async def generate_content_batch(request: ContentBatchGenerateRequest, response: Response,
+                                 idempotency_key: Optional[str] = Header(None)):
+    """Generate content for several platforms at once"""
+    if not request.targets:
+        raise HTTPException(status_code=400, detail="At least one target is required")
+    if len(request.targets) > CONTENT_BATCH_MAX_TARGETS:
+        raise HTTPException(status_code=400, detail=f"At most {CONTENT_BATCH_MAX_TARGETS} targets per batch")
+    if any(not target.platform.strip() or not target.content_type.strip() for target in request.targets):
+        raise HTTPException(status_code=400, detail="Every target needs a platform and a content_type")
+    if request.strategy not in ("parallel", "combined"):
+        raise HTTPException(status_code=400, detail="strategy must be 'parallel' or 'combined'")
+
+    async def generate():
+        started = time.perf_counter()
+
+        # Profile and creator context are loaded once for every target
+        user = await get_user_profile(request.user_id)
+        creator_context = await get_prompt_context(user.id, request.additional_context)
+
+        # A parallel batch costs one rate-limit token per target, a combined batch one call
+        cost = 1 if request.strategy == "combined" else len(request.targets)
+        try:
+            async with llm_admission(user.id, cost):
+                if request.strategy == "combined":
+                    results = await generate_batch_combined(user, request, creator_context)
+                else:
+                    results = await generate_batch_parallel(user, request, creator_context)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logging.error(f"Error generating content batch with LLM: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to generate content: {str(e)}")
+
+        items = [
+            ContentBatchItem(
+                content=build_content_item(request.user_id, target.platform, target.content_type, content_data),
+                latency_ms=round(latency_ms, 1)
+            )
+            for target, (content_data, latency_ms) in zip(request.targets, results)
+        ]
+        await persist_content_items([item.content for item in items])
+
+        return ContentBatchResponse(
+            strategy=request.strategy,
+            items=items,
+            total_latency_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+    return await run_idempotent("content_generate_batch", idempotency_key, request, response, generate)
+
+@api_router.post("/content/generate/stream")
+async def generate_content_stream(request: ContentGenerateRequest):
+    """Generate content with AI, streaming hooks, script and caption as Server-Sent Events"""
+    user = await get_user_profile(request.user_id)
+    creator_context = await get_prompt_context(user.id, request.additional_context)
+    system_message, user_prompt = build_content_prompts(
+        user, request.platform, request.content_type, request.additional_context, creator_context
+    )
+    # Admitted before the response starts so a rejection is a real 429, not an SSE error event
+    admitted = await admit_llm_request(user.id)
+
+    async def event_stream():
+        parser = ContentStreamParser()
+        chunks = []
+        try:
+            async for chunk in stream_llm_prompt(
+                "content_gen", user.id, system_message, user_prompt, bypass_cache=request.bypass_cache,
+                cache_prompt=content_cache_prompt(user, request.platform, request.content_type,
+                                                  request.additional_context)
+            ):
+                chunks.append(chunk)
+                yield format_sse("token", {"text": chunk})
+                for event, payload in parser.feed(chunk):
+                    yield format_sse(event, payload)
+
+            # Already streamed to the client, so repeats can only be flagged and gaps filled with fallbacks
+            content_data = await parse_content_response(
+                "".join(chunks), user, request.platform, request.content_type, reask=False
+            )
+            content_data = await screen_near_duplicates(
+                user, request.platform, request.content_type, content_data, regenerate=False
+            )
+            content_obj = await save_generated_content(
+                request.user_id, request.platform, request.content_type, content_data
+            )
+            yield format_sse("done", jsonable_encoder(content_obj))
+        except Exception as e:
+            logging.error(f"Error streaming content with LLM: {str(e)}")
+            yield format_sse("error", {"detail": f"Failed to generate content: {str(e)}"})
+        finally:
+            admitted.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also releases the slot if the client disconnects before the stream starts
+        background=BackgroundTask(admitted.release)
     )
-    
-    # Save to database
-    await db.content.insert_one(content_obj.dict())
-    
-    return content_obj
 
 @api_router.get("/content/history/{user_id}", response_model=List[ContentItem])
-async def get_content_history(user_id: str, limit: int = 20):
-    """Get user's content history"""
-    content_list = await db.content.find({"user_id": user_id}).sort("created_at", -1).limit(limit).to_list(limit)
-    return [ContentItem(**content) for content in content_list]
+async def get_content_history(user_id: str, limit: int = 20, if_none_match: Optional[str] = Header(None)):
+    """Get user's content history (ETag / If-None-Match)"""
+    async def load():
+        projection = model_projection(ContentItem)
+        # Buffered before stored: taken first, so an item flushed meanwhile is in one of the two
+        pending = [project(document, projection) for document in write_behind.pending(user_id)]
+        content_list = await db.content.find(
+            {"user_id": user_id}, projection
+        ).sort("created_at", -1).limit(limit).to_list(limit)
+        return response_documents(merge_keyset(content_list, pending, None, limit), ContentItem)
+
+    return await conditional_json(user_id, "content", if_none_match, ("history", limit, *pending_ids(user_id)), load)
+
+@api_router.get("/content/history/{user_id}/page", response_model=ContentHistoryPage)
+async def get_content_history_page(user_id: str, cursor: Optional[str] = None,
+                                   limit: int = Query(20, ge=1, le=100), fields: Optional[str] = None,
+                                   if_none_match: Optional[str] = Header(None)):
+    """Get one keyset-paginated page of a user's content history, newest first (ETag / If-None-Match)"""
+    if fields:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - set(ContentItem.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    else:
+        selected = set(ContentSummary.model_fields)
+    # The sort key is always returned so the next cursor can be built
+    projection = {field: 1 for field in selected | {"id", "created_at"}}
+    projection["_id"] = 0
+
+    try:
+        query = keyset_query({"user_id": user_id}, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def load():
+        pending = [project(document, projection) for document in write_behind.pending(user_id)]
+        # Fetch one extra item to know whether another page exists
+        items = await db.content.find(query, projection).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+        items = merge_keyset(items, pending, cursor, limit + 1)
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    variant = ("page", cursor, limit, ",".join(sorted(selected)), *pending_ids(user_id))
+    return await conditional_json(user_id, "content", if_none_match, variant, load)
+
+@api_router.get("/content/search/{user_id}", response_model=ContentSearchResponse)
+async def search_content(user_id: str, q: str = Query(..., min_length=1, max_length=500),
+                         limit: int = Query(10, ge=1, le=50), backend: str = "bm25"):
+    """Rank a user's past content by relevance to `q` (captions, hooks and scripts)"""
+    if backend not in ("bm25", "text"):
+        raise HTTPException(status_code=400, detail="backend must be 'bm25' or 'text'")
+    started = time.perf_counter()
+    if backend == "text":
+        items = await text_search(db, user_id, q, limit)
+    else:
+        items = await content_search.search(user_id, q, limit)
+    return ContentSearchResponse(
+        query=q,
+        backend=backend,
+        items=items,
+        took_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
+@api_router.get("/content/export/{user_id}")
+async def export_content_history(user_id: str, gzip: bool = False,
+                                 batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE)):
+    """Stream a user's full content history as NDJSON (newest first), optionally gzipped"""
+    # The export reads Mongo only, so buffered content goes there first
+    await write_behind.flush()
+    filename = f"content-{user_id}.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_ndjson(db.content, {"user_id": user_id}, batch_size, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.post("/content/import")
+async def import_content_history(http_request: Request,
+                                 batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE)):
+    """Bulk-insert an NDJSON (or gzip NDJSON) request body of ContentItems; reports counts and throughput"""
+    stats = await import_ndjson(
+        db,
+        iter_ndjson_lines(http_request.stream()),
+        lambda raw: ContentItem(**raw).dict(),
+        batch_size,
+        revisions=revisions,
+    )
+    logging.info(f"Content import finished: {stats}")
+    return stats
 
 # Daily Plan Routes
-@api_router.post("/daily-plan/generate", response_model=DailyPlan)
-async def generate_daily_plan(request: DailyPlanGenerate):
+@api_router.post("/daily-plan/generate", response_model=GeneratedDailyPlan)
+async def generate_daily_plan(request: DailyPlanGenerate, response: Response,
+                              idempotency_key: Optional[str] = Header(None)):
     """Generate daily content plan"""
-    # Get user profile
-    user = await get_user_profile(request.user_id)
-    
-    # Generate plan with LLM
-    plan_items = await generate_daily_plan_with_llm(user)
-    
-    # Create daily plan
-    today = datetime.utcnow().strftime("%Y-%m-%d")
-    plan_obj = DailyPlan(
-        user_id=request.user_id,
-        date=today,
-        plan_items=plan_items
-    )
+    async def generate():
+        # Get user profile
+        user = await get_user_profile(request.user_id)
     
-    # Check if plan for today already exists
-    existing_plan = await db.daily_plans.find_one({"user_id": request.user_id, "date": today})
-    if existing_plan:
-        # Update existing plan
-        await db.daily_plans.update_one(
-            {"id": existing_plan["id"]},
-            {"$set": plan_obj.dict()}
-        )
-        plan_obj.id = existing_plan["id"]
-    else:
-        # Create new plan
-        await db.daily_plans.insert_one(plan_obj.dict())
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+
+        # Generate plan with LLM
+        try:
+            async with llm_admission(user.id):
+                plan_items = await generate_daily_plan_with_llm(user, bypass_cache=request.bypass_cache)
+        except LLMTimeout as e:
+            # Serve today's stored plan, else the default plan without storing it over a later real one
+            logging.warning(f"LLM deadline exceeded, serving the stored or default plan: {str(e)}")
+            stored = await db.daily_plans.find_one({"user_id": request.user_id, "date": today},
+                                                   model_projection(DailyPlan))
+            record_degraded("daily_plan", "stored" if stored else "fallback")
+            if stored:
+                return GeneratedDailyPlan(**stored, degraded=True)
+            return GeneratedDailyPlan(user_id=request.user_id, date=today, plan_items=default_plan_items(user),
+                                      degraded=True)
     
-    return plan_obj
+        # Create or replace today's plan
+        return await upsert_daily_plan(request.user_id, today, plan_items)
+
+    return await run_idempotent("daily_plan_generate", idempotency_key, request, response, generate)
+
+@api_router.post("/daily-plan/generate-range", response_model=DailyPlanRange)
+async def generate_daily_plan_range(request: DailyPlanRangeGenerate, response: Response,
+                                    idempotency_key: Optional[str] = Header(None)):
+    """Generate the plans for a range of days with one LLM call"""
+    dates = parse_plan_dates(request.start_date, request.end_date)
+
+    async def generate():
+        user = await get_user_profile(request.user_id)
+        degraded = False
+        try:
+            async with llm_admission(user.id):
+                plans, fallback_dates = await generate_daily_plan_range_with_llm(user, dates, request.bypass_cache)
+        except LLMTimeout as e:
+            logging.warning(f"LLM deadline exceeded, serving stored or default plans: {str(e)}")
+            record_degraded("daily_plan_range", "fallback")
+            plans, fallback_dates = {date: default_plan_items(user) for date in dates}, list(dates)
+            degraded = True
+        stored = await upsert_daily_plans(request.user_id, plans, fallback_dates)
+        return DailyPlanRange(plans=stored, fallback_dates=fallback_dates, degraded=degraded)
+
+    return await run_idempotent("daily_plan_generate_range", idempotency_key, request, response, generate)
+
+@api_router.get("/daily-plan/range/{user_id}", response_model=List[DailyPlan])
+async def get_plan_range(user_id: str, start_date: str, end_date: str,
+                         if_none_match: Optional[str] = Header(None)):
+    """Get a user's plans from start_date to end_date inclusive (ETag / If-None-Match)"""
+    parse_plan_dates(start_date, end_date)
+
+    async def load():
+        return response_documents(await find_daily_plans(user_id, start_date, end_date), DailyPlan)
+
+    return await conditional_json(user_id, "daily_plans", if_none_match, ("range", start_date, end_date), load)
 
 @api_router.get("/daily-plan/today/{user_id}", response_model=Optional[DailyPlan])
-async def get_today_plan(user_id: str):
-    """Get today's content plan"""
+async def get_today_plan(user_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get today's content plan (ETag / If-None-Match)"""
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    plan = await db.daily_plans.find_one({"user_id": user_id, "date": today})
-    
-    if not plan:
-        return None
-    
-    return DailyPlan(**plan)
+
+    async def load():
+        plan = await db.daily_plans.find_one({"user_id": user_id, "date": today}, model_projection(DailyPlan))
+        return response_document(plan, DailyPlan)
+
+    return await conditional_json(user_id, "daily_plans", if_none_match, ("today", today), load)
+
+# Cache Routes
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Get LLM response cache, in-flight coalescing and profile cache counters"""
+    return {
+        "llm": llm_cache.stats(),
+        "llm_inflight": llm_singleflight.stats(),
+        "profiles": profile_cache.stats(),
+        "llm_providers": llm_gateway.stats(),
+        "admission": admission.stats() if admission else None,
+        "idempotency": idempotency_store.stats(),
+        "search": content_search.stats(),
+        "related_search": related_search.stats(),
+        "near_duplicates": near_duplicates.stats(),
+        "revisions": revisions.stats(),
+        "write_behind": write_behind.stats(),
+        "startup": startup_stats,
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of the API metrics (METRICS_ENABLED=0 disables)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -346,6 +1374,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the latency includes every other middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -353,6 +1385,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+# Nightly daily plan precompute (DAILY_PLAN_SCHEDULER_ENABLED=1)
+DAILY_PLAN_SCHEDULER_ENABLED = os.environ.get('DAILY_PLAN_SCHEDULER_ENABLED', '0') == '1'
+DAILY_PLAN_SCHEDULER_HOUR_UTC = int(os.environ.get('DAILY_PLAN_SCHEDULER_HOUR_UTC', '22'))
+background_tasks: List[asyncio.Task] = []
+
+# Open Mongo connections and load the LLM SDK before the worker starts serving (STARTUP_PREWARM=1)
+STARTUP_PREWARM = os.environ.get('STARTUP_PREWARM', '0') == '1'
+STARTUP_PREWARM_MONGO_CONNECTIONS = int(os.environ.get('STARTUP_PREWARM_MONGO_CONNECTIONS', '4'))
+startup_stats: Dict[str, Any] = {}
+
+async def prewarm():
+    """Fill the Mongo pool and import the LLM SDK so the first requests do not pay for either"""
+    started = time.perf_counter()
+    # Concurrent pings each check out their own pooled connection
+    await asyncio.gather(*(db.command("ping") for _ in range(STARTUP_PREWARM_MONGO_CONNECTIONS)))
+    startup_stats["mongo_prewarm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    started = time.perf_counter()
+    await llm_gateway.warm()
+    startup_stats["llm_prewarm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+async def startup_db_client():
+    started = time.perf_counter()
+    if STARTUP_PREWARM:
+        await prewarm()
+    await ensure_indexes(db)
+    await write_behind.start()
+    if PROFILE_CACHE_CHANGE_STREAM:
+        background_tasks.append(asyncio.create_task(
+            profile_cache.watch_changes(db.users, lambda document: UserProfile(**document))
+        ))
+    if DAILY_PLAN_SCHEDULER_ENABLED:
+        scheduler = scheduler_from_env(db, precompute_daily_plan, upsert_daily_plan)
+        background_tasks.append(asyncio.create_task(run_nightly(scheduler, DAILY_PLAN_SCHEDULER_HOUR_UTC)))
+        logger.info(f"Daily plan scheduler enabled, runs at {DAILY_PLAN_SCHEDULER_HOUR_UTC}:00 UTC")
+    startup_stats["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Startup complete: {startup_stats}")
+
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await llm_gateway.aclose()
+    # Before the client closes: the last batch goes to Mongo, or to the spill file
+    await write_behind.close()
     client.close()
@@ -0,0 +1,104 @@
+"""Incremental parsing of streamed content generations and SSE framing.
+
+`ContentStreamParser` consumes the LLM response chunk by chunk and reports
+each hook, the script and the caption as soon as its JSON string closes, so the
+streaming endpoint can push useful events long before the full JSON document
+is complete.  It is a single-pass scanner: every character is looked at once.
+"""
+import json
+from typing import List, Optional, Tuple
+
+
+def format_sse(event: str, data) -> str:
+    """Frame one Server-Sent Event; data is JSON encoded on a single line"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ContentStreamParser:
+    """Extract hooks/script/caption strings from a partially received JSON object.
+
+    Text before the first `{` (e.g. a markdown fence) is skipped.  Events are
+    `(name, payload)` tuples: `("hook", {"index": i, "text": ...})`,
+    `("script", {"text": ...})` and `("caption", {"text": ...})`.
+    """
+
+    STRING_FIELDS = ("script", "caption")
+
+    def __init__(self):
+        self._started = False
+        # Each frame is [container, current_key, expecting_key]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_chars: List[str] = []
+        self.hook_count = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        events = []
+        for char in chunk:
+            if self.done:
+                break
+            if self._in_string:
+                self._consume_string_char(char, events)
+            elif not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append(["object", None, True])
+            else:
+                self._consume_structure_char(char)
+        return events
+
+    def _consume_string_char(self, char: str, events: list):
+        if self._escaped:
+            self._escaped = False
+            self._string_chars.append(char)
+        elif char == "\\":
+            self._escaped = True
+            self._string_chars.append(char)
+        elif char == '"':
+            self._in_string = False
+            value = self._decode("".join(self._string_chars))
+            self._string_chars = []
+            event = self._on_string(value)
+            if event is not None:
+                events.append(event)
+        else:
+            self._string_chars.append(char)
+
+    def _consume_structure_char(self, char: str):
+        frame = self._stack[-1]
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._stack.append(["object" if char == "{" else "array", None, char == "{"])
+        elif char in "}]":
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+        elif char == "," and frame[0] == "object":
+            frame[2] = True
+        elif char == ":" and frame[0] == "object":
+            frame[2] = False
+
+    def _on_string(self, value: str) -> Optional[Tuple[str, dict]]:
+        frame = self._stack[-1]
+        if frame[0] == "object" and frame[2]:
+            frame[1] = value
+            return None
+
+        depth = len(self._stack)
+        if depth == 1 and frame[1] in self.STRING_FIELDS:
+            return frame[1], {"text": value}
+        if depth == 2 and frame[0] == "array" and self._stack[0][1] == "hooks":
+            event = ("hook", {"index": self.hook_count, "text": value})
+            self.hook_count += 1
+            return event
+        return None
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
@@ -0,0 +1,106 @@
+"""Per-user in-memory indexes over `db.content`, shared by search and near-duplicate detection.
+
+`UserIndexes` builds one index object per user from the user's content (the
+newest `window` items, or all of them) plus whatever the write-behind buffer
+has not flushed yet, and folds newly inserted documents into the indexes that
+are already loaded.  Index objects only need `add(document)` and a `ready`
+flag.  They are held in a bounded TTL cache; the TTL also bounds how long
+another API worker's inserts can be missing from this worker's indexes.
+
+Callers on a request path use `loaded`, which never waits: it returns the
+ready index or starts the build in the background and returns None.  `warm`
+starts that build early, e.g. before an LLM call whose result is checked
+against the index afterwards.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from caching import TTLCache
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class UserIndexes:
+    def __init__(self, db, new_index: Callable[[], Any], projection: dict, max_users: int = 1000,
+                 ttl_seconds: float = 600, pending: Optional[Callable[[str], List[dict]]] = None,
+                 window: Optional[int] = None,
+                 prepare: Optional[Callable[[List[dict]], Awaitable]] = None):
+        self.db = db
+        self.new_index = new_index
+        self.projection = projection
+        self.pending = pending or (lambda user_id: [])
+        # Only the newest `window` items of a history are read into a build (all of them if None)
+        self.window = window
+        # Awaited with the documents read from Mongo before they are added (e.g. to backfill fields)
+        self.prepare = prepare
+        self._indexes = TTLCache(max_users, ttl_seconds)
+        self._builds = SingleFlight()
+        self._background: Dict[str, asyncio.Task] = {}
+        self.builds = 0
+
+    def __len__(self):
+        return len(self._indexes)
+
+    async def _build(self, user_id: str):
+        index = self.new_index()
+        # Inserts racing the build are added to the same object (duplicates are ignored)
+        self._indexes.set(user_id, index)
+        try:
+            cursor = self.db.content.find({"user_id": user_id}, self.projection)
+            if self.window is not None:
+                cursor = cursor.sort([("created_at", -1), ("id", -1)]).limit(self.window)
+            documents = [document async for document in cursor.batch_size(1000)]
+            if self.prepare is not None:
+                await self.prepare(documents)
+            for document in documents:
+                index.add(document)
+            # Content still in the write-behind buffer is not in Mongo yet
+            for document in self.pending(user_id):
+                index.add(document)
+        except BaseException:
+            self._indexes.delete(user_id)
+            raise
+        index.ready = True
+        self.builds += 1
+        return index
+
+    async def index_for(self, user_id: str):
+        """The user's index, built first if it is not loaded"""
+        index = self._indexes.get(user_id)
+        if index is not None and index.ready:
+            return index
+        return await self._builds.do(user_id, lambda: self._build(user_id))
+
+    def loaded(self, user_id: str):
+        """The user's index if it is ready; None (and a background build) otherwise"""
+        index = self._indexes.get(user_id)
+        if index is not None and index.ready:
+            return index
+        self.warm(user_id)
+        return None
+
+    def warm(self, user_id: str):
+        """Start building the user's index in the background unless it is loaded or being built"""
+        index = self._indexes.get(user_id)
+        if (index is not None and index.ready) or user_id in self._background:
+            return
+        task = asyncio.create_task(self.index_for(user_id))
+        self._background[user_id] = task
+        task.add_done_callback(lambda done: self._background_done(user_id, done))
+
+    def _background_done(self, user_id: str, task: asyncio.Task):
+        self._background.pop(user_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background index build for {user_id} failed: {str(task.exception())}")
+
+    def add(self, documents: Iterable[dict]):
+        """Fold newly inserted content into the indexes that are already loaded"""
+        for document in documents:
+            index = self._indexes.get(document["user_id"])
+            if index is not None:
+                index.add(document)
+
+    def stats(self) -> dict:
+        return {"users_indexed": len(self._indexes), "builds": self.builds, "cache": self._indexes.stats()}
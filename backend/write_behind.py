@@ -0,0 +1,228 @@
+"""Write-behind buffer for generated content.
+
+With CONTENT_WRITE_BEHIND=1, generation routes hand their `content`
+documents to the buffer and respond without waiting for Mongo.  A background
+task flushes the buffer with unordered `insert_many` calls as soon as it
+holds `max_batch` documents, and otherwise every `max_delay_seconds`; the
+lifespan shutdown flushes whatever is left.
+
+When a flush fails because Mongo is unreachable, the batch is appended (and
+fsynced) to a local JSONL spill file and retried on the next flush, including
+after a restart.  Documents get their `_id` before the first attempt, so a
+retry of a partially applied batch only hits duplicate-key errors, which are
+ignored.  What stays at risk is a process crash with documents still in
+memory: at most one batch or `max_delay_seconds` of generations.
+
+Until a document is in Mongo, `pending(user_id)` returns it so history reads
+can merge it in (read-your-writes).  The `on_flush` callback runs only after
+the insert, so revisions (and with them ETags) change once every worker can
+read the document, never before.  Readers take that snapshot before
+querying Mongo, so a flush finishing in between leaves the document in both
+results (merged by id) rather than in neither.
+
+Disabled (the default), `write` inserts directly and `pending` is empty.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+from metrics import record_write_behind
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPILL_PATH = Path(__file__).parent / "content_spill.jsonl"
+
+
+class WriteBehindBuffer:
+    def __init__(self, collection, enabled: bool = False, max_batch: int = 100, max_delay_seconds: float = 0.5,
+                 spill_path=DEFAULT_SPILL_PATH, on_flush: Optional[Callable[[List[dict]], Awaitable]] = None):
+        self.collection = collection
+        # Called with each batch once it is in Mongo (e.g. to bump the revisions behind ETags)
+        self.on_flush = on_flush
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay_seconds = max_delay_seconds
+        self.spill_path = Path(spill_path)
+        self._queued: List[dict] = []
+        # Every document not yet confirmed in Mongo (queued, in flight or spilled), by user and id
+        self._unflushed: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        self._spilled: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed = 0
+        self.batches = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    async def start(self):
+        """Load documents spilled by an earlier run and start the background flusher"""
+        if not self.enabled:
+            return
+        for document in await asyncio.to_thread(self._read_spill):
+            self._spilled.append(document)
+            self._unflushed[document["user_id"]][document["id"]] = document
+        if self._spilled:
+            logger.info(f"Replaying {len(self._spilled)} spilled content documents")
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if not self._stopping and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.max_delay_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # flush() puts the batch back first, so the next pass retries it
+                logger.error(f"Write-behind flush failed: {str(e)}")
+
+    async def write(self, documents: List[dict]):
+        """Store content documents (queued when enabled, inserted right away otherwise)"""
+        if not documents:
+            return
+        if not self.enabled:
+            if len(documents) == 1:
+                await self.collection.insert_one(documents[0])
+            else:
+                await self.collection.insert_many(documents)
+            return
+        for document in documents:
+            # Assigned up front so a retried batch is recognized by its duplicate-key errors
+            document.setdefault("_id", ObjectId())
+            self._queued.append(document)
+            self._unflushed[document["user_id"]][document["id"]] = document
+        self._ensure_flusher()
+        if len(self._queued) >= self.max_batch:
+            self._wake.set()
+
+    def pending(self, user_id: str) -> List[dict]:
+        """A user's documents that may not be in Mongo yet"""
+        documents = self._unflushed.get(user_id)
+        return list(documents.values()) if documents else []
+
+    async def flush(self):
+        """Insert the spilled and queued documents; spill the batch again if Mongo is unreachable"""
+        async with self._lock:
+            if self._spilled:
+                if not await self._insert(self._spilled):
+                    # Mongo is still down: spill the queue too rather than hold it in memory
+                    await self._spill(self._queued)
+                    return
+                await asyncio.to_thread(self._truncate_spill)
+                self._spilled = []
+            while self._queued:
+                batch, self._queued = self._queued[:self.max_batch], self._queued[self.max_batch:]
+                try:
+                    if not await self._insert(batch):
+                        await self._spill(batch + self._queued)
+                        return
+                except BaseException:
+                    # Cancelled or failed before the batch reached Mongo or the spill file: queue it again
+                    # (an insert that did land is recognized by its _id on the retry)
+                    self._queued[:0] = batch
+                    raise
+
+    async def _spill(self, documents: List[dict]):
+        if not documents:
+            return
+        await asyncio.to_thread(self._append_spill, documents)
+        self._spilled.extend(documents)
+        # Written by this call, so taken off the queue whatever else was queued meanwhile
+        spilled_ids = {id(document) for document in documents}
+        self._queued = [document for document in self._queued if id(document) not in spilled_ids]
+        self.spilled += len(documents)
+        record_write_behind("spilled", len(documents))
+
+    async def _insert(self, batch: List[dict]) -> bool:
+        """True once every document in the batch is in Mongo (or can never be inserted)"""
+        errors = []
+        try:
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys are documents an earlier, partially applied attempt already inserted
+                errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            if self.on_flush is not None:
+                # A failure here retries the batch too: the insert is then a no-op, the callback is not
+                await self.on_flush(batch)
+        except Exception as e:
+            # Unreachable Mongo or anything else: the spill file keeps the batch for a retry
+            logger.warning(f"Write-behind insert of {len(batch)} documents failed, spilling: {str(e)}")
+            return False
+        for error in errors:
+            logger.error(f"Dropping content document {batch[error['index']].get('id')}: {error.get('errmsg')}")
+        self.dropped += len(errors)
+        for document in batch:
+            user_documents = self._unflushed.get(document["user_id"])
+            if user_documents is not None:
+                user_documents.pop(document["id"], None)
+                if not user_documents:
+                    del self._unflushed[document["user_id"]]
+        self.flushed += len(batch) - len(errors)
+        self.batches += 1
+        record_write_behind("flushed", len(batch) - len(errors))
+        return True
+
+    def _append_spill(self, batch: List[dict]):
+        with self.spill_path.open("a", encoding="utf-8") as spill:
+            for document in batch:
+                spill.write(json_util.dumps(document) + "\n")
+            spill.flush()
+            os.fsync(spill.fileno())
+
+    def _read_spill(self) -> List[dict]:
+        if not self.spill_path.exists():
+            return []
+        with self.spill_path.open(encoding="utf-8") as spill:
+            return [json_util.loads(line) for line in spill if line.strip()]
+
+    def _truncate_spill(self):
+        self.spill_path.unlink(missing_ok=True)
+
+    async def close(self):
+        """Stop the flusher after its current pass and flush what is left (spilled if Mongo is unreachable)"""
+        self._stopping = True
+        if self._flusher is not None:
+            # Not cancelled: an insert in flight finishes (or spills) instead of being abandoned
+            self._wake.set()
+            await self._flusher
+            self._flusher = None
+        if self.enabled:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._queued),
+            "unflushed": sum(len(documents) for documents in self._unflushed.values()),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+        }
+
+
+def write_behind_from_env(collection, on_flush: Optional[Callable[[List[dict]], Awaitable]] = None
+                          ) -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        collection,
+        enabled=os.environ.get("CONTENT_WRITE_BEHIND", "0") == "1",
+        max_batch=int(os.environ.get("CONTENT_WRITE_BEHIND_MAX_BATCH", "100")),
+        max_delay_seconds=float(os.environ.get("CONTENT_WRITE_BEHIND_MAX_DELAY_SECONDS", "0.5")),
+        spill_path=os.environ.get("CONTENT_WRITE_BEHIND_SPILL_PATH", str(DEFAULT_SPILL_PATH)),
+        on_flush=on_flush,
+    )
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Hedged LLM request benchmark (fully offline)
+
+Two stub providers with heavy-tailed (lognormal) latency.  Compares the
+primary alone with the gateway hedging to the second provider after a fixed
+delay or the rolling p90 ("auto"), reporting p50/p99 latency and the extra
+provider calls the hedges cost.
+
+    python benchmarks/bench_hedging.py --calls 500 --median-ms 40 --sigma 0.8
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from llm_gateway import FakeProvider, LLMGateway  # noqa: E402
+
+
+class LognormalProvider(FakeProvider):
+    def __init__(self, model: str, median_ms: float, sigma: float):
+        super().__init__(model=model, max_concurrency=1000)
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    def _delay(self) -> float:
+        return random.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+
+async def run(gateway: LLMGateway, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await gateway.complete("s", "p", "id")
+            timings.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    timings.sort()
+    provider_calls = sum(provider.calls for provider in gateway.providers.values())
+    return {
+        "p50_ms": round(timings[len(timings) // 2], 1),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 1),
+        "provider_calls_per_request": round(provider_calls / calls, 3),
+        "hedges": gateway.hedges,
+        "hedge_wins": gateway.hedge_wins,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Hedged LLM request benchmark")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--median-ms", type=float, default=40.0)
+    parser.add_argument("--sigma", type=float, default=0.8, help="Lognormal sigma (tail heaviness)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    def providers():
+        return [LognormalProvider("primary", args.median_ms, args.sigma),
+                LognormalProvider("secondary", args.median_ms, args.sigma)]
+
+    results = {
+        "primary_only": await run(LLMGateway(providers()[:1]), args.calls, args.concurrency),
+        "hedge_fixed_2x_median": await run(
+            LLMGateway(providers(), hedge_delay=args.median_ms * 2 / 1000), args.calls, args.concurrency
+        ),
+    }
+    auto = LLMGateway(providers(), hedge_delay="auto")
+    await run(auto, 100, args.concurrency)  # warm the latency window
+    for provider in auto.providers.values():
+        provider.calls = 0
+    auto.hedges = auto.hedge_wins = 0
+    results["hedge_auto_p90"] = await run(auto, args.calls, args.concurrency)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Index benchmark for the hot server.py queries
+
+Seeds a scratch database on a local MongoDB with users, content and daily
+plans, then runs each hot query before and after `ensure_indexes`, printing
+the winning plan stage, documents examined and latency percentiles.
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_indexes.py --content 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from indexes import ensure_indexes  # noqa: E402
+
+PLATFORMS = ["Instagram", "TikTok", "YouTube"]
+
+
+async def seed(db, users: int, content: int, batch_size: int = 10000):
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    await db.users.insert_many([
+        {"id": user_id, "name": f"Creator {idx}", "niche": "Fitness", "tone": "Casual",
+         "target_audience": "Everyone", "platforms": PLATFORMS, "created_at": datetime.utcnow()}
+        for idx, user_id in enumerate(user_ids)
+    ])
+
+    start = datetime.utcnow() - timedelta(days=365)
+    inserted = 0
+    while inserted < content:
+        count = min(batch_size, content - inserted)
+        await db.content.insert_many([
+            {"id": str(uuid.uuid4()), "user_id": random.choice(user_ids), "platform": random.choice(PLATFORMS),
+             "content_type": "Reel", "script": "script " * 40, "caption": "caption #tag", "hooks": ["a", "b", "c"],
+             "created_at": start + timedelta(seconds=random.randint(0, 365 * 86400)), "posted": False}
+            for _ in range(count)
+        ], ordered=False)
+        inserted += count
+        print(f"  seeded {inserted}/{content} content documents", end="\r")
+    print()
+
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    await db.daily_plans.insert_many([
+        {"id": str(uuid.uuid4()), "user_id": user_id, "date": today, "plan_items": [], "generated_at": datetime.utcnow()}
+        for user_id in user_ids
+    ])
+    return user_ids
+
+
+def hot_queries(db, user_ids):
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    return {
+        "users.find_one(id)": lambda: (db.users, {"id": random.choice(user_ids)}, None, 1),
+        "users.find_one(name)": lambda: (db.users, {"name": f"Creator {random.randrange(len(user_ids))}"}, None, 1),
+        "content.history(user_id, created_at desc)": lambda: (
+            db.content, {"user_id": random.choice(user_ids)}, [("created_at", -1)], 20
+        ),
+        "daily_plans.find_one(user_id, date)": lambda: (
+            db.daily_plans, {"user_id": random.choice(user_ids), "date": today}, None, 1
+        ),
+    }
+
+
+def winning_stages(plan: dict):
+    stages = []
+    while plan:
+        stages.append(plan["stage"])
+        plan = plan.get("inputStage")
+    return " <- ".join(stages)
+
+
+async def measure(db, user_ids, iterations: int):
+    results = {}
+    for name, make_query in hot_queries(db, user_ids).items():
+        collection, query, sort, limit = make_query()
+        cursor = collection.find(query).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stats = explain["executionStats"]
+
+        timings = []
+        for _ in range(iterations):
+            collection, query, sort, limit = make_query()
+            cursor = collection.find(query).limit(limit)
+            if sort:
+                cursor = cursor.sort(sort)
+            started = time.perf_counter()
+            await cursor.to_list(limit)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        results[name] = {
+            "plan": winning_stages(explain["queryPlanner"]["winningPlan"]),
+            "docs_examined": stats["totalDocsExamined"],
+            "keys_examined": stats["totalKeysExamined"],
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        }
+    return results
+
+
+def print_results(label: str, results: dict):
+    print(f"\n{label}")
+    for name, row in results.items():
+        print(f"  {name:45} {row['plan']:40} docs={row['docs_examined']:>8} "
+              f"keys={row['keys_examined']:>6} p50={row['p50_ms']:>8}ms p95={row['p95_ms']:>8}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--content", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[f"creatoros_index_bench_{uuid.uuid4().hex[:8]}"]
+    try:
+        print(f"Seeding {args.users} users and {args.content} content documents into {db.name}")
+        user_ids = await seed(db, args.users, args.content)
+
+        before = await measure(db, user_ids, args.iterations)
+        print_results("Without indexes", before)
+
+        started = time.perf_counter()
+        await ensure_indexes(db)
+        print(f"\nensure_indexes took {time.perf_counter() - started:.1f}s")
+
+        after = await measure(db, user_ids, args.iterations)
+        print_results("With indexes", after)
+
+        if args.output:
+            Path(args.output).write_text(json.dumps(
+                {"users": args.users, "content": args.content, "before": before, "after": after}, indent=2
+            ))
+    finally:
+        if not args.keep:
+            await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
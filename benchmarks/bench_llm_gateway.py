@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+LLM gateway overhead and connection reuse benchmark (fully offline)
+
+1. Gateway overhead: calls through a zero-latency FakeProvider versus calling
+   the provider's raw `_complete`, giving the per-call cost of the
+   concurrency limit, timeout and counters.
+2. Connection reuse: a local fake OpenAI-compatible server is started on
+   127.0.0.1 and the pooled HTTPProvider is compared with building a fresh
+   httpx client per call (what per-request client construction costs).
+
+    python benchmarks/bench_llm_gateway.py --calls 500 --concurrency 16 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from llm_gateway import FakeProvider, HTTPProvider, fake_response  # noqa: E402
+
+SYSTEM_MESSAGE = "You are a professional content strategist."
+USER_PROMPT = "Create a Reel for Instagram."
+
+
+def fake_openai_app(latency_ms: float, connections: set):
+    app = FastAPI()
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        connections.add((request.client.host, request.client.port))
+        await asyncio.sleep(latency_ms / 1000)
+        return {"choices": [{"message": {"content": fake_response(SYSTEM_MESSAGE, USER_PROMPT)}}]}
+
+    return app
+
+
+async def run_calls(call, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "calls_per_second": round(calls / elapsed, 1),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+async def bench_overhead(calls: int):
+    provider = FakeProvider()
+    direct = await run_calls(lambda: provider._complete(SYSTEM_MESSAGE, USER_PROMPT, "s"), calls, 1)
+    gateway = await run_calls(lambda: provider.complete(SYSTEM_MESSAGE, USER_PROMPT, "s"), calls, 1)
+    return {
+        "direct": direct,
+        "gateway": gateway,
+        "overhead_us_per_call": round((gateway["mean_ms"] - direct["mean_ms"]) * 1000, 2),
+    }
+
+
+async def bench_connections(calls: int, concurrency: int, latency_ms: float, port: int):
+    connections = set()
+    server = uvicorn.Server(uvicorn.Config(
+        fake_openai_app(latency_ms, connections), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        pooled = HTTPProvider(base_url, "key", "fake", max_concurrency=concurrency)
+        pooled_result = await run_calls(lambda: pooled.complete(SYSTEM_MESSAGE, USER_PROMPT, "s"), calls, concurrency)
+        pooled_result["connections_opened"] = len(connections)
+        await pooled.aclose()
+
+        connections.clear()
+
+        async def fresh_client_call():
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                response = await client.post("/chat/completions", json={"messages": []})
+                response.raise_for_status()
+                return response.json()["choices"][0]["message"]["content"]
+
+        fresh_result = await run_calls(fresh_client_call, calls, concurrency)
+        fresh_result["connections_opened"] = len(connections)
+    finally:
+        server.should_exit = True
+        await serve_task
+
+    return {"pooled_client": pooled_result, "client_per_call": fresh_result}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="LLM gateway overhead and connection reuse benchmark")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake provider server latency")
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {
+        "overhead": await bench_overhead(args.calls),
+        "connections": await bench_connections(args.calls, args.concurrency, args.latency_ms, args.port),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
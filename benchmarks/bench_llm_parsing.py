@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+LLM response parsing benchmark (fully offline)
+
+Times extract_json (backend/llm_parsing.py) on content responses of growing
+size in the shapes models actually return: bare JSON, fenced with prose
+around it, and truncated mid-caption.  The time per KB should stay flat as
+responses grow (the extraction is linear).
+
+    python benchmarks/bench_llm_parsing.py --sizes 4 64 1024 --repeat 20
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from llm_parsing import extract_json  # noqa: E402
+
+
+def responses(size_kb: int) -> dict:
+    sentence = 'Step {n}: film the "before" shot, then the [after] one, {{no filters}}. '
+    script = "".join(sentence.format(n=n) for n in range(size_kb * 1024 // 70 + 1))
+    body = json.dumps({"hooks": ["Stop scrolling", "Nobody tells you this"], "script": script,
+                       "caption": "Save this for later #creator #tips"}, indent=2)
+    return {
+        "bare": body,
+        "fenced": f"Here is your content (draft [1]):\n```json\n{body}\n```\nLet me know if you want changes!",
+        "truncated": body[:body.rindex("#tips")],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM response parsing benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 64, 1024], help="Response sizes in KB")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        for shape, text in responses(size).items():
+            value, outcome = extract_json(text, dict)
+            assert value is not None, shape
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                extract_json(text, dict)
+            elapsed_ms = (time.perf_counter() - started) / args.repeat * 1000
+            results[f"{size}kb/{shape}"] = {
+                "outcome": outcome,
+                "ms": round(elapsed_ms, 3),
+                "us_per_kb": round(elapsed_ms * 1000 / (len(text) / 1024), 2),
+            }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
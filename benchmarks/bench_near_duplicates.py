@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate check benchmark (fully offline)
+
+Builds one creator's signature index from N synthetic past items and times
+`NearDuplicateDetector.check` for a new item (3 hooks and a caption), i.e.
+the per-request cost the check adds before content is persisted.
+
+    python benchmarks/bench_near_duplicates.py --history 1000 10000 --checks 500
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fingerprints import NearDuplicateDetector, UserFingerprints, content_fingerprints  # noqa: E402
+
+WORDS = ("the you your this why how stop scrolling nobody secret mistake habit morning routine protein meal prep "
+         "squat workout sleep coffee budget money camera edit reel video growth tips day week truth change "
+         "never always tried wrong right start quit").split()
+
+
+def fake_text(words: int) -> str:
+    return " ".join(random.choices(WORDS, k=words)).capitalize()
+
+
+def fake_item(idx: int) -> dict:
+    return {"id": str(idx), "user_id": "bench", "hooks": [fake_text(7) for _ in range(3)],
+            "caption": fake_text(20) + " #tips"}
+
+
+async def run(history: int, checks: int) -> dict:
+    detector = NearDuplicateDetector(db=None)
+    index = UserFingerprints()
+    started = time.perf_counter()
+    for idx in range(history):
+        item = fake_item(idx)
+        item["fingerprints"] = content_fingerprints(item)
+        index.add(item)
+    index.ready = True
+    load_ms = (time.perf_counter() - started) * 1000
+    detector._indexes.set("bench", index)
+
+    timings = []
+    for idx in range(checks):
+        item = fake_item(history + idx)
+        started = time.perf_counter()
+        await detector.check("bench", item)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "signatures": len(index.hooks) + len(index.captions),
+        "fingerprint_ms_per_item": round(load_ms / history, 3),
+        "check_p50_ms": round(timings[len(timings) // 2], 3),
+        "check_p99_ms": round(timings[int(len(timings) * 0.99) - 1], 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate check benchmark")
+    parser.add_argument("--history", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--checks", type=int, default=500)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {str(history): await run(history, args.checks) for history in args.history}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
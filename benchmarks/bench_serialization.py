@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Read-route serialization benchmark (fully offline)
+
+Serves the same in-memory content history through two throwaway routes:
+
+- pydantic: the previous history route, one ContentItem per document plus
+  FastAPI's response_model validation and stdlib JSON encoding,
+- orjson: the fast path (projected documents encoded directly with orjson,
+  see backend/serialization.py),
+
+and reports the time per request and per item for 20, 200 and 2000 items.
+No Mongo is involved, so the difference is serialization alone.
+
+    python benchmarks/bench_serialization.py --sizes 20 200 2000 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "creatoros_bench")
+os.environ.setdefault("LLM_GATEWAY_PROVIDER", "fake")
+
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from serialization import json_response, model_projection, response_documents  # noqa: E402
+from server import ContentItem  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def stored_documents(count: int) -> List[dict]:
+    """Content documents as stored in Mongo (with _id and internal fields)"""
+    now = datetime.utcnow().replace(microsecond=0)  # Mongo keeps milliseconds
+    documents = []
+    for idx in range(count):
+        document = ContentItem(
+            user_id="bench",
+            platform="Instagram",
+            content_type="Reel",
+            script="Open with the problem. Show the fix in three steps. Close with a call to action. " * 8,
+            caption=f"Post {idx}: save this for later #creator #tips",
+            hooks=["You are doing this wrong", "Nobody talks about this", "Try this today"],
+            created_at=now - timedelta(minutes=idx),
+        ).model_dump()
+        document["_id"] = ObjectId()
+        document["fingerprints"] = {"hooks": [1, 2, 3], "caption": 4}
+        documents.append(document)
+    return documents
+
+
+def build_app(size: int) -> FastAPI:
+    app = FastAPI()
+    full_documents = stored_documents(size)
+    # What the projection returns for the same documents
+    fields = model_projection(ContentItem)
+    projected_documents = [{key: value for key, value in document.items() if fields.get(key)}
+                           for document in full_documents]
+
+    @app.get("/pydantic", response_model=List[ContentItem])
+    async def pydantic_route():
+        return [ContentItem(**content) for content in full_documents]
+
+    @app.get("/orjson", response_model=List[ContentItem])
+    async def orjson_route():
+        return json_response(response_documents(projected_documents, ContentItem))
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    await client.get(path)  # warm up
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / requests * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Read-route serialization benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        app = build_app(size)
+        requests = max(5, args.requests * 20 // size)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            pydantic_ms = await measure(client, "/pydantic", requests)
+            orjson_ms = await measure(client, "/orjson", requests)
+            assert (await client.get("/pydantic")).json() == (await client.get("/orjson")).json()
+        results[str(size)] = {
+            "pydantic_ms": round(pydantic_ms, 3),
+            "orjson_ms": round(orjson_ms, 3),
+            "pydantic_us_per_item": round(pydantic_ms * 1000 / size, 2),
+            "orjson_us_per_item": round(orjson_ms * 1000 / size, 2),
+            "speedup": round(pydantic_ms / orjson_ms, 2),
+        }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
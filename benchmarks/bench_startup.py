@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: import time and time to first request
+
+Starts the API in a fresh interpreter (uvicorn on a free local port) and
+measures, per run:
+
+- import_ms: `import server` inside the worker,
+- ttfr_ms: process spawn until GET /api/ first answers (interpreter start,
+  imports and the lifespan startup),
+- first_generate_ms: the first POST /api/content/generate, which pays for
+  loading the LLM SDK unless the worker was started with STARTUP_PREWARM=1.
+
+The LLM SDK is a stand-in whose import takes --sdk-import-ms (like the real
+emergentintegrations dependency tree), or the installed SDK with --sdk real.
+Exits non-zero when a median exceeds --max-import-ms / --max-ttfr-ms, so it
+can gate regressions in CI.
+
+    python benchmarks/bench_startup.py --runs 5 --sdk-import-ms 1500
+    python benchmarks/bench_startup.py --max-import-ms 1500 --max-ttfr-ms 3000
+"""
+
+import argparse
+import asyncio
+import importlib.abc
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+sys.path.insert(0, str(ROOT_DIR / "benchmarks"))
+
+
+class SlowSdkFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Serves the fake emergentintegrations modules, sleeping on import like a heavy SDK"""
+
+    def __init__(self, chat_module: types.ModuleType, import_ms: float):
+        self.chat_module = chat_module
+        self.import_ms = import_ms
+
+    def find_spec(self, name, path, target=None):
+        if name == "emergentintegrations" or name.startswith("emergentintegrations."):
+            return importlib.util.spec_from_loader(name, self, is_package=not name.endswith(".chat"))
+        return None
+
+    def create_module(self, spec):
+        if spec.name.endswith(".chat"):
+            time.sleep(self.import_ms / 1000)
+            return self.chat_module
+        return types.ModuleType(spec.name)
+
+    def exec_module(self, module):
+        return None
+
+
+def child(args):
+    """Worker process: import the app, report the import time, then serve"""
+    from load_test import install_fake_llm, install_mongomock
+
+    if args.sdk == "fake":
+        install_fake_llm(lambda: 0.0)
+        chat_module = sys.modules["emergentintegrations.llm.chat"]
+        for name in ("emergentintegrations", "emergentintegrations.llm", "emergentintegrations.llm.chat"):
+            del sys.modules[name]
+        sys.meta_path.insert(0, SlowSdkFinder(chat_module, args.sdk_import_ms))
+    if args.mongo == "mongomock":
+        install_mongomock()
+
+    started = time.perf_counter()
+    import server
+
+    import_ms = (time.perf_counter() - started) * 1000
+    print(json.dumps({"import_ms": round(import_ms, 1)}), flush=True)
+
+    import uvicorn
+
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def measure(args, prewarm: bool) -> dict:
+    import httpx
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "MONGO_URL": os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+        "DB_NAME": f"creatoros_startup_{port}",
+        "EMERGENT_LLM_KEY": "startup-bench",
+        "LLM_GATEWAY_PROVIDER": "emergent",
+        "LLM_CACHE_BACKEND": "none",
+        "STARTUP_PREWARM": "1" if prewarm else "0",
+    }
+    command = [sys.executable, __file__, "--child", "--port", str(port), "--mongo", args.mongo,
+               "--sdk", args.sdk, "--sdk-import-ms", str(args.sdk_import_ms)]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        import_ms = json.loads(process.stdout.readline())["import_ms"]
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            while True:
+                try:
+                    if (await client.get("/api/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError("Worker exited before serving")
+                await asyncio.sleep(0.005)
+            ttfr_ms = (time.perf_counter() - started) * 1000
+
+            user = (await client.post("/api/users", json={
+                "name": "Startup", "niche": "Fitness", "tone": "Casual", "target_audience": "Beginners",
+                "platforms": ["Instagram"],
+            })).json()
+            generate_started = time.perf_counter()
+            response = await client.post("/api/content/generate", json={
+                "user_id": user["id"], "platform": "Instagram", "content_type": "Reel",
+            })
+            response.raise_for_status()
+            first_generate_ms = (time.perf_counter() - generate_started) * 1000
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"import_ms": import_ms, "ttfr_ms": round(ttfr_ms, 1), "first_generate_ms": round(first_generate_ms, 1)}
+
+
+async def run(args) -> dict:
+    results = {}
+    for variant, prewarm in (("lazy", False), ("prewarm", True)):
+        runs = [await measure(args, prewarm) for _ in range(args.runs)]
+        results[variant] = {
+            metric: round(statistics.median(run[metric] for run in runs), 1)
+            for metric in ("import_ms", "ttfr_ms", "first_generate_ms")
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mongo", choices=["local", "mongomock"], default="mongomock")
+    parser.add_argument("--sdk", choices=["fake", "real"], default="fake",
+                        help="real uses the installed emergentintegrations (and calls its API)")
+    parser.add_argument("--sdk-import-ms", type=float, default=1500.0, help="Import time of the fake SDK")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="Fail if the median import exceeds this")
+    parser.add_argument("--max-ttfr-ms", type=float, default=None, help="Fail if the median TTFR exceeds this")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    failures = []
+    if args.max_import_ms is not None and results["lazy"]["import_ms"] > args.max_import_ms:
+        failures.append(f"import {results['lazy']['import_ms']}ms > {args.max_import_ms}ms")
+    if args.max_ttfr_ms is not None and results["lazy"]["ttfr_ms"] > args.max_ttfr_ms:
+        failures.append(f"time to first request {results['lazy']['ttfr_ms']}ms > {args.max_ttfr_ms}ms")
+    if failures:
+        print("Startup regression: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the Creator OS API
+
+Boots `server.app` in-process (httpx ASGI transport, full lifespan) against a
+local MongoDB or mongomock-motor, with a fake `LlmChat` whose latency follows a
+configurable distribution, then drives every /api route at the requested
+concurrency.  Reports RPS, p50/p95/p99 latency, errors and memory per route and
+saves the results as JSON for comparison across commits.
+
+    python benchmarks/load_test.py --mongo mongomock --llm-latency lognormal:800:0.4 \
+        --concurrency 32 --requests 300
+    python benchmarks/load_test.py --compare test_reports/benchmarks/<earlier>.json
+    python benchmarks/load_test.py --cassette captures/llm_cassette.jsonl --cassette-latency 1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+PLATFORMS = ["Instagram", "TikTok", "YouTube"]
+SEARCH_TERMS = ["wrong", "fix steps", "save tips", "creator", "call to action"]
+
+
+# ============ Fake LLM ============
+
+def parse_latency(spec: str):
+    """constant:MS | uniform:LOW:HIGH | normal:MEAN:STDDEV | lognormal:MEDIAN:SIGMA (milliseconds)"""
+    kind, *params = spec.split(":")
+    params = [float(param) for param in params]
+    if kind == "constant":
+        return lambda: params[0]
+    if kind == "uniform":
+        return lambda: random.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(params[0]), params[1])
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+def install_fake_llm(sample_latency_ms):
+    """Register a fake emergentintegrations.llm.chat module before server.py is imported"""
+    from llm_gateway import fake_response
+
+    class UserMessage:
+        def __init__(self, text):
+            self.text = text
+
+    class LlmChat:
+        calls = 0
+
+        def __init__(self, api_key, session_id, system_message):
+            self.system_message = system_message
+
+        def with_model(self, provider, model):
+            return self
+
+        async def send_message(self, message):
+            LlmChat.calls += 1
+            await asyncio.sleep(sample_latency_ms() / 1000)
+            return fake_response(self.system_message, message.text)
+
+    chat_module = types.ModuleType("emergentintegrations.llm.chat")
+    chat_module.LlmChat = LlmChat
+    chat_module.UserMessage = UserMessage
+    sys.modules["emergentintegrations"] = types.ModuleType("emergentintegrations")
+    sys.modules["emergentintegrations.llm"] = types.ModuleType("emergentintegrations.llm")
+    sys.modules["emergentintegrations.llm.chat"] = chat_module
+    return LlmChat
+
+
+def install_mongomock():
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient
+
+    class MockClient(AsyncMongoMockClient):
+        def __init__(self, *args, event_listeners=None, **kwargs):
+            super().__init__(*args, **kwargs)
+
+    motor.motor_asyncio.AsyncIOMotorClient = MockClient
+
+
+# ============ Scenarios ============
+
+def user_payload():
+    return {
+        "name": f"Load Tester {uuid.uuid4().hex[:8]}",
+        "niche": "Fitness & Wellness",
+        "tone": "Motivational",
+        "target_audience": "Busy professionals",
+        "platforms": PLATFORMS,
+    }
+
+
+def build_scenarios(user_ids, bypass_cache: bool):
+    """Route name -> coroutine factory issuing one request with an httpx client"""
+    plan_start = datetime.utcnow().strftime("%Y-%m-%d")
+    plan_end = (datetime.utcnow() + timedelta(days=6)).strftime("%Y-%m-%d")
+
+    def import_body():
+        return "\n".join(json.dumps({
+            "user_id": random.choice(user_ids),
+            "platform": random.choice(PLATFORMS),
+            "content_type": "Post",
+            "script": "Imported script",
+            "caption": "Imported caption #loadtest",
+            "hooks": ["Imported hook"],
+        }) for _ in range(20)).encode("utf-8")
+
+    def generate_payload():
+        return {
+            "user_id": random.choice(user_ids),
+            "platform": random.choice(PLATFORMS),
+            "content_type": "Reel",
+            "additional_context": f"load test {random.randrange(1000)}",
+            "bypass_cache": bypass_cache,
+        }
+
+    return {
+        "GET /api/": lambda c: c.get("/api/"),
+        "POST /api/users": lambda c: c.post("/api/users", json=user_payload()),
+        "GET /api/users/{user_id}": lambda c: c.get(f"/api/users/{random.choice(user_ids)}"),
+        "POST /api/content/generate": lambda c: c.post("/api/content/generate", json=generate_payload()),
+        "POST /api/content/generate/stream": lambda c: c.post("/api/content/generate/stream", json=generate_payload()),
+        "POST /api/content/generate/batch": lambda c: c.post("/api/content/generate/batch", json={
+            "user_id": random.choice(user_ids),
+            "targets": [{"platform": platform, "content_type": "Reel"} for platform in PLATFORMS],
+            "bypass_cache": bypass_cache,
+        }),
+        "GET /api/content/history/{user_id}": lambda c: c.get(f"/api/content/history/{random.choice(user_ids)}"),
+        "GET /api/content/history/{user_id}/page": lambda c: c.get(
+            f"/api/content/history/{random.choice(user_ids)}/page", params={"limit": 20}
+        ),
+        "GET /api/content/search/{user_id}": lambda c: c.get(
+            f"/api/content/search/{random.choice(user_ids)}", params={"q": random.choice(SEARCH_TERMS)}
+        ),
+        "GET /api/content/export/{user_id}": lambda c: c.get(f"/api/content/export/{random.choice(user_ids)}"),
+        "POST /api/content/import": lambda c: c.post("/api/content/import", content=import_body()),
+        "POST /api/daily-plan/generate": lambda c: c.post("/api/daily-plan/generate", json={
+            "user_id": random.choice(user_ids), "bypass_cache": bypass_cache,
+        }),
+        "GET /api/daily-plan/today/{user_id}": lambda c: c.get(f"/api/daily-plan/today/{random.choice(user_ids)}"),
+        "POST /api/daily-plan/generate-range": lambda c: c.post("/api/daily-plan/generate-range", json={
+            "user_id": random.choice(user_ids), "start_date": plan_start, "end_date": plan_end,
+            "bypass_cache": bypass_cache,
+        }),
+        "GET /api/daily-plan/range/{user_id}": lambda c: c.get(
+            f"/api/daily-plan/range/{random.choice(user_ids)}", params={"start_date": plan_start, "end_date": plan_end}
+        ),
+        "GET /api/cache/stats": lambda c: c.get("/api/cache/stats"),
+    }
+
+
+# ============ Measurement ============
+
+def rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def drive(client, make_request, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            timings.append((time.perf_counter() - started) * 1000)
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\nComparison with {baseline.get('commit')} ({baseline_path})")
+    for route, row in current["routes"].items():
+        old = baseline.get("routes", {}).get(route)
+        if not old:
+            print(f"  {route:42} (new)")
+            continue
+        deltas = []
+        for metric in ("rps", "p50_ms", "p99_ms"):
+            change = (row[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            deltas.append(f"{metric} {old[metric]} -> {row[metric]} ({change:+.1f}%)")
+        print(f"  {route:42} " + ", ".join(deltas))
+
+
+async def run(args):
+    random.seed(args.seed)
+    fake_chat = install_fake_llm(parse_latency(args.llm_latency))
+    if args.mongo == "mongomock":
+        install_mongomock()
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = f"creatoros_loadtest_{uuid.uuid4().hex[:8]}"
+    os.environ.setdefault("EMERGENT_LLM_KEY", "load-test")
+    os.environ["LLM_GATEWAY_PROVIDER"] = "emergent"
+    if not args.user_limits:
+        # A handful of simulated users would otherwise spend most of the run rejected with 429
+        os.environ.setdefault("ADMISSION_USER_RATE_PER_MINUTE", "0")
+        os.environ.setdefault("ADMISSION_USER_MAX_CONCURRENCY", "0")
+    if args.cassette:
+        # Replay recorded production responses; prompts not in the capture fall through to the fake LlmChat
+        os.environ["LLM_CASSETTE_MODE"] = "replay"
+        os.environ["LLM_CASSETTE_PATH"] = args.cassette
+        os.environ["LLM_CASSETTE_REPLAY_LATENCY"] = str(args.cassette_latency)
+        os.environ["LLM_CASSETTE_ON_MISS"] = "passthrough"
+
+    import httpx
+    import server
+
+    api_routes = {f"{method} {route.path}" for route in server.app.routes
+                  if route.path.startswith("/api") for method in getattr(route, "methods", ())}
+
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            user_ids = []
+            for _ in range(args.users):
+                response = await client.post("/api/users", json=user_payload())
+                user_ids.append(response.json()["id"])
+
+            scenarios = build_scenarios(user_ids, bypass_cache=not args.allow_cache)
+            missing = sorted(api_routes - set(scenarios))
+            if missing:
+                print(f"Routes without a scenario: {', '.join(missing)}")
+
+            selected = [name for name in scenarios if not args.routes or any(part in name for part in args.routes)]
+            for name in selected:
+                calls_before = fake_chat.calls
+                results[name] = await drive(client, scenarios[name], args.requests, args.concurrency)
+                results[name]["llm_calls"] = fake_chat.calls - calls_before
+                row = results[name]
+                print(f"  {name:42} rps={row['rps']:>8} p50={row['p50_ms']:>8}ms p95={row['p95_ms']:>8}ms "
+                      f"p99={row['p99_ms']:>8}ms errors={row['errors']} rss={row['rss_mb']}MB")
+
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "routes": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the Creator OS API")
+    parser.add_argument("--mongo", choices=["local", "mongomock"], default="local",
+                        help="local uses MONGO_URL (default mongodb://localhost:27017)")
+    parser.add_argument("--llm-latency", default="lognormal:800:0.4",
+                        help="constant:MS | uniform:LOW:HIGH | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--routes", nargs="*", help="Only run routes containing one of these substrings")
+    parser.add_argument("--user-limits", action="store_true",
+                        help="Keep per-user admission limits (429s count as errors)")
+    parser.add_argument("--allow-cache", action="store_true", help="Let generation requests hit the LLM cache")
+    parser.add_argument("--cassette", default=None, help="Replay LLM responses from a recorded cassette")
+    parser.add_argument("--cassette-latency", type=float, default=1.0,
+                        help="Multiplier for the cassette's recorded latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Results JSON (default test_reports/benchmarks/)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    output = Path(args.output) if args.output else (
+        ROOT_DIR / "test_reports" / "benchmarks" / f"load_test_{results['commit']}_{int(time.time())}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
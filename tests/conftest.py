@@ -0,0 +1,95 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules are imported flat (as uvicorn does from backend/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def batch_size(self, size):
+        return self
+
+    def sort(self, keys):
+        (field, direction), *_ = keys
+        self.documents = sorted(self.documents, key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeContent:
+    def __init__(self, documents):
+        self.documents = documents
+        self.finds = 0
+
+    def find(self, query, projection):
+        self.finds += 1
+        return FakeCursor([d for d in self.documents if d["user_id"] == query["user_id"]])
+
+    async def bulk_write(self, requests, ordered=True):
+        # UpdateOne({"id": ...}, {"$set": {...}}) only
+        for request in requests:
+            for document in self.documents:
+                if document["id"] == request._filter["id"]:
+                    document.update(request._doc["$set"])
+
+
+class FakeDb:
+    def __init__(self, documents):
+        self.content = FakeContent(documents)
+
+
+@pytest.fixture
+def content_db():
+    """Builds a `db` whose `content.find({"user_id": ...})` serves the given documents (counted in `finds`)
+    and whose `bulk_write` applies `$set` updates by id"""
+    return FakeDb
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """backend/server.py on mongomock-motor with the fake LLM provider; its collections are emptied afterwards"""
+    # A test dependency (backend/requirements.txt): a missing install fails these tests rather than skipping them
+    import mongomock_motor
+
+    if "server" not in sys.modules:
+        import motor.motor_asyncio
+
+        class MockClient(mongomock_motor.AsyncMongoMockClient):
+            def __init__(self, *args, event_listeners=None, **kwargs):
+                super().__init__(*args, **kwargs)
+
+        # Read once, at import: the patches only need to last until then
+        monkeypatch.setattr(motor.motor_asyncio, "AsyncIOMotorClient", MockClient)
+        for name, value in {"MONGO_URL": "mongodb://localhost:27017", "DB_NAME": "creatoros_test",
+                            "LLM_GATEWAY_PROVIDER": "fake", "LLM_CACHE_BACKEND": "none"}.items():
+            monkeypatch.setenv(name, value)
+    import server
+
+    yield server
+
+    async def clear():
+        for name in await server.db.list_collection_names():
+            await server.db[name].delete_many({})
+
+    asyncio.run(clear())
+
+
+@pytest.fixture
+def api(server):
+    """Opens an httpx client on the app (inside the test's event loop)"""
+    import httpx
+
+    return lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
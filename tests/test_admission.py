@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_user_rate_limit_rejects_with_retry_after():
+    controller = AdmissionController(user_rate_per_minute=60, user_burst=2, user_max_concurrency=0)
+
+    async def scenario():
+        for _ in range(2):
+            (await controller.admit("u1")).release()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit("u1")
+        # Other users have their own bucket
+        (await controller.admit("u2")).release()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "user_rate"
+    assert rejected.retry_after == 1
+    assert controller.stats()["rejected"] == {"user_rate": 1}
+
+
+def test_user_concurrency_cap():
+    controller = AdmissionController(user_rate_per_minute=0, user_max_concurrency=1)
+
+    async def scenario():
+        first = await controller.admit("u1")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit("u1")
+        first.release()
+        first.release()  # idempotent
+        (await controller.admit("u1")).release()
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "user_concurrency"
+    assert controller.in_flight == 0
+
+
+def test_global_queue_waits_then_sheds_when_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, user_rate_per_minute=0, user_max_concurrency=0)
+
+    async def scenario():
+        running = await controller.admit("a")
+        queued = asyncio.create_task(controller.admit("b"))
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit("c")
+        running.release()
+        (await queued).release()
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "queue_full"
+    assert controller.admitted == 2
+
+
+def test_queue_timeout_rejects():
+    controller = AdmissionController(max_concurrency=1, queue_timeout_seconds=0.01, user_rate_per_minute=0)
+
+    async def scenario():
+        await controller.admit("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit("b")
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "queue_timeout"
+    assert controller.waiting == 0
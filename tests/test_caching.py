@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from caching import InMemoryLLMCache, TTLCache, prompt_cache_key
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_entries=10, ttl_seconds=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_prompt_cache_key_depends_on_every_part():
+    base = prompt_cache_key("openai/gpt-5-mini", "system", "prompt")
+    assert base == prompt_cache_key("openai/gpt-5-mini", "system", "prompt")
+    assert base != prompt_cache_key("openai/gpt-5-mini", "system", "prompt", scope="2026-01-01")
+    assert base != prompt_cache_key("openai/gpt-5-mini", "systemprompt", "")
+
+
+def test_in_memory_llm_cache_counts_hits_and_misses():
+    cache = InMemoryLLMCache(ttl_seconds=60, max_entries=10)
+
+    async def scenario():
+        assert await cache.get("k") is None
+        await cache.set("k", "response")
+        assert await cache.get("k") == "response"
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_identical_content_requests_hit_the_cache_after_the_first_is_saved(server, api, monkeypatch):
+    calls = []
+
+    async def complete(system_message, user_prompt, session_id):
+        calls.append(user_prompt)
+        return json.dumps({"hooks": ["Hook"], "script": "Script", "caption": f"Caption {len(calls)} #run"})
+
+    monkeypatch.setattr(server.llm_gateway, "complete", complete)
+    monkeypatch.setattr(server, "llm_cache", InMemoryLLMCache(ttl_seconds=60, max_entries=10))
+
+    async def scenario():
+        async with api() as client:
+            user = (await client.post("/api/users", json={
+                "name": "Retrier", "niche": "Fitness", "tone": "Casual", "target_audience": "Runners",
+                "platforms": ["TikTok"]})).json()
+            body = {"user_id": user["id"], "platform": "TikTok", "content_type": "Reel", "additional_context": "tempo"}
+            # Each saved item changes the recent-history section of the next prompt
+            return [await client.post("/api/content/generate", json=body) for _ in range(3)]
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert {response.json()["caption"] for response in responses} == {"Caption 1 #run"}
+    assert len(calls) == 1
+    assert (server.llm_cache.hits, server.llm_cache.misses) == (2, 1)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+USER = {"name": "Batch Tester", "niche": "Fitness", "tone": "Casual", "target_audience": "Runners",
+        "platforms": ["Instagram", "TikTok", "YouTube"]}
+TARGETS = [{"platform": platform, "content_type": "Reel"} for platform in USER["platforms"]]
+
+
+class StubLlm:
+    """Stands in for `llm_gateway.complete`, counting calls and how many run at once"""
+
+    def __init__(self, delay=0.0, combined=False):
+        self.delay = delay
+        self.combined = combined
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def content(self, n):
+        return {"hooks": [f"Hook {n} about tempo runs"], "script": f"Script {n}", "caption": f"Caption {n} #run"}
+
+    async def complete(self, system_message, user_prompt, session_id):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.combined:
+            return json.dumps([self.content(n) for n in range(len(TARGETS))])
+        return json.dumps(self.content(self.calls))
+
+
+def run_batch(server, api, monkeypatch, llm, body):
+    monkeypatch.setattr(server.llm_gateway, "complete", llm.complete)
+    inserts = []
+    original_insert_many = server.write_behind.collection.insert_many
+
+    async def insert_many(documents, *args, **kwargs):
+        inserts.append(len(documents))
+        return await original_insert_many(documents, *args, **kwargs)
+
+    monkeypatch.setattr(server.write_behind.collection, "insert_many", insert_many)
+
+    async def scenario():
+        async with api() as client:
+            user = (await client.post("/api/users", json=USER)).json()
+            response = await client.post("/api/content/generate/batch", json={"user_id": user["id"], **body})
+            stored = await server.db.content.count_documents({"user_id": user["id"]})
+            return response, stored
+
+    response, stored = asyncio.run(scenario())
+    return response, stored, inserts
+
+
+def test_parallel_batch_makes_one_call_per_target_and_one_insert(server, api, monkeypatch):
+    llm = StubLlm()
+    response, stored, inserts = run_batch(server, api, monkeypatch, llm, {"targets": TARGETS})
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["content"]["platform"] for item in items] == USER["platforms"]
+    assert all(item["latency_ms"] >= 0 and not item["content"]["degraded"] for item in items)
+    assert llm.calls == 3
+    assert (stored, inserts) == (3, [3])
+
+
+def test_combined_batch_makes_one_call(server, api, monkeypatch):
+    llm = StubLlm(combined=True)
+    response, stored, inserts = run_batch(server, api, monkeypatch, llm, {"targets": TARGETS, "strategy": "combined"})
+
+    assert response.status_code == 200
+    assert [item["content"]["caption"] for item in response.json()["items"]] == [
+        "Caption 0 #run", "Caption 1 #run", "Caption 2 #run"]
+    assert llm.calls == 1
+    assert (stored, inserts) == (3, [3])
+
+
+def test_batch_concurrency_bounds_in_flight_calls(server, api, monkeypatch):
+    monkeypatch.setattr(server, "CONTENT_BATCH_CONCURRENCY", 2)
+    llm = StubLlm(delay=0.02)
+    targets = [{"platform": f"Platform {n}", "content_type": "Reel"} for n in range(6)]
+    response, stored, inserts = run_batch(server, api, monkeypatch, llm, {"targets": targets})
+
+    assert response.status_code == 200
+    assert (llm.calls, llm.max_in_flight) == (6, 2)
+    assert (stored, inserts) == (6, [6])
+
+
+def test_batch_rejects_bad_targets_before_calling_the_llm(server, api, monkeypatch):
+    llm = StubLlm()
+    for body in (
+        {"targets": []},
+        {"targets": [{"platform": "TikTok", "content_type": "Reel"}] * 11},
+        {"targets": [{"platform": " ", "content_type": "Reel"}]},
+        {"targets": TARGETS, "strategy": "sequential"},
+    ):
+        response, stored, inserts = run_batch(server, api, monkeypatch, llm, body)
+        assert response.status_code == 400, body
+        assert (stored, inserts) == (0, [])
+    assert llm.calls == 0
@@ -0,0 +1,31 @@
+import asyncio
+import gzip
+import json
+
+from content_io import iter_ndjson_lines
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def collect(data: bytes, size: int):
+    async def run():
+        return [json.loads(line) async for line in iter_ndjson_lines(chunked(data, size))]
+
+    return asyncio.run(run())
+
+
+def test_lines_survive_arbitrary_chunk_boundaries():
+    documents = [{"id": str(idx), "caption": "x" * idx} for idx in range(50)]
+    data = ("\n".join(json.dumps(document) for document in documents) + "\n\n").encode()
+    assert collect(data, 7) == documents
+    # No trailing newline
+    assert collect(data.rstrip(), 1000) == documents
+
+
+def test_gzip_input_is_detected_and_streamed():
+    documents = [{"id": str(idx)} for idx in range(1000)]
+    data = gzip.compress("\n".join(json.dumps(document) for document in documents).encode())
+    assert collect(data, 64) == documents
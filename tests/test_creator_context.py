@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from creator_context import RECENT_LIMIT, _context_update, _field_key, _value_of_key, top_hashtags
+
+
+def item(caption, platform="Instagram", minute=0):
+    return {"user_id": "u", "platform": platform, "content_type": "Reel", "caption": caption,
+            "created_at": datetime(2026, 1, 1, 12, minute)}
+
+
+def test_context_update_pushes_newest_first_and_counts():
+    update = _context_update([
+        item("older #Fitness #tips", minute=1),
+        item("newer #fitness " + "x" * 200, platform="TikTok", minute=2),
+    ])
+
+    recent = update["$push"]["recent"]
+    assert [snippet["platform"] for snippet in recent["$each"]] == ["TikTok", "Instagram"]
+    assert len(recent["$each"][0]["caption"]) == 100
+    assert (recent["$position"], recent["$slice"]) == (0, RECENT_LIMIT)
+    assert update["$inc"] == {
+        "total": 2,
+        "platform_counts.Instagram": 1,
+        "platform_counts.TikTok": 1,
+        "hashtags.fitness": 2,
+        "hashtags.tips": 1,
+    }
+
+
+def test_platform_keys_are_escaped_and_restored():
+    update = _context_update([item("a", platform="$web.app"), item("b", platform="100%")])
+
+    assert set(update["$inc"]) == {"total", "platform_counts.%24web%2Eapp", "platform_counts.100%25"}
+    for platform in ("$web.app", "100%", "%2E", "Instagram"):
+        assert _value_of_key(_field_key(platform)) == platform
+
+
+def test_top_hashtags():
+    context = {"hashtags": {"a": 1, "b": 5, "c": 3}}
+    assert top_hashtags(context, limit=2) == ["b", "c"]
+    assert top_hashtags({}) == []
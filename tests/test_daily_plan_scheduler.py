@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+from daily_plan_scheduler import DailyPlanScheduler, RateLimiter, next_plan_date, seconds_until_hour
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+def test_rate_limiter_spaces_out_acquisitions():
+    limiter = RateLimiter(per_minute=600)  # one slot every 0.1s
+
+    async def acquire_three():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire_three()) >= 0.19
+
+
+def test_schedule_dates():
+    now = datetime(2026, 1, 31, 23, 30)
+    assert next_plan_date(now) == "2026-02-01"
+    assert seconds_until_hour(22, now) == 22.5 * 3600
+    assert seconds_until_hour(23, datetime(2026, 1, 31, 22, 0)) == 3600
+
+
+def test_scheduler_precomputes_and_resumes_against_local_mongo():
+    motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+    async def scenario():
+        client = motor_asyncio.AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=500)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            pytest.skip("local MongoDB not available")
+
+        db = client[f"scheduler_test_{uuid.uuid4().hex[:8]}"]
+        try:
+            await db.users.insert_many([{"id": f"user-{idx:03d}"} for idx in range(7)])
+            await db.daily_plans.insert_one({"user_id": "user-003", "date": "2026-02-01", "plan_items": []})
+            llm_calls = []
+
+            async def stub_generate(user, plan_date):
+                llm_calls.append(user["id"])
+                return [{"topic": f"{user['id']} {plan_date}"}]
+
+            async def save(user_id, plan_date, plan_items):
+                await db.daily_plans.update_one(
+                    {"user_id": user_id, "date": plan_date},
+                    {"$set": {"plan_items": plan_items}},
+                    upsert=True
+                )
+
+            dry = await DailyPlanScheduler(db, stub_generate, save, batch_size=3, dry_run=True).run("2026-02-01")
+            assert (dry["generated"], dry["skipped"], llm_calls) == (6, 1, [])
+
+            scheduler = DailyPlanScheduler(db, stub_generate, save, batch_size=3, workers=2, rate_per_minute=0)
+            stats = await scheduler.run("2026-02-01")
+            assert (stats["generated"], stats["skipped"], stats["failed"]) == (6, 1, 0)
+            assert sorted(llm_calls) == [f"user-{idx:03d}" for idx in range(7) if idx != 3]
+            assert await db.daily_plans.count_documents({"date": "2026-02-01"}) == 7
+
+            # A completed run is not repeated
+            await scheduler.run("2026-02-01")
+            assert len(llm_calls) == 6
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_users_are_recorded_and_retried_on_a_rerun_for_the_date():
+    from mongomock_motor import AsyncMongoMockClient
+
+    db = AsyncMongoMockClient()["scheduler_retry_test"]
+    down = {"user-001"}
+    llm_calls = []
+
+    async def stub_generate(user, plan_date):
+        llm_calls.append(user["id"])
+        if user["id"] in down:
+            raise TimeoutError("LLM deadline exceeded")
+        return [{"topic": f"{user['id']} {plan_date}"}]
+
+    async def save(user_id, plan_date, plan_items):
+        await db.daily_plans.update_one({"user_id": user_id, "date": plan_date},
+                                        {"$set": {"plan_items": plan_items}}, upsert=True)
+
+    async def scenario():
+        await db.users.insert_many([{"id": f"user-{idx:03d}"} for idx in range(3)])
+        scheduler = DailyPlanScheduler(db, stub_generate, save, batch_size=2, rate_per_minute=0)
+
+        first = await scheduler.run("2026-02-01")
+        first_run = await db.scheduler_runs.find_one({"_id": "daily_plans:2026-02-01"})
+
+        down.clear()
+        second = await scheduler.run("2026-02-01")
+        second_run = await db.scheduler_runs.find_one({"_id": "daily_plans:2026-02-01"})
+        return first, first_run, second, second_run, await db.daily_plans.count_documents({"date": "2026-02-01"})
+
+    first, first_run, second, second_run, plans = asyncio.run(scenario())
+
+    # Retried once at the end of the first run, still failing: the date is not marked completed
+    assert (first["generated"], first["failed"]) == (2, 1)
+    assert (first_run["status"], first_run["failed_user_ids"]) == ("incomplete", ["user-001"])
+    # The rerun only retries that user
+    assert llm_calls == ["user-000", "user-001", "user-002", "user-001", "user-001"]
+    assert (second["generated"], second["failed"]) == (3, 0)
+    assert (second_run["status"], second_run["failed_user_ids"]) == ("completed", [])
+    assert plans == 3
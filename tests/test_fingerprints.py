@@ -0,0 +1,76 @@
+import asyncio
+
+import numpy as np
+
+from fingerprints import NearDuplicateDetector, SignatureSet, content_fingerprints, hamming_distances, simhash
+
+
+def distance(a: str, b: str) -> int:
+    return int(hamming_distances(simhash(a), np.array([simhash(b)]))[0])
+
+
+def test_simhash_separates_rewordings_from_unrelated_hooks():
+    assert distance("Stop scrolling - this will change everything", "Stop scrolling, this will change everything!") == 0
+    assert distance("Here's what nobody tells you about protein", "Here is what nobody tells you about protein") <= 9
+    assert distance("The easiest meal prep for busy people", "How I edit reels in five minutes") > 20
+
+
+def test_hamming_distance_counts_bits_of_negative_signatures():
+    signatures = np.array([-1, 0, 1 << 62], dtype=np.int64)
+    assert hamming_distances(0, signatures).tolist() == [64, 0, 1]
+
+
+def test_signature_set_grows_and_finds_nearest():
+    signatures = SignatureSet(capacity=2)
+    assert signatures.nearest(0) is None
+    for idx in range(100):
+        signatures.add(simhash(f"completely different text number {idx} about {idx * 7}"), f"c{idx}")
+    target = simhash("completely different text number 42 about 294")
+    assert signatures.nearest(target) == ("c42", 0)
+    assert len(signatures) == 100
+
+
+def test_detector_flags_repeats_of_stored_and_legacy_content(content_db):
+    stored = {"id": "stored", "user_id": "u1", "hooks": ["You are doing squats wrong"], "caption": "Leg day #fitness",
+              "created_at": 2}
+    stored["fingerprints"] = content_fingerprints(stored)
+    legacy = {"id": "legacy", "user_id": "u1", "hooks": ["Nobody talks about rest days"], "caption": "Rest up",
+              "created_at": 1}
+    db = content_db([stored, legacy])
+    detector = NearDuplicateDetector(db)
+    candidate = {"hooks": ["You're doing squats wrong!", "A brand new angle on mobility"], "caption": "Rest up!"}
+
+    async def scenario():
+        # Not loaded yet: skipped, and the signatures load in the background
+        cold = detector.check("u1", candidate)
+        await detector.indexes.index_for("u1")
+        first = detector.check("u1", candidate)
+        detector.add([{"id": "new", "user_id": "u1", "hooks": ["A brand new angle on mobility"], "caption": "x"}])
+        second = detector.check("u1", {"hooks": ["A brand new angle on mobility"], "caption": ""})
+        return cold, first, second
+
+    cold, first, second = asyncio.run(scenario())
+    assert cold is None
+    assert first["hook:0"]["content_id"] == "stored"
+    assert "hook:1" not in first
+    assert first["caption"]["content_id"] == "legacy"
+    assert second["hook:0"]["content_id"] == "new"
+    assert (detector.builds, detector.skipped, detector.backfilled) == (1, 1, 1)
+    # The legacy item's signatures were stored, so the next build does not compute them again
+    assert db.content.documents[1]["fingerprints"] == content_fingerprints(legacy)
+
+
+def test_detector_reads_only_the_newest_window(content_db):
+    hooks = ["The easiest meal prep for busy people", "How I edit reels in five minutes",
+             "Stop scrolling - this will change everything", "Nobody talks about rest days",
+             "You are doing squats wrong"]
+    documents = [{"id": f"c{n}", "user_id": "u1", "hooks": [hook], "caption": "", "created_at": n}
+                 for n, hook in enumerate(hooks)]
+    detector = NearDuplicateDetector(content_db(documents), window=2)
+
+    async def scenario():
+        await detector.indexes.index_for("u1")
+        return [detector.check("u1", {"hooks": [document["hooks"][0]]}) for document in documents]
+
+    results = asyncio.run(scenario())
+    assert [bool(result) for result in results] == [False, False, False, True, True]
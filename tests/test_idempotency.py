@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+
+from idempotency import IdempotencyError, IdempotencyKeyReused, IdempotencyStore, request_fingerprint
+from llm_gateway import LLMTimeout
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+def test_fingerprint_ignores_key_order_but_not_values_or_scope():
+    assert request_fingerprint("gen", {"a": 1, "b": 2}) == request_fingerprint("gen", {"b": 2, "a": 1})
+    assert request_fingerprint("gen", {"a": 1}) != request_fingerprint("gen", {"a": 2})
+    assert request_fingerprint("gen", {"a": 1}) != request_fingerprint("plan", {"a": 1})
+
+
+def test_rejects_invalid_keys_before_touching_mongo():
+    store = IdempotencyStore(collection=None)
+
+    async def noop():
+        return None
+
+    with pytest.raises(IdempotencyError):
+        asyncio.run(store.run("gen", "", {}, noop))
+    with pytest.raises(IdempotencyError):
+        asyncio.run(store.run("gen", "k" * 256, {}, noop))
+
+
+def test_replay_attach_and_mismatch_against_local_mongo():
+    motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+    async def scenario():
+        client = motor_asyncio.AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=500)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            pytest.skip("local MongoDB not available")
+
+        db = client[f"idempotency_test_{uuid.uuid4().hex[:8]}"]
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"id": len(calls)}
+
+        try:
+            # Two stores stand in for two workers sharing the collection
+            first, second = IdempotencyStore(db.keys, poll_seconds=0.01), IdempotencyStore(db.keys, poll_seconds=0.01)
+            results = await asyncio.gather(
+                first.run("gen", "k1", {"x": 1}, generate),
+                second.run("gen", "k1", {"x": 1}, generate),
+            )
+            assert sorted(results, key=lambda result: result[1]) == [({"id": 1}, False), ({"id": 1}, True)]
+            assert await first.run("gen", "k1", {"x": 1}, generate) == ({"id": 1}, True)
+            with pytest.raises(IdempotencyKeyReused):
+                await first.run("gen", "k1", {"x": 2}, generate)
+            assert len(calls) == 1
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(scenario())
+
+
+USER = {"name": "Retry Tester", "niche": "Fitness", "tone": "Casual", "target_audience": "Runners",
+        "platforms": ["Instagram"]}
+
+
+class FlakyLlm:
+    """Stands in for `llm_gateway.complete`: times out until `recover` is set"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.recover = False
+        self.calls = 0
+
+    async def complete(self, system_message, user_prompt, session_id):
+        self.calls += 1
+        if not self.recover:
+            raise LLMTimeout("stub missed its deadline")
+        return json.dumps(self.answer)
+
+
+def retry_after_timeout(server, api, monkeypatch, llm, path, body):
+    monkeypatch.setattr(server.llm_gateway, "complete", llm.complete)
+
+    async def scenario():
+        async with api() as client:
+            user = (await client.post("/api/users", json=USER)).json()
+            request = {"user_id": user["id"], **body}
+            headers = {"Idempotency-Key": "retry-1"}
+            responses = [await client.post(path, json=request, headers=headers)]
+            llm.recover = True
+            for _ in range(2):
+                responses.append(await client.post(path, json=request, headers=headers))
+            return responses
+
+    return asyncio.run(scenario())
+
+
+def test_degraded_content_is_not_replayed_to_a_retry(server, api, monkeypatch):
+    llm = FlakyLlm({"hooks": ["Hook about tempo runs"], "script": "Script", "caption": "Caption #run"})
+    fallback, generated, replayed = retry_after_timeout(
+        server, api, monkeypatch, llm, "/api/content/generate",
+        {"platform": "Instagram", "content_type": "Reel"})
+
+    assert fallback.json()["degraded"]
+    assert not generated.json()["degraded"] and "Idempotent-Replayed" not in generated.headers
+    assert replayed.json() == generated.json() and replayed.headers["Idempotent-Replayed"] == "true"
+    assert llm.calls == 2
+    assert server.idempotency_store.stats()["released"] == 1
+
+
+def test_default_daily_plan_is_not_replayed_to_a_retry(server, api, monkeypatch):
+    llm = FlakyLlm({"plan_items": [{"platform": "Instagram", "content_type": "Reel", "topic": "Tempo runs",
+                                    "reasoning": "Runners save pacing tips"}]})
+    fallback, generated, replayed = retry_after_timeout(
+        server, api, monkeypatch, llm, "/api/daily-plan/generate", {})
+
+    assert fallback.json()["degraded"]
+    assert not generated.json()["degraded"] and "Idempotent-Replayed" not in generated.headers
+    assert replayed.json() == generated.json() and replayed.headers["Idempotent-Replayed"] == "true"
+    assert llm.calls == 2
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_cassette import CassetteMiss, CassetteProvider, load_cassette
+from llm_gateway import FakeProvider
+
+
+def test_record_then_replay_without_provider(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = CassetteProvider("record", path, FakeProvider(responder=lambda system, prompt: f"{system}|{prompt}"))
+
+    async def record():
+        first = await recorder.complete("sys", "prompt one", "a")
+        second = await recorder.complete("sys", "prompt two", "b")
+        await recorder.aclose()
+        return first, second
+
+    assert asyncio.run(record()) == ("sys|prompt one", "sys|prompt two")
+    assert len(load_cassette(path)) == 2
+
+    replayer = CassetteProvider("replay", path)
+    assert asyncio.run(replayer.complete("sys", "prompt two", "c")) == "sys|prompt two"
+    with pytest.raises(CassetteMiss):
+        asyncio.run(replayer.complete("sys", "unseen", "d"))
+    assert (replayer.hits, replayer.misses) == (1, 1)
+
+
+def test_replay_reproduces_scaled_latency_and_streams(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    recorder = CassetteProvider("record", path, FakeProvider(latency_ms=50, responder=lambda s, p: "x" * 40))
+
+    async def record():
+        await recorder.complete("s", "p", "id")
+        await recorder.aclose()
+
+    asyncio.run(record())
+
+    replayer = CassetteProvider("replay", path, replay_latency=1.0)
+
+    async def replay():
+        started = time.perf_counter()
+        chunks = [chunk async for chunk in replayer.stream("s", "p", "id")]
+        return chunks, time.perf_counter() - started
+
+    chunks, elapsed = asyncio.run(replay())
+    assert "".join(chunks) == "x" * 40
+    assert elapsed >= 0.04
+
+
+def test_replay_passthrough_calls_provider_on_miss(tmp_path):
+    inner = FakeProvider(responder=lambda system, prompt: "live")
+    replayer = CassetteProvider("replay", str(tmp_path / "missing.jsonl"), inner, on_miss="passthrough")
+    assert asyncio.run(replayer.complete("s", "p", "id")) == "live"
+    assert inner.calls == 1
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import sys
+import time
+
+import pytest
+
+from llm_gateway import FakeProvider, LLMDeadlineExceeded, LLMGateway, LLMTimeout, build_provider, fake_response
+
+
+def test_provider_enforces_concurrency_limit():
+    provider = FakeProvider(latency_ms=20, max_concurrency=2)
+    peak = 0
+
+    async def observe():
+        nonlocal peak
+        while True:
+            peak = max(peak, provider.in_flight)
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        watcher = asyncio.create_task(observe())
+        await asyncio.gather(*(provider.complete("s", "p", "id") for _ in range(6)))
+        watcher.cancel()
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert provider.stats()["calls"] == 6
+
+
+def test_provider_timeout_raises_and_is_counted():
+    provider = FakeProvider(latency_ms=200, timeout_seconds=0.01)
+    with pytest.raises(LLMTimeout):
+        asyncio.run(provider.complete("s", "p", "id"))
+    assert provider.timeouts == 1
+
+
+def test_gateway_stream_reassembles_response():
+    gateway = LLMGateway([FakeProvider(responder=lambda system, prompt: "x" * 40, chunk_size=16)])
+
+    async def collect():
+        return [chunk async for chunk in gateway.stream("s", "p", "id")]
+
+    chunks = asyncio.run(collect())
+    assert [len(chunk) for chunk in chunks] == [16, 16, 8]
+    assert gateway.model_key == "fake/fake"
+
+
+def test_hedge_fires_after_delay_and_cancels_slow_primary():
+    slow = FakeProvider(model="slow", latency_ms=300, responder=lambda s, p: "slow")
+    fast = FakeProvider(model="fast", latency_ms=10, responder=lambda s, p: "fast")
+    gateway = LLMGateway([slow, fast], hedge_delay=0.02)
+
+    async def scenario():
+        started = time.perf_counter()
+        result = await gateway.complete("s", "p", "id")
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0)
+        return result, elapsed
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == "fast"
+    assert elapsed < 0.2
+    assert (gateway.hedges, gateway.hedge_wins) == (1, 1)
+    assert slow.in_flight == 0
+
+
+def test_fast_primary_is_not_hedged():
+    primary = FakeProvider(model="primary", latency_ms=5, responder=lambda s, p: "primary")
+    secondary = FakeProvider(model="secondary", responder=lambda s, p: "secondary")
+    gateway = LLMGateway([primary, secondary], hedge_delay=0.1)
+
+    assert asyncio.run(gateway.complete("s", "p", "id")) == "primary"
+    assert secondary.calls == 0
+
+
+def test_auto_hedge_delay_tracks_p90_after_warmup():
+    gateway = LLMGateway([FakeProvider(model="a"), FakeProvider(model="b")], hedge_delay="auto")
+    assert gateway.current_hedge_delay() is None
+    gateway.latencies.extend(i / 100 for i in range(1, 101))
+    assert gateway.current_hedge_delay() == pytest.approx(0.91)
+
+
+def test_failed_primary_falls_back_to_secondary():
+    def fail(system, prompt):
+        raise RuntimeError("provider down")
+
+    gateway = LLMGateway([FakeProvider(model="a", responder=fail),
+                          FakeProvider(model="b", responder=lambda s, p: "backup")], hedge_delay=1.0)
+    assert asyncio.run(gateway.complete("s", "p", "id")) == "backup"
+    assert gateway.fallbacks == 1
+
+
+def test_deadline_bounds_total_latency():
+    gateway = LLMGateway([FakeProvider(model="a", latency_ms=500), FakeProvider(model="b", latency_ms=500)],
+                         hedge_delay=0.01, deadline_seconds=0.05)
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(gateway.complete("s", "p", "id"))
+    assert gateway.deadlines_exceeded == 1
+
+
+def test_emergent_sdk_is_not_imported_until_first_use():
+    provider = build_provider("emergent", "key")
+    assert provider._chat_class is None
+    assert "emergentintegrations.llm.chat" not in sys.modules
+
+
+def test_fake_range_plan_is_keyed_by_each_requested_date():
+    prompt = "Create a content plan for each of these dates: 2026-01-01, 2026-01-02.\nExample: \"2026-01-01\""
+    plans = json.loads(fake_response("system", prompt))
+    assert sorted(plans) == ["2026-01-01", "2026-01-02"]
+    assert {"platform", "content_type", "topic", "reasoning"} <= plans["2026-01-02"][0].keys()
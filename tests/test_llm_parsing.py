@@ -0,0 +1,42 @@
+import json
+
+from llm_parsing import complete_plan_items, extract_json, plan_item_list, validate_content, validate_plan_items
+
+CONTENT = {"hooks": ['Stop doing "this" {now}', "Day 1 [of 30]"], "script": "Step 1, then step 2", "caption": "Go #fit"}
+
+
+def test_json_is_extracted_from_fences_and_prose():
+    body = json.dumps(CONTENT, indent=2)
+    assert extract_json(body) == (CONTENT, "ok")
+    fenced = f"Here is your content [draft]:\n```json\n{body}\n```\nHope it helps :-["
+    assert extract_json(fenced) == (CONTENT, "extracted")
+    prose = f"Sure {{as asked}}, here it is: {body} Let me know!"
+    assert extract_json(prose, dict) == (CONTENT, "extracted")
+    assert extract_json("I can't help with that.") == (None, "failed")
+
+
+def test_truncated_json_is_repaired():
+    body = json.dumps(CONTENT)
+    # Cut inside the last string: the string is closed
+    value, outcome = extract_json(body[:body.index("#fit")])
+    assert outcome == "repaired" and value["caption"] == "Go "
+    # Cut inside a key: the incomplete member is dropped
+    value, outcome = extract_json(body[:body.index('"caption"') + 4])
+    assert outcome == "repaired" and value == {"hooks": CONTENT["hooks"], "script": CONTENT["script"]}
+    value, outcome = extract_json('[{"topic": "a"}, {"topic": "b\\')
+    assert (value, outcome) == ([{"topic": "a"}, {"topic": "b"}], "repaired")
+
+
+def test_content_validation_names_missing_fields():
+    assert validate_content(CONTENT) == (CONTENT, [])
+    assert validate_content({"hooks": "One hook", "script": "  ", "caption": 3}) == (
+        {"hooks": ["One hook"]}, ["script", "caption"]
+    )
+
+
+def test_plan_validation_keeps_complete_ideas_and_lists_gaps():
+    complete = {"platform": "Instagram", "content_type": "Reel", "topic": "t", "reasoning": "r"}
+    items = plan_item_list({"plan": [complete, {"platform": "TikTok", "topic": "u"}, "junk"]})
+    validated, incomplete = validate_plan_items(items)
+    assert incomplete == [(1, ["content_type", "reasoning"])]
+    assert complete_plan_items(validated) == [complete]
@@ -0,0 +1,28 @@
+from metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    assert histogram.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_registry_renders_counters_with_escaped_labels():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("errors_total", "Errors", ("error",)))
+    counter.inc(error='Bad "quote"')
+    counter.inc(2, error='Bad "quote"')
+
+    assert 'errors_total{error="Bad \\"quote\\""} 3.0' in registry.render()
+    assert counter.value(error='Bad "quote"') == 3
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_query, merge_keyset
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 123000)
+    cursor = encode_cursor(created_at, "item-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, "item-1")
+
+
+def test_keyset_query_continues_after_cursor():
+    created_at = datetime(2026, 3, 1)
+    query = keyset_query({"user_id": "u"}, encode_cursor(created_at, "b"))
+    assert query == {
+        "user_id": "u",
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": "b"}},
+        ],
+    }
+    assert keyset_query({"user_id": "u"}, None) == {"user_id": "u"}
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_merge_keyset_interleaves_extra_items_after_cursor():
+    stored = [{"id": "b", "created_at": datetime(2026, 3, 2)}, {"id": "a", "created_at": datetime(2026, 3, 1)}]
+    extra = [{"id": "c", "created_at": datetime(2026, 3, 3)}, {"id": "b", "created_at": datetime(2026, 3, 2)}]
+    assert [item["id"] for item in merge_keyset(stored, extra, None, 10)] == ["c", "b", "a"]
+    assert [item["id"] for item in merge_keyset(stored, extra, None, 2)] == ["c", "b"]
+    cursor = encode_cursor(datetime(2026, 3, 3), "c")
+    assert [item["id"] for item in merge_keyset(stored, extra, cursor, 10)] == ["b", "a"]
@@ -0,0 +1,25 @@
+from profile_cache import ProfileCache
+
+
+def test_profile_cache_hits_invalidation_and_staleness():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60)
+    assert cache.get("u1") is None
+
+    profile = {"id": "u1", "niche": "Fitness"}
+    cache.set("u1", profile)
+    assert cache.get("u1") is profile
+
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+    assert stats["max_served_age_seconds"] >= 0
+
+
+def test_invalidate_everything():
+    cache = ProfileCache()
+    cache.set("u1", object())
+    cache.set("u2", object())
+    cache.invalidate()
+    assert cache.get("u1") is None and cache.get("u2") is None
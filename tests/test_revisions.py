@@ -0,0 +1,29 @@
+import pytest
+
+from revisions import RevisionStore, etag_matches, revision_etag
+
+
+def test_etag_changes_with_revision_epoch_and_variant():
+    revisions = {"epoch": "abc", "content": 3}
+    etag = revision_etag(revisions, "content", "history", 20)
+    assert etag.startswith('"content.3.') and etag.endswith('"')
+    assert etag == revision_etag(dict(revisions), "content", "history", 20)
+    assert etag != revision_etag({**revisions, "content": 4}, "content", "history", 20)
+    assert etag != revision_etag({**revisions, "epoch": "def"}, "content", "history", 20)
+    assert etag != revision_etag(revisions, "content", "history", 5)
+    # A user without revisions yet still gets a stable ETag
+    assert revision_etag({}, "users") == revision_etag({}, "users")
+
+
+def test_if_none_match_uses_weak_comparison_and_lists():
+    etag = '"content.1.0123456789abcdef"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"content.0.0123456789abcdef"', etag)
+
+
+def test_unknown_resource_is_rejected():
+    with pytest.raises(ValueError):
+        RevisionStore._update("posts")
@@ -0,0 +1,71 @@
+import asyncio
+
+from search import RELATED_FIELD_WEIGHTS, BM25Index, ContentSearch, tokenize
+
+
+def item(doc_id, caption="", hooks=(), script="", user_id="u1"):
+    return {"id": doc_id, "user_id": user_id, "platform": "TikTok", "content_type": "Reel", "caption": caption,
+            "hooks": list(hooks), "script": script, "created_at": "2026-01-01T00:00:00"}
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("How I Fixed MY morning routine!") == ["fixed", "morning", "routine"]
+
+
+def test_bm25_ranks_rare_terms_and_weights_captions():
+    index = BM25Index()
+    index.add(item("caption", caption="protein breakfast"))
+    index.add(item("script", script="protein breakfast"))
+    for n in range(20):
+        index.add(item(f"filler{n}", caption="protein shake", script="gym day"))
+    ranked = [doc_id for doc_id, _ in index.search("protein breakfast", limit=3)]
+    assert ranked[:2] == ["caption", "script"]
+    assert index.search("nothing matches", limit=5) == []
+    assert BM25Index().search("anything") == []
+
+
+def test_add_ignores_duplicate_ids():
+    index = BM25Index()
+    index.add(item("a", caption="one"))
+    index.add(item("a", caption="one"))
+    assert len(index) == 1
+    assert [doc_id for doc_id, _ in index.search("one")] == ["a"]
+
+
+def test_content_search_builds_once_and_folds_in_inserts(content_db):
+    db = content_db([item("old", caption="stretching tips"), item("other", user_id="u2", caption="stretching")])
+    search = ContentSearch(db)
+
+    async def scenario():
+        first = await search.search("u1", "stretching")
+        search.add([item("new", caption="deep stretching routine")])
+        second = await search.search("u1", "stretching routine")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert [hit["id"] for hit in first] == ["old"]
+    assert second[0]["id"] == "new" and "score" in second[0]
+    assert (search.builds, db.content.finds) == (1, 1)
+
+
+def test_search_loaded_builds_in_background_over_a_recent_window(content_db):
+    db = content_db([
+        item("script-only", script="stretching"),
+        item("oldest", caption="stretching"),
+        item("newer", caption="stretching at dawn"),
+    ])
+    db.content.documents[1]["created_at"] = "2025-01-01T00:00:00"
+    search = ContentSearch(db, field_weights=RELATED_FIELD_WEIGHTS, window=2)
+
+    async def scenario():
+        first = search.search_loaded("u1", "stretching")
+        second = search.search_loaded("u1", "stretching")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return first, second, search.search_loaded("u1", "stretching")
+
+    first, second, loaded = asyncio.run(scenario())
+    assert (first, second) == (None, None)
+    # The oldest item is outside the window and scripts are not indexed
+    assert [hit["id"] for hit in loaded] == ["newer"]
+    assert (search.builds, db.content.finds) == (1, 1)
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import List
+
+import orjson
+from pydantic import BaseModel
+
+from serialization import json_response, model_projection, response_document, response_documents
+
+
+class Item(BaseModel):
+    id: str
+    tags: List[str]
+    created_at: datetime
+    posted: bool = False
+
+
+def test_projection_selects_model_fields_without_id():
+    assert model_projection(Item) == {"id": 1, "tags": 1, "created_at": 1, "posted": 1, "_id": 0}
+
+
+def test_complete_documents_pass_through_and_incomplete_ones_get_defaults():
+    complete = {"id": "a", "tags": ["x"], "created_at": datetime(2026, 1, 1, 12, 0, 0, 500000), "posted": True}
+    legacy = {"id": "b", "tags": [], "created_at": datetime(2025, 1, 1)}
+    documents = response_documents([complete, legacy], Item)
+    assert documents[0] is complete
+    assert documents[1] == {**legacy, "posted": False}
+    assert response_document(None, Item) is None
+
+
+def test_encoding_matches_pydantic_json():
+    item = Item(id="a", tags=["x"], created_at=datetime(2026, 1, 1, 12, 0, 0, 500000))
+    body = json_response([item.model_dump()]).body
+    assert orjson.loads(body) == orjson.loads(f"[{item.model_dump_json()}]")
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class StubLlm:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def send_message(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"response to {prompt}"
+
+
+def test_concurrent_identical_requests_call_llm_once():
+    llm = StubLlm()
+    flight = SingleFlight()
+
+    async def request():
+        return await flight.do(("user-1", "daily_plan", "hash"), lambda: llm.send_message("plan"))
+
+    async def burst():
+        return await asyncio.gather(*(request() for _ in range(25)))
+
+    results = asyncio.run(burst())
+
+    assert llm.calls == 1
+    assert results == ["response to plan"] * 25
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 24}
+
+
+def test_distinct_keys_are_not_coalesced():
+    llm = StubLlm()
+    flight = SingleFlight()
+
+    async def burst():
+        return await asyncio.gather(
+            flight.do(("user-1", "content_gen", "a"), lambda: llm.send_message("a")),
+            flight.do(("user-2", "content_gen", "a"), lambda: llm.send_message("a")),
+        )
+
+    asyncio.run(burst())
+    assert llm.calls == 2
+
+
+def test_failures_reach_every_waiter_and_are_not_remembered():
+    flight = SingleFlight()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def burst():
+        return await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.do("k", failing))
+    assert len(attempts) == 2
+
+
+PLAN = [{"platform": "TikTok", "content_type": "Reel", "topic": f"Topic {n}", "reasoning": "Trending"} for n in range(3)]
+
+
+def test_concurrent_identical_generations_share_one_llm_call(server, api, monkeypatch):
+    calls = []
+
+    async def complete(system_message, user_prompt, session_id):
+        calls.append(user_prompt)
+        await asyncio.sleep(0.05)
+        return json.dumps(PLAN)
+
+    monkeypatch.setattr(server.llm_gateway, "complete", complete)
+    # Admission would queue requests past the per-user concurrency limit until the first is done
+    monkeypatch.setattr(server, "admission", None)
+
+    async def burst():
+        prompts = await asyncio.gather(*(
+            server.send_llm_prompt("content_gen", "user-1", "system", "prompt", bypass_cache=True) for _ in range(10)
+        ))
+        async with api() as client:
+            user = (await client.post("/api/users", json={
+                "name": "Double Clicker", "niche": "Fitness", "tone": "Casual", "target_audience": "Runners",
+                "platforms": ["TikTok"]})).json()
+            plans = await asyncio.gather(*(
+                client.post("/api/daily-plan/generate", json={"user_id": user["id"]}) for _ in range(10)
+            ))
+        return prompts, plans
+
+    prompts, plans = asyncio.run(burst())
+
+    assert prompts == [json.dumps(PLAN)] * 10
+    # One call for the burst of prompts, one for the burst of plan requests
+    assert len(calls) == 2
+    assert [response.status_code for response in plans] == [200] * 10
+    plans = [response.json() for response in plans]
+    assert {plan["id"] for plan in plans} == {plans[0]["id"]}
+    assert all(plan["plan_items"] == plans[0]["plan_items"] for plan in plans)
+    assert [item["topic"] for item in plans[0]["plan_items"]] == ["Topic 0", "Topic 1", "Topic 2"]
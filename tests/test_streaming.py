@@ -0,0 +1,41 @@
+from streaming import ContentStreamParser, format_sse
+
+
+def feed_in_chunks(parser, text, size):
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events
+
+
+def test_parser_emits_each_field_as_its_string_closes():
+    response = '```json\n{"hooks": ["First \\"one\\"", "Second", "Third \\u2728"], ' \
+               '"script": "Line 1\\nLine 2", "caption": "Go {now} #tips"}\n```'
+    parser = ContentStreamParser()
+
+    events = feed_in_chunks(parser, response, 3)
+
+    assert events == [
+        ("hook", {"index": 0, "text": 'First "one"'}),
+        ("hook", {"index": 1, "text": "Second"}),
+        ("hook", {"index": 2, "text": "Third ✨"}),
+        ("script", {"text": "Line 1\nLine 2"}),
+        ("caption", {"text": "Go {now} #tips"}),
+    ]
+    assert parser.done
+
+
+def test_parser_waits_for_the_closing_quote():
+    parser = ContentStreamParser()
+    assert parser.feed('{"hooks": ["Half a ho') == []
+    assert parser.feed('ok"') == [("hook", {"index": 0, "text": "Half a hook"})]
+
+
+def test_nested_values_are_ignored():
+    parser = ContentStreamParser()
+    events = parser.feed('{"meta": {"script": "nope"}, "caption": "yes"}')
+    assert events == [("caption", {"text": "yes"})]
+
+
+def test_format_sse():
+    assert format_sse("hook", {"text": "hi"}) == 'event: hook\ndata: {"text": "hi"}\n\n'
@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from write_behind import WriteBehindBuffer
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+        self.batches = []
+        self.down = False
+        self.latency = 0
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.latency)
+        if self.down:
+            raise AutoReconnect("connection refused")
+        self.batches.append(len(documents))
+        errors = []
+        for index, document in enumerate(documents):
+            if document["_id"] in self.documents:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.documents[document["_id"]] = document
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def content(idx: int, user_id: str = "u"):
+    return {"id": f"c{idx}", "user_id": user_id, "caption": f"caption {idx}", "created_at": datetime(2026, 3, 1)}
+
+
+def test_batches_by_size_and_keeps_documents_readable_until_flushed():
+    collection = FakeCollection()
+
+    async def run():
+        buffer = WriteBehindBuffer(collection, enabled=True, max_batch=3, max_delay_seconds=60)
+        await buffer.write([content(idx) for idx in range(2)])
+        await buffer.write([content(9, user_id="other")])
+        assert collection.batches == []
+        assert {document["id"] for document in buffer.pending("u")} == {"c0", "c1"}
+        await asyncio.sleep(0.01)  # the full batch wakes the flusher
+        assert collection.batches == [3]
+        assert buffer.pending("u") == []
+        await buffer.close()
+
+    asyncio.run(run())
+
+
+def test_outage_spills_to_disk_and_replays_after_restart(tmp_path):
+    collection = FakeCollection()
+    spill_path = tmp_path / "spill.jsonl"
+
+    async def run():
+        buffer = WriteBehindBuffer(collection, enabled=True, max_delay_seconds=60, spill_path=spill_path)
+        await buffer.write([content(0)])
+        await buffer.flush()
+        collection.down = True
+        await buffer.write([content(1), content(2)])
+        await buffer.close()
+        assert len(spill_path.read_text().splitlines()) == 2
+        assert len(buffer.pending("u")) == 2
+
+        collection.down = False
+        # One of the spilled documents already made it in before the connection dropped
+        spilled = WriteBehindBuffer(collection, enabled=True, spill_path=spill_path)
+        document = (await asyncio.to_thread(spilled._read_spill))[0]
+        collection.documents[document["_id"]] = document
+
+        restarted = WriteBehindBuffer(collection, enabled=True, max_delay_seconds=60, spill_path=spill_path)
+        await restarted.start()
+        assert {document["id"] for document in restarted.pending("u")} == {"c1", "c2"}
+        await restarted.close()
+        assert not spill_path.exists()
+        assert restarted.pending("u") == []
+        assert restarted.stats()["dropped"] == 0
+        assert sorted(document["id"] for document in collection.documents.values()) == ["c0", "c1", "c2"]
+        assert isinstance(collection.documents[document["_id"]]["created_at"], datetime)
+
+    asyncio.run(run())
+
+
+def test_disabled_buffer_inserts_directly():
+    class DirectCollection(FakeCollection):
+        async def insert_one(self, document):
+            self.documents[document["_id"]] = document
+
+    collection = DirectCollection()
+
+    async def run():
+        buffer = WriteBehindBuffer(collection)
+        await buffer.write([{**content(0), "_id": 0}])
+        await buffer.write([{**content(idx), "_id": idx} for idx in range(1, 3)])
+        assert sorted(collection.documents) == [0, 1, 2]
+        assert collection.batches == [2]
+        assert buffer.pending("u") == []
+
+    asyncio.run(run())
+
+
+def test_close_waits_for_the_insert_in_flight():
+    collection = FakeCollection()
+    collection.latency = 0.05
+
+    async def run():
+        buffer = WriteBehindBuffer(collection, enabled=True, max_batch=2, max_delay_seconds=60)
+        await buffer.write([content(0), content(1)])
+        await asyncio.sleep(0.01)  # the flusher is now inside insert_many
+        await buffer.close()
+        assert sorted(document["id"] for document in collection.documents.values()) == ["c0", "c1"]
+        assert buffer.pending("u") == []
+
+    asyncio.run(run())
+
+
+def test_cancelled_flush_queues_its_batch_again():
+    collection = FakeCollection()
+    collection.latency = 0.05
+
+    async def run():
+        buffer = WriteBehindBuffer(collection, enabled=True, max_delay_seconds=60)
+        await buffer.write([content(0)])
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert buffer.stats()["queued"] == 1
+        collection.latency = 0
+        await buffer.close()
+        assert [document["id"] for document in collection.documents.values()] == ["c0"]
+
+    asyncio.run(run())
+
+
+def test_on_flush_runs_after_the_insert_and_is_retried_with_it(tmp_path):
+    collection = FakeCollection()
+    flushed = []
+
+    async def on_flush(batch):
+        # Every document is readable in Mongo by the time revisions are bumped
+        assert all(document["_id"] in collection.documents for document in batch)
+        if not flushed:
+            flushed.append(None)
+            raise AutoReconnect("revision bump failed")
+        flushed.append([document["id"] for document in batch])
+
+    async def run():
+        buffer = WriteBehindBuffer(collection, enabled=True, max_delay_seconds=60,
+                                   spill_path=tmp_path / "spill.jsonl", on_flush=on_flush)
+        await buffer.write([content(0)])
+        await buffer.flush()
+        assert len(buffer.pending("u")) == 1  # not announced yet, so still merged into reads
+        await buffer.close()
+        assert flushed[1:] == [["c0"]]
+        assert buffer.pending("u") == []
+
+    asyncio.run(run())